@@ -0,0 +1,217 @@
+import glob
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from acda.executor import LANGUAGE_CONFIGS, run_source_in_docker, set_executor_backend
+from acda.parser import parse_error_message
+from acda.patcher import apply_patch, make_diff
+from acda.pipeline import propose_fix, record_accepted_fix
+from acda.solution import read_source_code
+
+# --- Batch Configuration ---
+BATCH_WORKERS = int(os.getenv("ACDA_BATCH_WORKERS", "4"))
+BATCH_POOL = os.getenv("ACDA_BATCH_POOL", "thread")
+MAX_ATTEMPTS = 5
+POOL_KINDS = ("thread", "process")
+
+# Extra extensions on top of each language's `file_extension`.
+_EXTRA_EXTENSIONS = {"mjs": "javascript", "cjs": "javascript"}
+_SHEBANG_LANGUAGES = {"python": "python", "node": "javascript"}
+
+
+# --- Collecting Scripts ---
+def detect_language(file_path: str) -> Optional[str]:
+    """Detects the language from the file extension, then from a shebang line."""
+    extension = os.path.splitext(file_path)[1].lstrip(".").lower()
+    for language, config in LANGUAGE_CONFIGS.items():
+        if config["file_extension"] == extension:
+            return language
+    if extension in _EXTRA_EXTENSIONS:
+        return _EXTRA_EXTENSIONS[extension]
+    try:
+        with open(file_path, 'r', errors="replace") as f:
+            first_line = f.readline()
+    except OSError:
+        return None
+    if first_line.startswith("#!"):
+        for interpreter, language in _SHEBANG_LANGUAGES.items():
+            if interpreter in first_line:
+                return language
+    return None
+
+def _read_manifest(manifest_path: str) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Reads a manifest: a JSON list or JSON lines of paths or {"path", "language"}
+    objects, or plain text with one path (optionally followed by a language)
+    per line. Relative paths are resolved against the manifest's directory.
+    """
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    with open(manifest_path, 'r') as f:
+        text = f.read()
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        entries = json.loads(stripped)
+    elif stripped.startswith("{"):
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+    else:
+        entries = [line.split() for line in text.splitlines() if line.strip() and not line.lstrip().startswith("#")]
+    for entry in entries:
+        if isinstance(entry, dict):
+            path, language = entry["path"], entry.get("language")
+        elif isinstance(entry, list):
+            path, language = entry[0], (entry[1] if len(entry) > 1 else None)
+        else:
+            path, language = entry, None
+        yield os.path.join(base, path), language
+
+def collect_scripts(targets: Iterable[str], manifests: Iterable[str] = ()) -> List[Tuple[str, str]]:
+    """
+    Expands directories (recursively), glob patterns, files and manifests into
+    a sorted, de-duplicated list of (path, language). Files whose language
+    cannot be detected are skipped.
+    """
+    candidates: List[Tuple[str, Optional[str]]] = []
+    for target in targets:
+        if os.path.isdir(target):
+            for root, dirs, files in os.walk(target):
+                dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d != "__pycache__")
+                candidates += [(os.path.join(root, name), None) for name in files]
+        elif os.path.isfile(target):
+            candidates.append((target, None))
+        else:
+            matches = glob.glob(target, recursive=True)
+            if not matches:
+                logging.warning(f"No scripts match: {target}")
+            candidates += [(path, None) for path in matches if os.path.isfile(path)]
+    for manifest in manifests:
+        candidates += list(_read_manifest(manifest))
+
+    scripts: Dict[str, str] = {}
+    for path, language in candidates:
+        path = os.path.normpath(path)
+        language = language or detect_language(path)
+        if language in LANGUAGE_CONFIGS and path not in scripts:
+            scripts[path] = language
+    return sorted(scripts.items())
+
+
+# --- Debugging One Script ---
+def debug_script(file_path: str, language: str = "python", max_attempts: int = MAX_ATTEMPTS,
+                 write: bool = False, speculative: Optional[bool] = None) -> dict:
+    """
+    Runs the execute-parse-fix-validate loop on one script. Fixes are applied
+    to an in-memory copy; with `write` the final version is patched into the
+    file once the script runs cleanly.
+
+    Returns:
+        dict: 'file', 'language', 'outcome' (passed, fixed, unparsed,
+            no_solution, patch_failed, max_attempts or error), 'attempts'
+            (one entry per failing run), 'diff' and 'elapsed' seconds.
+    """
+    started_at = time.perf_counter()
+    record = {"file": file_path, "language": language, "outcome": "error", "attempts": [], "diff": ""}
+    original = read_source_code(file_path)
+    if original is None:
+        record["error"] = "Could not read the source file."
+        record["elapsed"] = round(time.perf_counter() - started_at, 3)
+        return record
+
+    file_name = os.path.basename(file_path)
+    code = original
+    last_fix = None  # (code before, fixed code, error details) awaiting validation
+    try:
+        for attempt in range(1, max_attempts + 2):
+            run_started_at = time.perf_counter()
+            result = run_source_in_docker(code, language=language, file_name=file_name)
+            run_time = time.perf_counter() - run_started_at
+            if result["return_code"] == 0:
+                if last_fix:
+                    record_accepted_fix(*last_fix, language=language)
+                record["outcome"] = "fixed" if code != original else "passed"
+                break
+            if attempt > max_attempts:
+                record["outcome"] = "max_attempts"
+                break
+
+            error_details = parse_error_message(result["stderr"], language=language)
+            step = {"attempt": attempt, "run_time": round(run_time, 3), "return_code": result["return_code"]}
+            record["attempts"].append(step)
+            if not error_details:
+                step["stderr"] = result["stderr"][-2000:]
+                record["outcome"] = "unparsed"
+                break
+            step.update(error_type=error_details["error_type"], error_message=error_details["error_message"],
+                        line_number=error_details.get("line_number"))
+
+            fix_started_at = time.perf_counter()
+            solution = propose_fix(code, error_details, language=language, file_name=file_name, speculative=speculative)
+            step["fix_time"] = round(time.perf_counter() - fix_started_at, 3)
+            if not solution:
+                record["outcome"] = "no_solution"
+                break
+            step["source"] = solution.get("source")
+            step["related_errors"] = len(solution.get("related_errors", []))
+            last_fix = (code, solution["code"], error_details)
+            code = solution["code"]
+    except Exception as e:
+        logging.error(f"Batch run failed for {file_path}: {e}")
+        record["outcome"] = "error"
+        record["error"] = str(e)
+
+    record["diff"] = make_diff(original, code, file_name)
+    if write and record["outcome"] == "fixed" and not apply_patch(file_path, record["diff"]):
+        record["outcome"] = "patch_failed"
+    record["elapsed"] = round(time.perf_counter() - started_at, 3)
+    return record
+
+
+# --- Running a Batch ---
+def _init_worker(backend: Optional[str]):
+    """Process-pool initializer: each worker builds its own executor and cache handles once."""
+    if backend:
+        set_executor_backend(backend)
+
+def _debug_job(job: Tuple[str, str], max_attempts: int, write: bool, speculative: Optional[bool]) -> dict:
+    file_path, language = job
+    return debug_script(file_path, language, max_attempts=max_attempts, write=write, speculative=speculative)
+
+def run_batch(scripts: List[Tuple[str, str]], output_path: str, workers: int = BATCH_WORKERS,
+              pool: str = BATCH_POOL, max_attempts: int = MAX_ATTEMPTS, write: bool = False,
+              speculative: Optional[bool] = None, backend: Optional[str] = None) -> Dict[str, int]:
+    """
+    Debugs `scripts` ((path, language) pairs) on a thread or process pool and
+    appends one JSON line per script to `output_path` as each one finishes.
+    Threads share this process's executor, container pool and caches; each
+    worker process builds its own once (the SQLite caches are shared on disk).
+
+    Returns:
+        dict: Number of scripts per outcome.
+    """
+    if pool not in POOL_KINDS:
+        raise ValueError(f"Unknown pool '{pool}'. Available: {', '.join(POOL_KINDS)}")
+    workers = max(1, min(workers, len(scripts) or 1))
+    if pool == "process":
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(backend,))
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="acda-batch")
+
+    outcomes: Dict[str, int] = {}
+    started_at = time.perf_counter()
+    with executor, open(output_path, 'a') as output:
+        futures = {executor.submit(_debug_job, job, max_attempts, write, speculative): job for job in scripts}
+        for future in as_completed(futures):
+            file_path, language = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                record = {"file": file_path, "language": language, "outcome": "error", "error": str(e), "attempts": []}
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            outcomes[record["outcome"]] = outcomes.get(record["outcome"], 0) + 1
+            logging.info(f"{file_path}: {record['outcome']} after {len(record['attempts'])} attempt(s)")
+    logging.info(f"Batch of {len(scripts)} script(s) took {time.perf_counter() - started_at:.2f}s with {workers} {pool} worker(s).")
+    return outcomes
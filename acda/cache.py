@@ -0,0 +1,235 @@
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Tuple
+
+# --- Constants ---
+CACHE_DB_FILE = "cache.sqlite3"
+CACHE_MAX_ENTRIES = int(os.getenv("ACDA_CACHE_MAX_ENTRIES", "5000"))
+CACHE_MAX_BYTES = int(os.getenv("ACDA_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL = float(os.getenv("ACDA_CACHE_TTL", str(30 * 24 * 3600)))  # seconds; 0 disables expiry
+MEMORY_TIER_ENTRIES = 256
+TOUCH_BATCH = 64  # Memory-tier hits buffered before their access times are written back.
+
+
+class SQLiteCache:
+    """
+    A bounded key/value cache for JSON-serializable dicts.
+
+    Entries live in one SQLite file (one table per cache), fronted by an
+    in-memory LRU tier for hot keys. Every write is a single transaction, so
+    readers never see a half-written entry, and the file can be shared by
+    several processes. Once the entry-count or byte-size cap is exceeded the
+    least recently used entries are evicted; entries older than `ttl` expire.
+    """
+
+    def __init__(self, path: str, table: str = "entries", max_entries: int = CACHE_MAX_ENTRIES,
+                 max_bytes: int = CACHE_MAX_BYTES, ttl: float = CACHE_TTL, memory_entries: int = MEMORY_TIER_ENTRIES):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table}")
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._touched: Dict[str, float] = {}  # Memory-tier hits not yet written to `accessed_at`.
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl) and now - created_at > self.ttl
+
+    def _remember(self, key: str, value: dict, created_at: float):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[dict]:
+        """Returns the cached value, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None and not self._expired(cached[1], now):
+                self._memory.move_to_end(key)
+                # Eviction orders by `accessed_at`, so hot keys must keep it current too.
+                self._touched[key] = now
+                if len(self._touched) >= TOUCH_BATCH:
+                    self._flush_touched()
+                self.hits += 1
+                return cached[0]
+            self._memory.pop(key, None)
+
+            row = self._conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self._expired(created_at, now):
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.evictions += 1
+                self.misses += 1
+                return None
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError as e:
+                logging.warning(f"Dropping corrupt cache entry {key}: {e}")
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self._remember(key, value, created_at)
+            self.hits += 1
+            return value
+
+    def _flush_touched(self):
+        """Writes buffered memory-tier access times back. Callers hold the lock."""
+        if self._touched:
+            self._conn.executemany(
+                f"UPDATE {self.table} SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def set(self, key: str, value: dict, created_at: Optional[float] = None):
+        """Stores a value atomically, then evicts down to the configured caps."""
+        payload = json.dumps(value)
+        now = time.time()
+        created_at = created_at or now
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload.encode()), created_at, now)
+                )
+                self._touched.pop(key, None)
+                self._flush_touched()
+                self._evict(now)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._remember(key, value, created_at)
+
+    def _evict(self, now: float):
+        evicted = 0
+        if self.ttl:
+            evicted += self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl,)
+            ).rowcount
+        count, total_bytes = self._conn.execute(
+            f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+        ).fetchone()
+        while count > self.max_entries or total_bytes > self.max_bytes:
+            # Drop least recently used entries in batches until both caps hold.
+            batch = max(count - self.max_entries, 1)
+            rows = self._conn.execute(
+                f"SELECT key, size FROM {self.table} ORDER BY accessed_at LIMIT ?", (batch,)
+            ).fetchall()
+            if not rows:
+                break
+            self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(key,) for key, _ in rows])
+            for key, size in rows:
+                self._memory.pop(key, None)
+                count -= 1
+                total_bytes -= size
+            evicted += len(rows)
+        self.evictions += evicted
+
+    def delete(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+            self._touched.pop(key, None)
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        """Yields every unexpired (key, value) pair, e.g. to rebuild an index."""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(f"SELECT key, value, created_at FROM {self.table}").fetchall()
+        for key, value, created_at in rows:
+            if self._expired(created_at, now):
+                continue
+            try:
+                yield key, json.loads(value)
+            except json.JSONDecodeError:
+                continue
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        """Returns hit, miss and eviction counters plus the current size."""
+        with self._lock:
+            count, total_bytes = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": count,
+            "bytes": total_bytes,
+        }
+
+    def import_directory(self, directory: str) -> int:
+        """
+        Imports a legacy one-JSON-file-per-key cache directory (`<key>.json`).
+        Existing entries are kept; returns the number of entries imported.
+        """
+        imported = 0
+        for cache_file in glob.glob(os.path.join(directory, "*.json")):
+            key = os.path.splitext(os.path.basename(cache_file))[0]
+            try:
+                with open(cache_file, 'r') as f:
+                    value = json.load(f)
+            except (IOError, json.JSONDecodeError) as e:
+                logging.warning(f"Skipping unreadable cache file {cache_file}: {e}")
+                continue
+            with self._lock:
+                exists = self._conn.execute(
+                    f"SELECT 1 FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+            if not exists:
+                self.set(key, value, created_at=os.path.getmtime(cache_file))
+                imported += 1
+        logging.info(f"Imported {imported} legacy cache entries from {directory}.")
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.close()
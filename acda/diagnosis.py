@@ -0,0 +1,232 @@
+import ast
+import builtins
+import logging
+import re
+import time
+import warnings
+from typing import Dict, List, Optional, Set, Tuple
+
+from acda.fixers import JS_GLOBALS, JS_KEYWORDS, code_spans, identifiers
+from acda.precheck import get_node_checker, host_can_check
+from acda.parser import parse_error_message
+
+# --- Constants ---
+MAX_SYNTAX_ERRORS = 10   # Syntax errors collected per file before giving up on recovery.
+MAX_RELATED_ERRORS = 8   # Errors (besides the primary one) passed on to the LLM.
+
+_IDENTIFIER_RE = re.compile(r'[A-Za-z_$][\w$]*')
+_PY_MODULE_NAMES = {"__file__", "__name__", "__doc__", "__builtins__", "__spec__", "__loader__", "__package__", "__path__"}
+
+_JS_NAME = r'[A-Za-z_$][\w$]*'
+_JS_DECLARATION_RES = [
+    re.compile(r'\b(?:var|let|const)\s+([^=;]+?)\s*(?:=|;|\bof\b|\bin\b|$)', re.M),
+    re.compile(rf'\b(?:function\*?|class)\s+({_JS_NAME})'),
+    re.compile(rf'\bfunction\*?\s*(?:{_JS_NAME})?\s*\(([^)]*)\)'),
+    re.compile(r'\(([^()]*)\)\s*=>'),
+    re.compile(rf'({_JS_NAME})\s*=>'),
+    re.compile(rf'\bcatch\s*\(\s*({_JS_NAME})'),
+    re.compile(r'\bimport\s+([^;]+?)\s+from\b'),
+    re.compile(rf',\s*({_JS_NAME})\s*=(?![=>])'),
+    re.compile(rf'^\s*({_JS_NAME})\s*=(?![=>])', re.M),
+]
+# `name(...) {` is a method definition, not a call.
+_JS_METHOD_RE = re.compile(r'\s*\([^()]*\)\s*\{')
+
+
+def _error(error_type: str, error_message: str, line_number: int, kind: str) -> Dict[str, str]:
+    return {"error_type": error_type, "error_message": error_message, "line_number": str(line_number), "kind": kind}
+
+
+# --- Syntax Errors (error recovery) ---
+def _mask_python_line(line: str) -> str:
+    """Replaces a broken line with a no-op at the same indentation, keeping a block header a header."""
+    indent = line[:len(line) - len(line.lstrip())]
+    return indent + ("if True:" if line.split("#")[0].rstrip().endswith(":") else "pass")
+
+def _mask_javascript_line(line: str) -> str:
+    """Keeps only a broken line's braces, so the surrounding block structure survives."""
+    return "".join(char for char in line if char in "{}")
+
+def _python_syntax_error(source: str) -> Optional[Dict[str, str]]:
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            compile(source, "<diagnosis>", "exec", dont_inherit=True)
+    except SyntaxError as e:
+        return _error(type(e).__name__, e.msg, e.lineno or 0, "syntax")
+    except (ValueError, RecursionError, MemoryError):
+        return None
+    return None
+
+def _javascript_syntax_error(source: str) -> Optional[Dict[str, str]]:
+    result = get_node_checker().check(source)
+    if result is None:
+        return None
+    details = parse_error_message(result["stderr"], language="javascript")
+    if not details:
+        return None
+    return _error(details["error_type"], details["error_message"], details["line_number"], "syntax")
+
+_SYNTAX_CHECKS = {
+    "python": (_python_syntax_error, _mask_python_line),
+    "javascript": (_javascript_syntax_error, _mask_javascript_line),
+}
+
+def collect_syntax_errors(code_content: str, language: str = "python",
+                          target_version: Optional[str] = None) -> Tuple[List[Dict[str, str]], str]:
+    """
+    Finds every syntax error it can, not just the first: after each error the
+    offending line is masked out and the file is compiled again. Like the
+    pre-check, nothing is reported when the host interpreter is older than
+    `target_version` (the sandbox's).
+
+    Returns:
+        tuple: The syntax errors in file order, and the masked source (which
+            compiles if recovery succeeded) for further static analysis.
+    """
+    check = _SYNTAX_CHECKS.get(language)
+    if check is None or not host_can_check(language, target_version):
+        return [], code_content
+    find_error, mask = check
+    lines = code_content.splitlines()
+    errors: List[Dict[str, str]] = []
+    for _ in range(MAX_SYNTAX_ERRORS):
+        error = find_error("\n".join(lines) + "\n")
+        if error is None:
+            break
+        line_number = int(error["line_number"])
+        if not 0 < line_number <= len(lines) or any(e["line_number"] == error["line_number"] for e in errors):
+            break  # Unexpected EOF, or masking made no progress.
+        errors.append(error)
+        masked = mask(lines[line_number - 1])
+        if masked == lines[line_number - 1]:
+            break
+        lines[line_number - 1] = masked
+    errors.sort(key=lambda e: int(e["line_number"]))
+    return errors, "\n".join(lines) + "\n"
+
+
+# --- Undefined Names (static scope analysis) ---
+def _python_bound_names(tree: ast.AST) -> Optional[Set[str]]:
+    """Every name bound anywhere in the module, or None after a star import (anything may be bound)."""
+    bound: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            bound.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bound.add(node.name)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                if alias.name == "*":
+                    return None
+                bound.add(alias.asname or alias.name.split(".")[0])
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            bound.add(node.name)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            bound.update(node.names)
+        elif isinstance(node, (ast.MatchAs, ast.MatchStar)) and node.name:
+            bound.add(node.name)
+        elif isinstance(node, ast.MatchMapping) and node.rest:
+            bound.add(node.rest)
+    return bound
+
+def _python_undefined_names(source: str, known: Set[str] = frozenset()) -> List[Dict[str, str]]:
+    """
+    Names read somewhere but bound nowhere in the module (nor builtins). Scopes
+    are merged, so a name bound in any scope counts as defined: this misses
+    some NameErrors but never reports a name that exists.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return []
+    bound = _python_bound_names(tree)
+    if bound is None:
+        return []
+    known = bound | set(dir(builtins)) | _PY_MODULE_NAMES | known
+    first_use: Dict[str, int] = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in known:
+            first_use[node.id] = min(first_use.get(node.id, node.lineno), node.lineno)
+    return [_error("NameError", f"name '{name}' is not defined", line, "static")
+            for name, line in sorted(first_use.items(), key=lambda item: item[1])]
+
+def _blank_literals(source: str) -> str:
+    """The source with strings and comments blanked out (newlines kept, so offsets still match)."""
+    chars = ["\n" if char == "\n" else " " for char in source]
+    for start, end in code_spans(source, "javascript"):
+        chars[start:end] = source[start:end]
+    return "".join(chars)
+
+def _javascript_undefined_names(source: str, known: Set[str] = frozenset()) -> List[Dict[str, str]]:
+    """
+    Identifiers used as a call or member base (`name(`, `name.`) that are not
+    declared anywhere in the script nor runtime globals. Heuristic and
+    deliberately conservative: anything that looks declared is trusted.
+    """
+    code = _blank_literals(source)
+    declared: Set[str] = set()
+    for pattern in _JS_DECLARATION_RES:
+        for match in pattern.finditer(code):
+            declared.update(re.findall(_JS_NAME, match.group(1)))
+    known = declared | JS_KEYWORDS | JS_GLOBALS | known
+    first_use: Dict[str, int] = {}
+    for name, start, end in identifiers(source, "javascript"):
+        if name in known or name in first_use:
+            continue
+        following = source[end:end + 1]
+        if following not in ("(", ".") or (following == "(" and _JS_METHOD_RE.match(source, end)):
+            continue
+        first_use[name] = source.count("\n", 0, start) + 1
+    return [_error("ReferenceError", f"{name} is not defined", line, "static")
+            for name, line in sorted(first_use.items(), key=lambda item: item[1])]
+
+_UNDEFINED_NAME_CHECKS = {
+    "python": _python_undefined_names,
+    "javascript": _javascript_undefined_names,
+}
+
+
+# --- Diagnosis ---
+def diagnose(code_content: str, error_details: Dict[str, str], language: str = "python",
+             target_version: Optional[str] = None) -> Dict[str, str]:
+    """
+    Gathers every independent error that can be found without another run:
+    all syntax errors (with error recovery), undefined names from static
+    analysis, and the runtime error that was observed. `target_version` is
+    the sandbox's interpreter version, as for `collect_syntax_errors`.
+
+    Returns:
+        dict: A copy of `error_details` whose 'related_errors' lists the other
+            errors (dicts with 'error_type', 'error_message', 'line_number'
+            and 'kind'), in line order. Without other errors it has none.
+    """
+    started_at = time.perf_counter()
+    syntax_errors, masked = collect_syntax_errors(code_content, language, target_version)
+    # Names on masked lines may be bound there, so they never count as undefined.
+    code_lines = code_content.splitlines()
+    masked_names = {name for error in syntax_errors
+                    for name in _IDENTIFIER_RE.findall(code_lines[int(error["line_number"]) - 1])}
+    check = _UNDEFINED_NAME_CHECKS.get(language)
+    undefined = check(masked, masked_names) if check else []
+
+    primary = (error_details.get("error_type"), str(error_details.get("line_number")))
+    seen = {primary}
+    related = []
+    for error in syntax_errors + undefined:
+        key = (error["error_type"], error["line_number"])
+        # A NameError the run already reported is the primary error itself.
+        if key in seen or (error["kind"] == "static" and error["error_message"] == error_details.get("error_message")):
+            continue
+        seen.add(key)
+        related.append(error)
+    related.sort(key=lambda e: int(e["line_number"]))
+    related = related[:MAX_RELATED_ERRORS]
+
+    logging.info(f"Diagnosis found {len(related)} more error(s) in {(time.perf_counter() - started_at) * 1000:.2f} ms.")
+    diagnosed = {key: value for key, value in error_details.items() if key != "related_errors"}
+    if related:
+        diagnosed["related_errors"] = related
+    return diagnosed
@@ -1,93 +1,1354 @@
+import abc
+import asyncio
+import atexit
+import concurrent.futures
 import docker
+import hashlib
+import io
+import json
 import os
 import logging
+import queue
+import re
+import requests
+import shutil
+import signal
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from acda.cache import SQLiteCache, CACHE_DB_FILE
+from acda.precheck import PRECHECK, precheck as static_precheck
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; local runs then skip rlimits.
+    resource = None
 
 # --- Constants ---
+# Sandbox limits applied to every language unless its config overrides them.
+# `timeout` is wall-clock seconds; `output_limit` is bytes kept per stream.
+DEFAULT_LIMITS = {
+    "mem_limit": "256m",
+    "nano_cpus": 1_000_000_000,
+    "pids_limit": 64,
+    "network_disabled": True,
+    "timeout": 10,
+    "output_limit": 64 * 1024,
+    # Only enforced by the local subprocess backend.
+    "address_space": "1g",
+    "open_files": 256
+}
+
 LANGUAGE_CONFIGS = {
     "python": {
         "image": "python:3.10-slim",
-        "command": "python"
+        "command": "python",
+        "file_extension": "py",
+        "local_command": sys.executable,
+        # Keeps imports from writing __pycache__ outside the scratch directory,
+        # which would mark a warm container dirty after almost every run.
+        "environment": {"PYTHONDONTWRITEBYTECODE": "1"},
+        "limits": {}
     },
     "javascript": {
         "image": "node:18-slim",
-        "command": "node"
+        "command": "node",
+        "file_extension": "js",
+        # V8 reserves far more virtual memory than it uses, so no RLIMIT_AS for node.
+        "limits": {"mem_limit": "384m", "address_space": None}
     }
 }
 
+# Structured reasons a run did not finish normally.
+REASON_TIMEOUT = "timeout"
+REASON_OOM = "oom"
+REASON_OUTPUT_TRUNCATED = "output_truncated"
+
+# --- Executor Backend ---
+# 'docker' (sandboxed, default) or 'local' (trusted code only, no container).
+EXECUTOR_BACKENDS = ("docker", "local")
+EXECUTOR_BACKEND = os.getenv("ACDA_EXECUTOR", "docker")
+
+# --- Warm Pool Configuration ---
+# The warm pool is opt-in: set ACDA_WARM_POOL=1 or pass use_pool=True.
+USE_WARM_POOL = os.getenv("ACDA_WARM_POOL", "0") == "1"
+POOL_SIZE = int(os.getenv("ACDA_POOL_SIZE", "2"))
+POOL_MAX_RUNS = int(os.getenv("ACDA_POOL_MAX_RUNS", "50"))
+POOL_SCRATCH_ROOT = "/tmp/acda"
+# Seconds a pooled run waits for a free container before giving up.
+POOL_ACQUIRE_TIMEOUT = float(os.getenv("ACDA_POOL_ACQUIRE_TIMEOUT", "120"))
+
+# --- Image Configuration ---
+# Seconds after which a prepared image is re-pulled; 0 means only on explicit request.
+IMAGE_PULL_TTL = float(os.getenv("ACDA_IMAGE_TTL", "0"))
+
+# --- Execution Cache Configuration ---
+# The execution cache is opt-in: set ACDA_EXEC_CACHE=1 or pass cache=True.
+# Only use it for deterministic scripts; pass cache=False for any that are not.
+EXECUTION_CACHE = os.getenv("ACDA_EXEC_CACHE", "0") == "1"
+EXECUTION_CACHE_DIR = ".acda_cache"
+EXECUTION_CACHE_TTL = float(os.getenv("ACDA_EXEC_CACHE_TTL", str(24 * 3600)))
+EXECUTION_CACHE_MAX_ENTRIES = int(os.getenv("ACDA_EXEC_CACHE_MAX_ENTRIES", "2000"))
+EXECUTION_CACHE_MAX_BYTES = int(os.getenv("ACDA_EXEC_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# --- Docker Client Configuration ---
+DOCKER_MAX_POOL_SIZE = int(os.getenv("ACDA_DOCKER_POOL_SIZE", "10"))
+DOCKER_HEALTH_CHECK_INTERVAL = 30.0
+
+# --- Async Configuration ---
+ASYNC_CONCURRENCY = int(os.getenv("ACDA_ASYNC_CONCURRENCY", "8"))
+ASYNC_MAX_WORKERS = int(os.getenv("ACDA_ASYNC_WORKERS", "16"))
+ASYNC_POLL_INTERVAL = 0.02
+ASYNC_MAX_POLL_INTERVAL = 0.25
+
 # Setting up basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def run_code_in_docker(file_path: str, language: str = "python") -> dict:
+
+# --- Limit Helpers ---
+def get_limits(language: str) -> dict:
+    """Returns the effective sandbox limits for a language."""
+    return {**DEFAULT_LIMITS, **LANGUAGE_CONFIGS[language].get("limits", {})}
+
+def _container_limits(limits: dict) -> dict:
+    """Maps sandbox limits onto `containers.run` keyword arguments."""
+    return {
+        "mem_limit": limits["mem_limit"],
+        "memswap_limit": limits["mem_limit"],
+        "nano_cpus": limits["nano_cpus"],
+        "pids_limit": limits["pids_limit"],
+        "network_disabled": limits["network_disabled"]
+    }
+
+class _BoundedBuffer:
     """
-    Executes a script in a secure, isolated Docker container based on the language.
+    Accumulates one output stream in bounded memory, keeping the first and
+    last `limit // 2` bytes and dropping the middle once the limit is exceeded.
+    """
+
+    def __init__(self, limit: int):
+        self.head_limit = limit // 2
+        self.tail_limit = limit - self.head_limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data: bytes):
+        self.total += len(data)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            # Trim lazily so a stream of small chunks does not copy on every write.
+            if len(self.tail) > 2 * self.tail_limit:
+                del self.tail[:-self.tail_limit]
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > self.head_limit + self.tail_limit
+
+    def getvalue(self) -> str:
+        """Returns the kept output, decoded tolerantly so binary output cannot raise."""
+        tail = self.tail[-self.tail_limit:] if self.tail_limit else b""
+        if not self.truncated:
+            # Decoded in one piece, so a character spanning head and tail survives.
+            return bytes(self.head + tail).decode("utf-8", errors="replace")
+        head_text = self.head.decode("utf-8", errors="replace")
+        tail_text = bytes(tail).decode("utf-8", errors="replace")
+        dropped = self.total - len(self.head) - len(tail)
+        return f"{head_text}\n... [{dropped} bytes of output truncated] ...\n{tail_text}"
+
+def _capture_output(chunks: Iterable, limit: int) -> Tuple[_BoundedBuffer, _BoundedBuffer]:
+    """
+    Consumes a demultiplexed (stdout, stderr) chunk stream in a single pass.
 
     Args:
-        file_path (str): The path to the script to execute.
-        language (str): The programming language ('python' or 'javascript').
+        chunks (iterable): (stdout_bytes, stderr_bytes) tuples, either may be None.
+        limit (int): Maximum number of bytes kept per stream.
+
+    Returns:
+        tuple: The bounded stdout and stderr buffers.
+    """
+    stdout, stderr = _BoundedBuffer(limit), _BoundedBuffer(limit)
+    for out, err in chunks or ():
+        if out:
+            stdout.write(out)
+        if err:
+            stderr.write(err)
+    return stdout, stderr
+
+def _build_result(stdout: _BoundedBuffer, stderr: _BoundedBuffer, return_code: int, limits: dict,
+                  timed_out: bool = False, oom_killed: bool = False, timings: Optional[dict] = None) -> dict:
+    """Assembles the executor result dict, including the structured `reason`."""
+    stderr_text = stderr.getvalue()
+    reason = None
+    if timed_out:
+        reason = REASON_TIMEOUT
+        stderr_text += _timeout_message(limits)
+    elif oom_killed:
+        reason = REASON_OOM
+    elif stdout.truncated or stderr.truncated:
+        reason = REASON_OUTPUT_TRUNCATED
+    return {
+        "stdout": stdout.getvalue(),
+        "stderr": stderr_text,
+        "return_code": return_code,
+        "reason": reason,
+        "timings": timings or {}
+    }
+
+def _timeout_message(limits: dict) -> str:
+    return f"\nTimeoutError: Execution exceeded the {limits['timeout']}s time limit and was killed.\n"
+
+
+# --- Archive Helpers ---
+def _make_archive(files: Dict[str, bytes]) -> bytes:
+    """
+    Packs files into an in-memory tar archive suitable for `put_archive`.
+
+    Args:
+        files (dict): Maps archive-relative paths to file contents.
 
     Returns:
-        dict: A dictionary with 'stdout', 'stderr', and 'return_code'.
+        bytes: The tar archive.
+    """
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        directories = set()
+        for path in files:
+            parent = os.path.dirname(path)
+            while parent and parent not in directories:
+                directories.add(parent)
+                parent = os.path.dirname(parent)
+        for directory in sorted(directories):
+            info = tarfile.TarInfo(directory)
+            info.type = tarfile.DIRTYPE
+            info.mode = 0o777
+            info.mtime = int(time.time())
+            tar.addfile(info)
+        for path, content in files.items():
+            info = tarfile.TarInfo(path)
+            info.size = len(content)
+            info.mode = 0o644
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+# --- Image Readiness ---
+class ImageNotPreparedError(RuntimeError):
+    """Raised when a language image is not available locally and must be prepared first."""
+
+    def __init__(self, image_name: str):
+        super().__init__(
+            f"Docker image '{image_name}' is not prepared. "
+            f"Run `python main.py prepare` (or ImageManager.prepare()) to pull it."
+        )
+        self.image_name = image_name
+
+
+class ImageManager:
+    """
+    Tracks which images in LANGUAGE_CONFIGS are available locally, so executions
+    check readiness from memory instead of pulling from the registry every run.
+
+    Images are pulled only by `prepare()`, or when a ready image is older than
+    `ttl` seconds (a failed refresh keeps the local copy, for offline hosts).
     """
-    if not os.path.exists(file_path):
+
+    def __init__(self, client_provider: Optional[Callable] = None, ttl: float = IMAGE_PULL_TTL):
+        self._client_provider = client_provider or (lambda: get_docker_executor().client)
+        self.ttl = ttl
+        self._ready: Dict[str, float] = {}
+        self._digests: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self._client_provider()
+
+    def _pull(self, image_name: str):
+        logging.info(f"Pulling Docker image: {image_name}...")
+        self.client.images.pull(image_name)
+        self._ready[image_name] = time.time()
+        self._digests.pop(image_name, None)
+
+    def invalidate(self, image_name: str):
+        """Forgets that an image is ready, e.g. after it was removed from the host."""
+        with self._lock:
+            self._ready.pop(image_name, None)
+            self._digests.pop(image_name, None)
+
+    def digest(self, image_name: str) -> Optional[str]:
+        """Returns the local image ID (a content digest), or None if it is not present or the daemon is unreachable."""
+        with self._lock:
+            if image_name not in self._digests:
+                try:
+                    self._digests[image_name] = self.client.images.get(image_name).id
+                except (docker.errors.DockerException, requests.exceptions.RequestException) as e:
+                    # Without a digest the run is simply not cached; the run itself reports the error.
+                    logging.warning(f"Could not read the digest of {image_name}: {e}")
+                    return None
+            return self._digests[image_name]
+
+    def ensure(self, image_name: str):
+        """
+        Makes sure an image is available locally without touching the registry.
+
+        Raises:
+            ImageNotPreparedError: If the image is not present on the host.
+        """
+        with self._lock:
+            ready_at = self._ready.get(image_name)
+            if ready_at is not None:
+                if self.ttl and time.time() - ready_at > self.ttl:
+                    try:
+                        self._pull(image_name)
+                    except docker.errors.APIError as e:
+                        logging.warning(f"Could not refresh image {image_name}, keeping local copy: {e}")
+                        self._ready[image_name] = time.time()
+                return
+
+            try:
+                self.client.images.get(image_name)
+            except docker.errors.ImageNotFound:
+                raise ImageNotPreparedError(image_name)
+            self._ready[image_name] = time.time()
+
+    def prepare(self, languages: Optional[list] = None, pull: bool = False) -> Dict[str, bool]:
+        """
+        Pre-warms the configured images, pulling only those missing locally.
+
+        Args:
+            languages (list): Languages to prepare. Defaults to all configured ones.
+            pull (bool): Pull every image even if it is already present.
+
+        Returns:
+            dict: Maps each image name to whether it is ready.
+        """
+        results = {}
+        for language in languages or list(LANGUAGE_CONFIGS):
+            image_name = LANGUAGE_CONFIGS[language]["image"]
+            with self._lock:
+                try:
+                    if not pull:
+                        try:
+                            self.client.images.get(image_name)
+                            self._ready[image_name] = time.time()
+                            logging.info(f"Docker image {image_name} is ready.")
+                            results[image_name] = True
+                            continue
+                        except docker.errors.ImageNotFound:
+                            pass
+                    self._pull(image_name)
+                    results[image_name] = True
+                except docker.errors.APIError as e:
+                    logging.error(f"Could not prepare Docker image {image_name}: {e}")
+                    results[image_name] = False
+        return results
+
+
+# --- Source Helpers ---
+def _read_script(file_path: str) -> Optional[bytes]:
+    try:
+        with open(file_path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
         logging.error(f"File not found: {file_path}")
-        return {"stdout": "", "stderr": f"Error: File not found at {file_path}", "return_code": -1}
+        return None
 
-    if language not in LANGUAGE_CONFIGS:
-        logging.error(f"Unsupported language: {language}")
-        return {"stdout": "", "stderr": f"Unsupported language: {language}", "return_code": -1}
+def _normalize_source(source: Union[str, bytes], file_name: Optional[str], language: str) -> Tuple[bytes, str]:
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    if not file_name:
+        file_name = f"main.{LANGUAGE_CONFIGS[language]['file_extension']}"
+    return source, os.path.basename(file_name)
+
+
+# --- Warm Container Pool ---
+class _PooledContainer:
+    """
+    A long-running idle container, the number of scripts it has run, and the
+    paths that already differed from its image when it was started.
+    """
+
+    def __init__(self, container, language: str):
+        self.container = container
+        self.language = language
+        self.runs = 0
+        self.baseline = _changed_paths(container)
+
+
+def _changed_paths(container) -> set:
+    """Paths added, modified or deleted in the container's filesystem relative to its image."""
+    return {change["Path"] for change in container.diff() or []}
+
+
+class ContainerPool:
+    """
+    Keeps a per-language pool of pre-started, idle containers and runs each
+    script through `exec` in a fresh scratch directory, avoiding a full
+    container create/start/remove cycle per execution.
+
+    A container is recycled after `max_runs` executions, or immediately after
+    a run that leaves it dirty: scratch cleanup failed, stray processes, files
+    changed outside the scratch directory, or an OOM kill.
+    """
+
+    def __init__(self, client_provider: Optional[Callable] = None, size: int = POOL_SIZE, max_runs: int = POOL_MAX_RUNS):
+        self._client_provider = client_provider or (lambda: get_docker_executor().client)
+        self.size = size
+        self.max_runs = max_runs
+        self._idle = {language: queue.Queue() for language in LANGUAGE_CONFIGS}
+        self._counts = {language: 0 for language in LANGUAGE_CONFIGS}
+        # Guards `_counts`; waiters in `acquire` are woken whenever a container
+        # is returned or discarded, so a freed slot is never missed.
+        self._available = threading.Condition()
+        self._closed = False
+
+    @property
+    def client(self):
+        return self._client_provider()
+
+    def _start_container(self, language: str) -> _PooledContainer:
+        config = LANGUAGE_CONFIGS[language]
+        get_image_manager().ensure(config["image"])
+        container = self.client.containers.run(
+            image=config["image"],
+            command=["sleep", "infinity"],
+            detach=True,
+            labels={"acda.pool": language},
+            **_container_limits(get_limits(language))
+        )
+        logging.info(f"Started warm {language} container {container.short_id}.")
+        return _PooledContainer(container, language)
+
+    def _discard(self, pooled: _PooledContainer):
+        with self._available:
+            self._counts[pooled.language] -= 1
+            self._available.notify_all()
+        try:
+            pooled.container.remove(force=True)
+            logging.info(f"Recycled warm container {pooled.container.short_id} after {pooled.runs} runs.")
+        except docker.errors.APIError as e:
+            logging.warning(f"Could not remove warm container {pooled.container.short_id}: {e}")
+
+    def warm_up(self, language: Optional[str] = None):
+        """Starts containers until every (or the given) language pool is full."""
+        for lang in ([language] if language else list(LANGUAGE_CONFIGS)):
+            while True:
+                with self._available:
+                    if self._counts[lang] >= self.size:
+                        break
+                    self._counts[lang] += 1
+                self._idle[lang].put(self._start_counted(lang))
+
+    def _start_counted(self, language: str) -> _PooledContainer:
+        """Starts a container whose slot is already counted, giving the slot back on failure."""
+        try:
+            return self._start_container(language)
+        except Exception:
+            with self._available:
+                self._counts[language] -= 1
+                self._available.notify_all()
+            raise
+
+    def acquire(self, language: str, timeout: Optional[float] = None) -> _PooledContainer:
+        """
+        Takes an idle container, starting one if the pool is not yet full, and
+        otherwise waits until one is released or a recycled one frees a slot.
+
+        Raises:
+            TimeoutError: If no container became available within `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._available:
+            while True:
+                try:
+                    return self._idle[language].get_nowait()
+                except queue.Empty:
+                    pass
+                if self._counts[language] < self.size:
+                    self._counts[language] += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No warm {language} container became free within {timeout:g}s.")
+                self._available.wait(remaining)
+        return self._start_counted(language)
+
+    def release(self, pooled: _PooledContainer, dirty: bool = False):
+        """Returns a container to the pool, or recycles it if it is dirty or worn out."""
+        if dirty or self._closed or pooled.runs >= self.max_runs:
+            self._discard(pooled)
+        else:
+            with self._available:
+                self._idle[pooled.language].put(pooled)
+                self._available.notify_all()
+
+    def _is_dirty(self, pooled: _PooledContainer, scratch_dir: str) -> bool:
+        cleanup = self.client.api.exec_create(pooled.container.id, ["rm", "-rf", scratch_dir])
+        self.client.api.exec_start(cleanup["Id"])
+        if self.client.api.exec_inspect(cleanup["Id"]).get("ExitCode") != 0:
+            return True
+        # Anything still running besides the idle `sleep` was left behind by the script.
+        processes = pooled.container.top().get("Processes") or []
+        if len(processes) > 1:
+            return True
+        # Files written outside scratch (e.g. a sitecustomize.py, or under /tmp)
+        # would leak into every later run in this container.
+        allowed = pooled.baseline | {"/tmp", POOL_SCRATCH_ROOT}
+        return bool(_changed_paths(pooled.container) - allowed)
+
+    def run(self, source: bytes, file_name: str, language: str) -> dict:
+        """
+        Executes a script in a warm container.
+
+        Args:
+            source (bytes): The script contents.
+            file_name (str): The name the script is given inside the container.
+            language (str): The programming language ('python' or 'javascript').
+
+        Returns:
+            dict: 'stdout', 'stderr', 'return_code', 'reason' (None, 'timeout',
+                'oom' or 'output_truncated'), plus 'timings' with the seconds
+                spent waiting for a container and executing.
+        """
+        config = LANGUAGE_CONFIGS[language]
+        limits = get_limits(language)
+        queued_at = time.monotonic()
+        pooled = self.acquire(language, timeout=POOL_ACQUIRE_TIMEOUT)
+        queue_wait = time.monotonic() - queued_at
+
+        run_id = uuid.uuid4().hex
+        scratch_dir = f"{POOL_SCRATCH_ROOT}/{run_id}"
+        dirty = True
+        timed_out = threading.Event()
+        started_at = time.monotonic()
+        try:
+            archive = _make_archive({f"acda/{run_id}/{file_name}": source})
+            pooled.container.put_archive("/tmp", archive)
+
+            logging.info(f"Running {language} script '{file_name}' in warm container {pooled.container.short_id}...")
+            exec_id = self.client.api.exec_create(
+                pooled.container.id,
+                [config["command"], file_name],
+                workdir=scratch_dir,
+                environment=config.get("environment")
+            )["Id"]
 
-    client = docker.from_env()
-    config = LANGUAGE_CONFIGS[language]
-    image_name = config["image"]
+            # An exec cannot be killed on its own, so a timeout kills the whole
+            # container; it is then recycled as dirty.
+            def kill_on_timeout():
+                timed_out.set()
+                try:
+                    pooled.container.kill()
+                except docker.errors.APIError:
+                    pass
 
-    absolute_file_path = os.path.abspath(file_path)
-    volume_path = os.path.dirname(absolute_file_path)
-    file_name = os.path.basename(absolute_file_path)
+            watchdog = threading.Timer(limits["timeout"], kill_on_timeout)
+            watchdog.start()
+            try:
+                stream = self.client.api.exec_start(exec_id, stream=True, demux=True)
+                stdout, stderr = _capture_output(stream, limits["output_limit"])
+            finally:
+                watchdog.cancel()
+            return_code = self.client.api.exec_inspect(exec_id)["ExitCode"]
+            exec_time = time.monotonic() - started_at
+
+            pooled.runs += 1
+            oom_killed = False
+            if not timed_out.is_set():
+                # Docker records the kernel OOM killer on the container (a plain
+                # SIGKILL also exits 137); the flag is sticky, so the container is recycled.
+                pooled.container.reload()
+                oom_killed = bool(pooled.container.attrs.get("State", {}).get("OOMKilled"))
+                dirty = oom_killed or self._is_dirty(pooled, scratch_dir)
+        finally:
+            self.release(pooled, dirty=dirty)
+
+        return _build_result(
+            stdout, stderr, return_code, limits,
+            timed_out=timed_out.is_set(),
+            oom_killed=oom_killed,
+            timings={"queue_wait": queue_wait, "exec_time": exec_time}
+        )
 
-    command = f"{config['command']} {file_name}"
-    container = None
+    def shutdown(self):
+        """Removes every idle container; busy ones are removed when released."""
+        self._closed = True
+        for language, idle in self._idle.items():
+            while True:
+                try:
+                    pooled = idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._discard(pooled)
 
+
+def _warm_up_quietly(pool: ContainerPool):
     try:
-        logging.info(f"Pulling Docker image: {image_name}...")
-        client.images.pull(image_name)
-        
+        pool.warm_up()
+    except Exception as e:
+        logging.warning(f"Could not pre-start warm containers: {e}")
+
+
+# --- Executor Interface ---
+class BaseExecutor(abc.ABC):
+    """
+    Interface shared by the execution backends. Subclasses implement
+    `run_source`; every backend returns the same result dict.
+    """
+
+    name = "base"
+
+    def _validate(self, language: str) -> Optional[dict]:
+        if language not in LANGUAGE_CONFIGS:
+            logging.error(f"Unsupported language: {language}")
+            return {"stdout": "", "stderr": f"Unsupported language: {language}", "return_code": -1}
+        return None
+
+    @abc.abstractmethod
+    def run_source(self, source: Union[str, bytes], language: str = "python", file_name: Optional[str] = None,
+                   use_pool: Optional[bool] = None) -> dict:
+        """Executes source code and returns the result dict."""
+
+    def run_file(self, file_path: str, language: str = "python", use_pool: Optional[bool] = None) -> dict:
+        """
+        Executes a script file; its contents are shipped to the container in memory.
+
+        Args:
+            file_path (str): The path to the script to execute.
+            language (str): The programming language ('python' or 'javascript').
+            use_pool (bool): Run in a warm pooled container instead of a fresh one.
+
+        Returns:
+            dict: A dictionary with 'stdout', 'stderr', 'return_code', 'reason' and 'timings'.
+        """
+        source = _read_script(file_path)
+        if source is None:
+            return {"stdout": "", "stderr": f"Error: File not found at {file_path}", "return_code": -1}
+        return self.run_source(source, language, os.path.basename(file_path), use_pool=use_pool)
+
+    async def run_source_async(self, source: Union[str, bytes], language: str = "python", file_name: Optional[str] = None,
+                               use_pool: Optional[bool] = None) -> dict:
+        """Runs `run_source` on a worker thread so the event loop is never blocked."""
+        return await asyncio.to_thread(self.run_source, source, language, file_name, use_pool)
+
+    async def run_file_async(self, file_path: str, language: str = "python", use_pool: Optional[bool] = None) -> dict:
+        """Asynchronous counterpart of `run_file`."""
+        source = await asyncio.to_thread(_read_script, file_path)
+        if source is None:
+            return {"stdout": "", "stderr": f"Error: File not found at {file_path}", "return_code": -1}
+        return await self.run_source_async(source, language, os.path.basename(file_path), use_pool=use_pool)
+
+    def runtime_id(self, language: str) -> Optional[str]:
+        """Identifies the runtime a language runs on, for execution cache keys; None if unknown."""
+        return None
+
+    def runtime_version(self, language: str) -> Optional[str]:
+        """The interpreter version scripts run on, when it may differ from the host's; None otherwise."""
+        return None
+
+    def close(self):
+        """Releases any resources held by the backend."""
+
+
+# --- Shared Docker Executor ---
+class DockerExecutor(BaseExecutor):
+    """
+    Process-wide owner of a single Docker client, shared by every execution.
+
+    The client keeps a bounded HTTP connection pool to the daemon socket. It is
+    health-checked with a ping at most every `health_check_interval` seconds (or
+    right after a connection failure) and rebuilt when the daemon has restarted.
+    """
+
+    name = "docker"
+
+    def __init__(self, max_pool_size: int = DOCKER_MAX_POOL_SIZE, health_check_interval: float = DOCKER_HEALTH_CHECK_INTERVAL):
+        self.max_pool_size = max_pool_size
+        self.health_check_interval = health_check_interval
+        self._client = None
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+        self._pool: Optional[ContainerPool] = None
+        self._workers: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._readers: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.images = ImageManager(lambda: self.client)
+
+    def _connect(self):
+        logging.info("Connecting to the Docker daemon...")
+        client = docker.from_env(max_pool_size=self.max_pool_size)
+        self._checked_at = time.monotonic()
+        return client
+
+    def _is_healthy(self) -> bool:
+        try:
+            return bool(self._client.ping())
+        except (docker.errors.DockerException, requests.exceptions.RequestException) as e:
+            logging.warning(f"Docker daemon health check failed: {e}")
+            return False
+
+    def _rebuild(self):
+        old_client, self._client = self._client, None
+        if old_client is not None:
+            try:
+                old_client.close()
+            except Exception:
+                pass
+        self._client = self._connect()
+
+    @property
+    def client(self):
+        """The shared client, reconnected if the daemon stopped answering."""
+        with self._lock:
+            if self._client is None:
+                self._client = self._connect()
+            elif time.monotonic() - self._checked_at > self.health_check_interval:
+                if self._is_healthy():
+                    self._checked_at = time.monotonic()
+                else:
+                    logging.info("Rebuilding Docker client after failed health check.")
+                    self._rebuild()
+            return self._client
+
+    def mark_unhealthy(self):
+        """Forces a health check before the client is next used."""
+        with self._lock:
+            self._checked_at = 0.0
+
+    def runtime_version(self, language: str) -> Optional[str]:
+        """The version in the language image's tag, e.g. '3.10' for 'python:3.10-slim'."""
+        match = re.search(r':(\d+(?:\.\d+)*)', LANGUAGE_CONFIGS[language]["image"])
+        return match.group(1) if match else None
+
+    def runtime_id(self, language: str) -> Optional[str]:
+        """The language image's digest, so a re-pulled image never serves stale results."""
+        digest = self.images.digest(LANGUAGE_CONFIGS[language]["image"])
+        return f"docker:{digest}" if digest else None
+
+    @property
+    def pool(self) -> ContainerPool:
+        """The warm container pool, created and pre-started on first use."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ContainerPool(lambda: self.client)
+                threading.Thread(target=_warm_up_quietly, args=(self._pool,), daemon=True).start()
+            return self._pool
+
+    def _run_pooled(self, source: bytes, file_name: str, language: str) -> dict:
+        try:
+            return self.pool.run(source, file_name, language)
+        except Exception as e:
+            self._note_failure(e)
+            logging.error(f"An unexpected error occurred during pooled execution: {e}")
+            return {"stdout": "", "stderr": str(e), "return_code": -1}
+
+    def _start_container(self, source: bytes, file_name: str, language: str):
+        """
+        Creates a container, copies the script in as an in-memory tar archive,
+        then starts it with its output already attached. Nothing on the host
+        filesystem is mounted or written.
+        """
+        config = LANGUAGE_CONFIGS[language]
+        image_name = config["image"]
+        self.images.ensure(image_name)
+
         logging.info(f"Running {language} script '{file_name}' in a Docker container...")
-        container = client.containers.run(
+        container = self.client.containers.create(
             image=image_name,
-            command=command,
-            volumes={volume_path: {'bind': '/app', 'mode': 'rw'}},
+            command=[config["command"], file_name],
             working_dir="/app",
-            detach=True,
-            remove=False
+            **_container_limits(get_limits(language))
         )
+        try:
+            container.put_archive("/", _make_archive({f"app/{file_name}": source}))
+            # Attaching before start means no output is missed and both streams
+            # arrive demultiplexed over a single connection.
+            stream = container.attach(stdout=True, stderr=True, stream=True, logs=True, demux=True)
+            container.start()
+        except Exception:
+            self._remove_container(container)
+            raise
+        return container, stream
 
-        result = container.wait()
-        return_code = result['StatusCode']
+    def _kill_container(self, container):
+        try:
+            container.kill()
+        except docker.errors.APIError as e:
+            logging.warning(f"Could not kill container {container.short_id}: {e}")
 
-        stdout = container.logs(stdout=True, stderr=False).decode('utf-8')
-        stderr = container.logs(stdout=False, stderr=True).decode('utf-8')
-        
-    except docker.errors.ImageNotFound:
-        logging.error(f"Docker image '{image_name}' not found.")
-        return {"stdout": "", "stderr": f"Docker image {image_name} not found.", "return_code": -1}
-        
-    except Exception as e:
-        logging.error(f"An unexpected error occurred during Docker execution: {e}")
-        return {"stdout": "", "stderr": str(e), "return_code": -1}
+    def _collect_result(self, container, language: str, return_code: int, started_at: float,
+                        output: Tuple[_BoundedBuffer, _BoundedBuffer], timed_out: bool = False) -> dict:
+        oom_killed = False
+        if not timed_out:
+            container.reload()
+            oom_killed = bool(container.attrs.get("State", {}).get("OOMKilled"))
+        stdout, stderr = output
+        return _build_result(
+            stdout, stderr, return_code, get_limits(language),
+            timed_out=timed_out,
+            oom_killed=oom_killed,
+            timings={"queue_wait": 0.0, "exec_time": time.monotonic() - started_at}
+        )
+
+    def _error_result(self, error: Exception, language: str) -> dict:
+        image_name = LANGUAGE_CONFIGS[language]["image"]
+        if isinstance(error, docker.errors.ImageNotFound):
+            # The image was removed after it was marked ready.
+            self.images.invalidate(image_name)
+            error = ImageNotPreparedError(image_name)
+        if isinstance(error, ImageNotPreparedError):
+            logging.error(str(error))
+            return {"stdout": "", "stderr": str(error), "return_code": -1}
+
+        self._note_failure(error)
+        logging.error(f"An unexpected error occurred during Docker execution: {error}")
+        return {"stdout": "", "stderr": str(error), "return_code": -1}
+
+    def _remove_container(self, container):
+        try:
+            container.remove(force=True)
+            logging.info(f"Successfully removed container {container.short_id}.")
+        except docker.errors.APIError as e:
+            logging.warning(f"Could not remove container {container.short_id}: {e}")
 
-    finally:
-        if container:
+    def run_source(self, source: Union[str, bytes], language: str = "python", file_name: Optional[str] = None,
+                   use_pool: Optional[bool] = None) -> dict:
+        """
+        Executes source code in a secure, isolated Docker container based on the language.
+
+        Args:
+            source (str | bytes): The script contents.
+            language (str): The programming language ('python' or 'javascript').
+            file_name (str): The name the script gets inside the container.
+                Defaults to 'main.<extension>'.
+            use_pool (bool): Run in a warm pooled container instead of a fresh one.
+                Defaults to the ACDA_WARM_POOL setting.
+
+        Returns:
+            dict: A dictionary with 'stdout', 'stderr', 'return_code', 'reason'
+                (None, 'timeout', 'oom' or 'output_truncated') and 'timings'.
+        """
+        error = self._validate(language)
+        if error:
+            return error
+        source, file_name = _normalize_source(source, file_name, language)
+        if USE_WARM_POOL if use_pool is None else use_pool:
+            return self._run_pooled(source, file_name, language)
+
+        container = None
+        started_at = time.monotonic()
+        try:
+            container, stream = self._start_container(source, file_name, language)
+            limits = get_limits(language)
+            timed_out = threading.Event()
+
+            def kill_on_timeout():
+                timed_out.set()
+                self._kill_container(container)
+
+            # The output stream ends when the container exits, so the watchdog
+            # killing it also bounds the capture below.
+            watchdog = threading.Timer(limits["timeout"], kill_on_timeout)
+            watchdog.start()
             try:
-                container.remove()
-                logging.info(f"Successfully removed container {container.short_id}.")
-            except docker.errors.APIError as e:
-                logging.warning(f"Could not remove container {container.short_id}: {e}")
+                output = _capture_output(stream, limits["output_limit"])
+            finally:
+                watchdog.cancel()
+            return_code = container.wait()['StatusCode']
+            return self._collect_result(container, language, return_code, started_at, output, timed_out.is_set())
+        except Exception as e:
+            return self._error_result(e, language)
+        finally:
+            if container:
+                self._remove_container(container)
 
-    return {
-        "stdout": stdout,
-        "stderr": stderr,
-        "return_code": return_code
-    }
+    @property
+    def workers(self) -> concurrent.futures.ThreadPoolExecutor:
+        """Bounded thread pool for the blocking Docker calls made by the async API."""
+        with self._lock:
+            if self._workers is None:
+                self._workers = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=ASYNC_MAX_WORKERS, thread_name_prefix="acda-docker"
+                )
+            return self._workers
+
+    @property
+    def readers(self) -> concurrent.futures.ThreadPoolExecutor:
+        """
+        Thread pool that drains output streams. A stream holds its thread until
+        the container exits, so it is kept apart from `workers`, which must stay
+        free for the short state polls.
+        """
+        with self._lock:
+            if self._readers is None:
+                self._readers = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=ASYNC_MAX_WORKERS, thread_name_prefix="acda-docker-output"
+                )
+            return self._readers
+
+    async def _wait_async(self, container) -> int:
+        # Poll the container state instead of holding a thread in a blocking `wait()`.
+        loop = asyncio.get_running_loop()
+        delay = ASYNC_POLL_INTERVAL
+        while True:
+            await loop.run_in_executor(self.workers, container.reload)
+            state = container.attrs.get("State", {})
+            if state.get("Status") in ("exited", "dead"):
+                return state.get("ExitCode", -1)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, ASYNC_MAX_POLL_INTERVAL)
+
+    async def run_source_async(self, source: Union[str, bytes], language: str = "python", file_name: Optional[str] = None,
+                               use_pool: Optional[bool] = None) -> dict:
+        """
+        Asynchronous counterpart of `run_source` that never blocks the event loop.
+
+        Returns:
+            dict: A dictionary with 'stdout', 'stderr', 'return_code', 'reason' and 'timings'.
+        """
+        error = self._validate(language)
+        if error:
+            return error
+        source, file_name = _normalize_source(source, file_name, language)
+        loop = asyncio.get_running_loop()
+        if USE_WARM_POOL if use_pool is None else use_pool:
+            return await loop.run_in_executor(self.workers, self._run_pooled, source, file_name, language)
+
+        container = None
+        started_at = time.monotonic()
+        try:
+            container, stream = await loop.run_in_executor(self.workers, self._start_container, source, file_name, language)
+            limits = get_limits(language)
+            timed_out = threading.Event()
+
+            def kill_on_timeout():
+                timed_out.set()
+                self._kill_container(container)
+
+            # The watchdog runs on its own timer thread, so a timeout is enforced
+            # even when every pool thread is busy with other hung runs.
+            watchdog = threading.Timer(limits["timeout"], kill_on_timeout)
+            watchdog.start()
+            try:
+                capture = loop.run_in_executor(self.readers, _capture_output, stream, limits["output_limit"])
+                return_code = await self._wait_async(container)
+                output = await capture
+            finally:
+                watchdog.cancel()
+            return await loop.run_in_executor(
+                self.workers, self._collect_result, container, language, return_code, started_at, output, timed_out.is_set()
+            )
+        except Exception as e:
+            return self._error_result(e, language)
+        finally:
+            if container:
+                await loop.run_in_executor(self.workers, self._remove_container, container)
+
+    def _note_failure(self, error: Exception):
+        if isinstance(error, (requests.exceptions.ConnectionError, docker.errors.DockerException)):
+            self.mark_unhealthy()
+
+    def close(self):
+        """Shuts down the warm pool and closes the shared client."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+            for workers in (self._workers, self._readers):
+                if workers is not None:
+                    workers.shutdown(wait=False)
+            self._workers = self._readers = None
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+
+# --- Local Subprocess Executor ---
+class LocalExecutor(BaseExecutor):
+    """
+    Runs scripts directly in a host subprocess, for trusted code only (e.g. CI
+    triage) where the container round-trip dominates the debug loop.
+
+    Each run gets a private temp directory, rlimits on CPU time, address space
+    and open files, the wall-clock timeout and the same per-stream output caps
+    as the Docker sandbox. There is no filesystem or network isolation.
+    """
+
+    name = "local"
+
+    def runtime_id(self, language: str) -> Optional[str]:
+        """The interpreter path and modification time, which changes when it is upgraded."""
+        config = LANGUAGE_CONFIGS[language]
+        interpreter = config.get("local_command") or shutil.which(config["command"])
+        if not interpreter:
+            return None
+        try:
+            return f"local:{interpreter}:{os.stat(interpreter).st_mtime_ns}"
+        except OSError:
+            return None
+
+    def _command(self, interpreter: str, file_name: str, limits: dict) -> List[str]:
+        """
+        The command line for a run. The rlimits are applied by a tiny launcher
+        that then execs the interpreter: `preexec_fn` is unsafe in a process
+        with other threads (the child can deadlock before exec), which is the
+        case in the threaded batch runner.
+        """
+        if resource is None:
+            return [interpreter, file_name]
+        rlimits = {"RLIMIT_CPU": int(limits["timeout"]) + 1, "RLIMIT_NOFILE": limits["open_files"]}
+        if limits.get("address_space"):
+            rlimits["RLIMIT_AS"] = _parse_bytes(limits["address_space"])
+        spec = ",".join(f"{name}={value}" for name, value in rlimits.items())
+        return [sys.executable, "-S", "-c", _RLIMIT_LAUNCHER, spec, interpreter, file_name]
+
+    def run_source(self, source: Union[str, bytes], language: str = "python", file_name: Optional[str] = None,
+                   use_pool: Optional[bool] = None) -> dict:
+        """
+        Executes source code in a local subprocess. `use_pool` is ignored.
+
+        Returns:
+            dict: A dictionary with 'stdout', 'stderr', 'return_code', 'reason' and 'timings'.
+        """
+        error = self._validate(language)
+        if error:
+            return error
+        source, file_name = _normalize_source(source, file_name, language)
+        config = LANGUAGE_CONFIGS[language]
+        limits = get_limits(language)
+        interpreter = config.get("local_command") or shutil.which(config["command"])
+        if not interpreter:
+            return {"stdout": "", "stderr": f"Interpreter '{config['command']}' not found on this host.", "return_code": -1}
+
+        started_at = time.monotonic()
+        with tempfile.TemporaryDirectory(prefix="acda-") as workdir:
+            with open(os.path.join(workdir, file_name), 'wb') as f:
+                f.write(source)
+
+            logging.info(f"Running {language} script '{file_name}' in a local subprocess...")
+            try:
+                process = subprocess.Popen(
+                    self._command(interpreter, file_name, limits),
+                    cwd=workdir,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    env={"PATH": os.environ.get("PATH", ""), "HOME": workdir, "LANG": "C.UTF-8"},
+                    start_new_session=True
+                )
+            except OSError as e:
+                logging.error(f"Could not start local interpreter: {e}")
+                return {"stdout": "", "stderr": str(e), "return_code": -1}
+
+            stdout = _BoundedBuffer(limits["output_limit"])
+            stderr = _BoundedBuffer(limits["output_limit"])
+            readers = [
+                threading.Thread(target=_drain_pipe, args=(process.stdout, stdout), daemon=True),
+                threading.Thread(target=_drain_pipe, args=(process.stderr, stderr), daemon=True)
+            ]
+            for reader in readers:
+                reader.start()
+
+            timed_out = False
+            try:
+                process.wait(timeout=limits["timeout"])
+            except subprocess.TimeoutExpired:
+                timed_out = True
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                process.wait()
+            for reader in readers:
+                reader.join()
+
+        return_code = process.returncode
+        # Exceeding RLIMIT_CPU delivers SIGXCPU, which is a timeout too.
+        timed_out = timed_out or return_code == -getattr(signal, "SIGXCPU", 0)
+        stderr_tail = bytes(stderr.tail[-256:] or stderr.head[-256:])
+        oom_killed = b"MemoryError" in stderr_tail or b"heap out of memory" in stderr_tail
+        return _build_result(
+            stdout, stderr, return_code, limits,
+            timed_out=timed_out,
+            oom_killed=oom_killed,
+            timings={"queue_wait": 0.0, "exec_time": time.monotonic() - started_at}
+        )
+
+
+# Sets the rlimits given as `NAME=value,...` in argv[1], then execs argv[2:].
+_RLIMIT_LAUNCHER = """
+import os, resource, sys
+for item in sys.argv[1].split(","):
+    name, value = item.split("=")
+    resource.setrlimit(getattr(resource, name), (int(value), int(value)))
+os.execv(sys.argv[2], sys.argv[2:])
+"""
+
+def _drain_pipe(pipe, buffer: _BoundedBuffer):
+    with pipe:
+        for chunk in iter(lambda: pipe.read(8192), b""):
+            buffer.write(chunk)
+
+def _parse_bytes(size: Union[str, int]) -> int:
+    """Converts Docker-style sizes such as '256m' into bytes."""
+    if isinstance(size, int):
+        return size
+    units = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+    size = size.strip().lower()
+    if size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+
+_docker_executor: Optional[DockerExecutor] = None
+_docker_executor_lock = threading.Lock()
+
+def get_docker_executor() -> DockerExecutor:
+    """Returns the process-wide Docker executor, creating it on first use."""
+    global _docker_executor
+    with _docker_executor_lock:
+        if _docker_executor is None:
+            _docker_executor = DockerExecutor()
+            atexit.register(_docker_executor.close)
+        return _docker_executor
+
+_local_executor: Optional[LocalExecutor] = None
+
+def get_executor(backend: Optional[str] = None) -> BaseExecutor:
+    """
+    Returns the process-wide executor for a backend ('docker' or 'local').
+    Defaults to the ACDA_EXECUTOR setting, or the backend chosen with
+    `set_executor_backend`.
+    """
+    global _local_executor
+    backend = backend or EXECUTOR_BACKEND
+    if backend == "docker":
+        return get_docker_executor()
+    if backend == "local":
+        with _docker_executor_lock:
+            if _local_executor is None:
+                _local_executor = LocalExecutor()
+            return _local_executor
+    raise ValueError(f"Unknown executor backend: {backend}")
+
+def set_executor_backend(backend: str):
+    """Selects the default backend used by `run_code_in_docker` and friends."""
+    global EXECUTOR_BACKEND
+    if backend not in EXECUTOR_BACKENDS:
+        raise ValueError(f"Unknown executor backend: {backend}")
+    EXECUTOR_BACKEND = backend
+
+def get_image_manager() -> ImageManager:
+    """Returns the process-wide image manager."""
+    return get_docker_executor().images
+
+def get_container_pool() -> ContainerPool:
+    """Returns the process-wide warm container pool."""
+    return get_docker_executor().pool
+
+# --- Execution Cache ---
+_execution_cache: Optional[SQLiteCache] = None
+_execution_cache_lock = threading.Lock()
+
+def get_execution_cache() -> SQLiteCache:
+    """Returns the process-wide execution result cache stored in EXECUTION_CACHE_DIR."""
+    global _execution_cache
+    with _execution_cache_lock:
+        if _execution_cache is None:
+            _execution_cache = SQLiteCache(
+                os.path.join(EXECUTION_CACHE_DIR, CACHE_DB_FILE), table="executions",
+                max_entries=EXECUTION_CACHE_MAX_ENTRIES, max_bytes=EXECUTION_CACHE_MAX_BYTES, ttl=EXECUTION_CACHE_TTL
+            )
+        return _execution_cache
+
+def execution_cache_key(source: Union[str, bytes], language: str, file_name: Optional[str],
+                        executor: BaseExecutor) -> Optional[str]:
+    """
+    Content-addresses one execution: the script bytes and name, the language,
+    the runtime (image digest or interpreter) and the effective limits.
+
+    Returns:
+        str: A hex digest, or None if the runtime cannot be identified (then
+            the run is not cached).
+    """
+    if language not in LANGUAGE_CONFIGS:
+        return None
+    runtime = executor.runtime_id(language)
+    if runtime is None:
+        return None
+    source, file_name = _normalize_source(source, file_name, language)
+    header = json.dumps([language, file_name, runtime, get_limits(language)], sort_keys=True)
+    return hashlib.sha256(header.encode() + b"\0" + source).hexdigest()
+
+def _use_cache(enabled: Optional[bool]) -> bool:
+    return EXECUTION_CACHE if enabled is None else enabled
+
+def _cached_result(key: Optional[str]) -> Optional[dict]:
+    if key is None:
+        return None
+    started_at = time.perf_counter()
+    cached = get_execution_cache().get(key)
+    if cached is None:
+        return None
+    lookup = time.perf_counter() - started_at
+    logging.info(f"Execution cache hit in {lookup * 1e6:.0f} us; skipping execution.")
+    return {**cached, "cached": True, "timings": {"queue_wait": 0.0, "exec_time": 0.0, "cache_lookup": lookup}}
+
+def is_cacheable(result: dict) -> bool:
+    """
+    False for timeouts, OOM kills and executor errors: they depend on load
+    rather than on the code, so they must never be reused.
+    """
+    return result.get("return_code", -1) >= 0 and result.get("reason") not in (REASON_TIMEOUT, REASON_OOM)
+
+def _store_result(key: Optional[str], result: dict):
+    """Caches a finished run, unless its outcome is transient (see `is_cacheable`)."""
+    if key is None or not is_cacheable(result):
+        return
+    get_execution_cache().set(key, {field: result.get(field) for field in ("stdout", "stderr", "return_code", "reason")})
+
+def precheck_source(source: Union[str, bytes], language: str = "python", file_name: Optional[str] = None) -> Optional[dict]:
+    """
+    Statically checks a script against the selected backend's interpreter
+    version; the check is skipped when the host's interpreter is older than
+    the sandbox's (e.g. Python 3.9 on the host, 3.10 in the image).
+    """
+    if language not in LANGUAGE_CONFIGS:
+        return None
+    return static_precheck(source, language, file_name, get_executor().runtime_version(language))
+
+def _precheck(source: Union[str, bytes], language: str, file_name: Optional[str], enabled: Optional[bool]) -> Optional[dict]:
+    """Runs the static pre-check unless disabled; a result means the script need not be executed."""
+    if not (PRECHECK if enabled is None else enabled):
+        return None
+    return precheck_source(source, language, file_name)
+
+def run_code_in_docker(file_path: str, language: str = "python", use_pool: Optional[bool] = None,
+                       precheck: Optional[bool] = None, cache: Optional[bool] = None) -> dict:
+    """
+    Executes a script in a secure, isolated Docker container based on the language.
+    Compatibility wrapper over the selected executor backend (Docker by default).
+
+    Args:
+        file_path (str): The path to the script to execute.
+        language (str): The programming language ('python' or 'javascript').
+        use_pool (bool): Run in a warm pooled container instead of a fresh one.
+        precheck (bool): Compile the script statically first and skip the run
+            on a syntax error (default: ACDA_PRECHECK).
+        cache (bool): Reuse the result of an identical earlier run (default:
+            ACDA_EXEC_CACHE). Pass False for nondeterministic scripts.
+
+    Returns:
+        dict: A dictionary with 'stdout', 'stderr', 'return_code' and 'timings'.
+    """
+    source = _read_script(file_path)
+    if source is None:
+        return {"stdout": "", "stderr": f"Error: File not found at {file_path}", "return_code": -1}
+    return run_source_in_docker(source, language, os.path.basename(file_path), use_pool=use_pool, precheck=precheck, cache=cache)
+
+def run_source_in_docker(source: Union[str, bytes], language: str = "python", file_name: Optional[str] = None,
+                         use_pool: Optional[bool] = None, precheck: Optional[bool] = None,
+                         cache: Optional[bool] = None) -> dict:
+    """
+    Executes in-memory source code in Docker without touching the host filesystem.
+
+    Args:
+        source (str | bytes): The script contents.
+        language (str): The programming language ('python' or 'javascript').
+        file_name (str): The name the script gets inside the container.
+        use_pool (bool): Run in a warm pooled container instead of a fresh one.
+        precheck (bool): Compile the script statically first and skip the run
+            on a syntax error (default: ACDA_PRECHECK).
+        cache (bool): Reuse the result of an identical earlier run (default:
+            ACDA_EXEC_CACHE). Pass False for nondeterministic scripts.
+
+    Returns:
+        dict: A dictionary with 'stdout', 'stderr', 'return_code', 'reason' and
+            'timings'; 'cached' is True when it came from the execution cache.
+    """
+    checked = _precheck(source, language, file_name, precheck)
+    if checked:
+        return checked
+    executor = get_executor()
+    key = execution_cache_key(source, language, file_name, executor) if _use_cache(cache) else None
+    result = _cached_result(key)
+    if result is None:
+        result = executor.run_source(source, language, file_name, use_pool=use_pool)
+        _store_result(key, result)
+    return result
+
+# --- Async API ---
+async def run_code(file_path: str, language: str = "python", use_pool: Optional[bool] = None,
+                   precheck: Optional[bool] = None, cache: Optional[bool] = None) -> dict:
+    """
+    Executes a script in Docker without blocking the event loop.
+
+    Args:
+        file_path (str): The path to the script to execute.
+        language (str): The programming language ('python' or 'javascript').
+        use_pool (bool): Run in a warm pooled container instead of a fresh one.
+        precheck (bool): Compile the script statically first (default: ACDA_PRECHECK).
+        cache (bool): Reuse the result of an identical earlier run (default: ACDA_EXEC_CACHE).
+
+    Returns:
+        dict: A dictionary with 'stdout', 'stderr', 'return_code' and 'timings'.
+    """
+    source = await asyncio.to_thread(_read_script, file_path)
+    if source is None:
+        return {"stdout": "", "stderr": f"Error: File not found at {file_path}", "return_code": -1}
+    return await run_source(source, language, os.path.basename(file_path), use_pool=use_pool, precheck=precheck, cache=cache)
+
+async def run_source(source: Union[str, bytes], language: str = "python", file_name: Optional[str] = None,
+                     use_pool: Optional[bool] = None, precheck: Optional[bool] = None,
+                     cache: Optional[bool] = None) -> dict:
+    """Executes in-memory source code in Docker without blocking the event loop."""
+    # The JavaScript pre-check is a pipe round trip to the Node checker, so it runs off the event loop.
+    checked = await asyncio.to_thread(_precheck, source, language, file_name, precheck)
+    if checked:
+        return checked
+    executor = get_executor()
+    if not _use_cache(cache):
+        return await executor.run_source_async(source, language, file_name, use_pool=use_pool)
+    # Key and lookup may touch the Docker API and SQLite, so they run off the event loop.
+    key = await asyncio.to_thread(execution_cache_key, source, language, file_name, executor)
+    result = await asyncio.to_thread(_cached_result, key)
+    if result is None:
+        result = await executor.run_source_async(source, language, file_name, use_pool=use_pool)
+        await asyncio.to_thread(_store_result, key, result)
+    return result
+
+async def run_many(jobs: Iterable[Union[str, Tuple[str, str]]], concurrency: int = ASYNC_CONCURRENCY, use_pool: Optional[bool] = None) -> List[dict]:
+    """
+    Executes many scripts concurrently, at most `concurrency` at a time.
+
+    Args:
+        jobs (iterable): File paths, (file_path, language) tuples, or dicts with
+            'source', 'language' and optional 'file_name' for in-memory code.
+        concurrency (int): Maximum number of scripts running at once.
+        use_pool (bool): Run in warm pooled containers instead of fresh ones.
+
+    Returns:
+        list: One result dict per job, in the order the jobs were given.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(job):
+        async with semaphore:
+            if isinstance(job, dict):
+                return await run_source(job["source"], job.get("language", "python"), job.get("file_name"), use_pool=use_pool)
+            file_path, language = (job, "python") if isinstance(job, str) else job
+            return await run_code(file_path, language, use_pool=use_pool)
+
+    return list(await asyncio.gather(*(run_one(job) for job in jobs)))
 
 
 
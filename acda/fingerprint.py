@@ -0,0 +1,117 @@
+import hashlib
+import io
+import re
+import tokenize
+from typing import Dict, List
+
+# --- Precompiled Patterns ---
+_HEX_ADDRESS_RE = re.compile(r'\b0x[0-9a-fA-F]+\b')
+# Absolute POSIX or Windows paths; only the final component is kept.
+_PATH_RE = re.compile(r'(?:[A-Za-z]:)?(?:[\\/][^\s\\/\'"():,]+)+[\\/](?P<name>[^\s\\/\'"():,]+)')
+_LINE_REF_RE = re.compile(r'\bline \d+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+_PYTHON_SKIPPED_TOKENS = {tokenize.COMMENT, tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER}
+
+
+def normalize_text(text: str) -> str:
+    """
+    Drops the volatile parts of an error message or trace fragment: memory
+    addresses, directory prefixes of paths (temp dirs, container mounts) and
+    line references, then collapses whitespace.
+    """
+    text = _HEX_ADDRESS_RE.sub("0x?", text)
+    text = _PATH_RE.sub(lambda match: match.group("name"), text)
+    text = _LINE_REF_RE.sub("line ?", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _normalize_python(code: str) -> str:
+    """Token stream without comments or formatting; indentation kept as markers."""
+    parts: List[str] = []
+    last_row = 0
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(code).readline):
+            last_row = token.end[0]
+            if token.type in _PYTHON_SKIPPED_TOKENS:
+                continue
+            if token.type == tokenize.NEWLINE:
+                parts.append(";")
+            elif token.type == tokenize.INDENT:
+                parts.append("{")
+            elif token.type == tokenize.DEDENT:
+                parts.append("}")
+            else:
+                parts.append(token.string)
+    except (tokenize.TokenError, SyntaxError):
+        # Broken code (the common case here): keep the untokenizable rest verbatim.
+        rest = "".join(code.splitlines(keepends=True)[last_row:])
+        parts.append(_WHITESPACE_RE.sub(" ", rest).strip())
+    return " ".join(part for part in parts if part)
+
+
+def _normalize_javascript(code: str) -> str:
+    """Drops comments and collapses whitespace outside string literals."""
+    out: List[str] = []
+    i, length = 0, len(code)
+    pending_space = False
+    while i < length:
+        char = code[i]
+        if char in "\"'`":
+            end = i + 1
+            while end < length and code[end] != char:
+                end += 2 if code[end] == "\\" else 1
+            if pending_space and out:
+                out.append(" ")
+            pending_space = False
+            out.append(code[i:end + 1])
+            i = end + 1
+        elif code.startswith("//", i):
+            newline = code.find("\n", i)
+            i = length if newline == -1 else newline
+        elif code.startswith("/*", i):
+            close = code.find("*/", i + 2)
+            i = length if close == -1 else close + 2
+            pending_space = True
+        elif char.isspace():
+            pending_space = True
+            i += 1
+        else:
+            if pending_space and out:
+                out.append(" ")
+            pending_space = False
+            out.append(char)
+            i += 1
+    return "".join(out)
+
+
+NORMALIZERS = {
+    "python": _normalize_python,
+    "javascript": _normalize_javascript,
+}
+
+
+def normalize_code(code: str, language: str = "python") -> str:
+    """Returns a comment- and formatting-insensitive form of the source code."""
+    normalizer = NORMALIZERS.get(language)
+    if normalizer is None:
+        return _WHITESPACE_RE.sub(" ", code).strip()
+    return normalizer(code)
+
+
+def fingerprint(code_content: str, error_details: Dict[str, str], language: str = "python") -> str:
+    """
+    Creates a SHA-256 key from the error type, the normalized error message and
+    the normalized source. Unlike the raw key it ignores comments, formatting,
+    temp paths and addresses, so equivalent failures map to the same entry.
+    """
+    parts = [
+        language,
+        error_details.get('error_type', ''),
+        normalize_text(error_details.get('error_message', '')),
+        normalize_code(code_content, language),
+    ]
+    # A combined fix for several errors is a different answer than a fix for the first one.
+    for error in error_details.get('related_errors', []):
+        parts.append(f"{error.get('error_type', '')}:{normalize_text(error.get('error_message', ''))}")
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
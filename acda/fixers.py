@@ -0,0 +1,250 @@
+import builtins
+import keyword
+import logging
+import re
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# --- Constants ---
+MAX_NAME_CANDIDATES = 3  # Nearest identifiers proposed per undefined name.
+
+_PY_UNDEFINED_NAME_RE = re.compile(r"name '(?P<name>\w+)' is not defined")
+_JS_UNDEFINED_NAME_RE = re.compile(r"(?P<name>[A-Za-z_$][\w$]*) is not defined")
+_DID_YOU_MEAN_RE = re.compile(r"Did you mean:? '?(?P<name>[A-Za-z_$][\w$]*)'?\??")
+
+_PY_NAME_RE = re.compile(r'[A-Za-z_]\w*')
+_JS_NAME_RE = re.compile(r'[A-Za-z_$][\w$]*')
+
+JS_KEYWORDS = {
+    "break", "case", "catch", "class", "const", "continue", "debugger", "default", "delete", "do",
+    "else", "export", "extends", "false", "finally", "for", "function", "if", "import", "in",
+    "instanceof", "let", "new", "null", "return", "super", "switch", "this", "throw", "true", "try",
+    "typeof", "undefined", "var", "void", "while", "with", "yield", "async", "await", "of",
+}
+JS_GLOBALS = {
+    "console", "Math", "JSON", "Object", "Array", "String", "Number", "Boolean", "Symbol", "BigInt",
+    "Date", "RegExp", "Error", "TypeError", "RangeError", "Promise", "Map", "Set", "WeakMap", "WeakSet",
+    "parseInt", "parseFloat", "isNaN", "isFinite", "setTimeout", "setInterval", "clearTimeout",
+    "clearInterval", "require", "module", "exports", "process", "Buffer", "globalThis", "Infinity", "NaN",
+}
+
+_OPENERS = {"(": ")", "[": "]", "{": "}"}
+_CLOSERS = {")": "(", "]": "[", "}": "{"}
+# A line ending in one of these continues on the next line, so its brackets stay open.
+_CONTINUATION_CHARS = set("([{,+-*/%=<>&|^\\:.?")
+
+Fixer = Callable[[str, Dict[str, str], str], List[Dict[str, str]]]
+
+
+# --- Helpers ---
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (a transposition counts as one edit), capped at limit + 1."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+def code_spans(code: str, language: str) -> List[Tuple[int, int]]:
+    """Returns the (start, end) offsets of the code outside string literals and comments."""
+    comment = "#" if language == "python" else "//"
+    spans, start, i, length = [], 0, 0, len(code)
+    while i < length:
+        if code.startswith(comment, i):
+            spans.append((start, i))
+            newline = code.find("\n", i)
+            i = start = length if newline == -1 else newline
+        elif code[i] in "\"'`":
+            spans.append((start, i))
+            quote = code[i] * 3 if language == "python" and code.startswith(code[i] * 3, i) else code[i]
+            end = i + len(quote)
+            while end < length and not code.startswith(quote, end):
+                if code[end] == "\n" and len(quote) == 1 and quote != "`":
+                    break
+                end += 2 if code[end] == "\\" else 1
+            i = start = min(end + len(quote), length)
+        else:
+            i += 1
+    spans.append((start, length))
+    return [span for span in spans if span[0] < span[1]]
+
+def identifiers(code: str, language: str) -> List[Tuple[str, int, int]]:
+    """Identifier occurrences outside strings and comments, excluding attribute names after '.'."""
+    pattern = _PY_NAME_RE if language == "python" else _JS_NAME_RE
+    found = []
+    for start, end in code_spans(code, language):
+        for match in pattern.finditer(code, start, end):
+            before = code[:match.start()].rstrip()
+            if before.endswith(".") or match.group()[0].isdigit():
+                continue
+            found.append((match.group(), match.start(), match.end()))
+    return found
+
+
+# --- Rules ---
+def fix_undefined_name(code_content: str, error_details: Dict[str, str], language: str) -> List[Dict[str, str]]:
+    """
+    NameError / ReferenceError: replaces the undefined identifier with the
+    nearest name (edit distance) defined in the script or provided by the runtime.
+    """
+    pattern = _PY_UNDEFINED_NAME_RE if language == "python" else _JS_UNDEFINED_NAME_RE
+    match = pattern.search(error_details.get("error_message", ""))
+    if not match:
+        return []
+    name = match.group("name")
+
+    occurrences = identifiers(code_content, language)
+    if language == "python":
+        reserved, runtime_names = set(keyword.kwlist), set(dir(builtins))
+    else:
+        reserved, runtime_names = JS_KEYWORDS, JS_GLOBALS
+    script_names = {ident for ident, _, _ in occurrences} - reserved - {name}
+
+    limit = 1 if len(name) <= 4 else 2
+    ranked = []
+    hint = _DID_YOU_MEAN_RE.search(error_details.get("error_message", ""))
+    for candidate in script_names | (runtime_names - reserved):
+        if hint and candidate == hint.group("name"):
+            distance = 0
+        else:
+            distance = _edit_distance(name, candidate, limit)
+        if distance <= limit:
+            # Names the script itself uses win ties over runtime globals.
+            ranked.append((distance, candidate not in script_names, candidate))
+    ranked.sort()
+
+    candidates = []
+    for _, _, replacement in ranked[:MAX_NAME_CANDIDATES]:
+        parts, last = [], 0
+        for ident, start, end in occurrences:
+            if ident == name:
+                parts += [code_content[last:start], replacement]
+                last = end
+        parts.append(code_content[last:])
+        candidates.append({
+            "explanation": f"`{name}` is not defined; it looks like a misspelling of `{replacement}`, so every use of `{name}` was renamed.",
+            "code": "".join(parts),
+        })
+    return candidates
+
+def _line_indent(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+def balance_delimiters(code_content: str, error_details: Dict[str, str], language: str) -> List[Dict[str, str]]:
+    """
+    SyntaxError: closes single-line strings that run to the end of their line
+    and brackets that are still open where the statement visibly ends (the
+    next line is not more indented and does not start with a closer, or EOF).
+    """
+    if "SyntaxError" not in error_details.get("error_type", ""):
+        return []
+    comment = "#" if language == "python" else "//"
+    lines = code_content.split("\n")
+    stack: List[str] = []
+    multiline_quote: Optional[str] = None
+    changes = []
+
+    for index, line in enumerate(lines):
+        i, code_end = 0, len(line)
+        quote = multiline_quote
+        while i < len(line):
+            if quote:
+                if line.startswith(quote, i):
+                    i += len(quote)
+                    quote = None
+                    continue
+                i += 2 if line[i] == "\\" else 1
+                continue
+            char = line[i]
+            if line.startswith(comment, i):
+                code_end = i
+                break
+            if char in "\"'`":
+                triple = char * 3
+                quote = triple if language == "python" and line.startswith(triple, i) else char
+                i += len(quote)
+                continue
+            if char in _OPENERS:
+                stack.append(char)
+            elif char in _CLOSERS and stack and stack[-1] == _CLOSERS[char]:
+                stack.pop()
+            i += 1
+
+        code_part = line[:code_end].rstrip()
+        suffix = ""
+        if quote and len(quote) == 1 and quote != "`":
+            # Single-line string left open: close it at the end of the line.
+            suffix += quote
+            quote = None
+        multiline_quote = quote
+
+        if stack and code_part and not multiline_quote:
+            following = next((l for l in lines[index + 1:] if l.strip()), None)
+            last_char = (code_part + suffix).rstrip()[-1:] if code_part else ""
+            statement_ends = following is None or (
+                _line_indent(following) <= _line_indent(line)
+                and following.lstrip()[0] not in _CLOSERS
+                and (suffix or last_char not in _CONTINUATION_CHARS)
+            )
+            if statement_ends:
+                suffix += "".join(_OPENERS[opener] for opener in reversed(stack))
+                stack.clear()
+
+        if suffix:
+            lines[index] = code_part + suffix + line[len(code_part):]
+            changes.append((index + 1, suffix))
+
+    if multiline_quote:
+        lines.append(multiline_quote)
+        changes.append((len(lines), multiline_quote))
+    if not changes:
+        return []
+    where = ", ".join(f"`{suffix}` on line {line_number}" for line_number, suffix in changes)
+    return [{
+        "explanation": f"The script has unbalanced brackets or quotes; added the missing closing delimiters: {where}.",
+        "code": "\n".join(lines),
+    }]
+
+
+# --- Registry ---
+FIXERS: Dict[str, List[Fixer]] = {
+    "python": [fix_undefined_name, balance_delimiters],
+    "javascript": [fix_undefined_name, balance_delimiters],
+}
+
+def register_fixer(fixer: Fixer, languages: Tuple[str, ...] = ("python", "javascript")):
+    """Adds a rule to the fixer stage. A rule returns candidate dicts with 'explanation' and 'code'."""
+    for language in languages:
+        FIXERS.setdefault(language, []).append(fixer)
+
+def propose_rule_fixes(code_content: str, error_details: Dict[str, str], language: str = "python") -> List[Dict[str, str]]:
+    """
+    Runs every registered rule for the language. Candidates are unvalidated.
+
+    Returns:
+        list: Solution dicts with 'explanation', 'code', 'source' and 'rule'.
+    """
+    started_at = time.perf_counter()
+    candidates, seen = [], {code_content}
+    for fixer in FIXERS.get(language, []):
+        try:
+            proposals = fixer(code_content, error_details, language)
+        except Exception as e:
+            logging.warning(f"Fixer {fixer.__name__} failed: {e}")
+            continue
+        for proposal in proposals:
+            if proposal["code"] in seen:
+                continue
+            seen.add(proposal["code"])
+            candidates.append({**proposal, "source": "rule", "rule": fixer.__name__})
+    logging.info(f"Rule fixers took {(time.perf_counter() - started_at) * 1000:.2f} ms, {len(candidates)} candidate(s).")
+    return candidates
@@ -0,0 +1,173 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# --- Constants ---
+JOB_WORKERS = int(os.getenv("ACDA_JOB_WORKERS", "4"))            # Jobs running at once, across all sessions.
+MAX_PENDING_JOBS = int(os.getenv("ACDA_MAX_PENDING_JOBS", "64"))  # Queued + running jobs before new ones are refused.
+JOB_TTL = int(os.getenv("ACDA_JOB_TTL", "3600"))                  # Seconds a finished job stays readable.
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+EventSource = Callable[[], Iterator[Dict[str, Any]]]
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when MAX_PENDING_JOBS jobs are already queued or running."""
+
+
+@dataclass(slots=True)
+class Job:
+    """
+    One background run of an event generator. `events` grows while it runs;
+    readers keep a cursor and fetch only what is new. `result` is the last
+    event of type 'result', if any.
+    """
+    id: str
+    session_id: str
+    state: str = QUEUED
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    cancel_requested: bool = False
+    future: Optional[Future] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+
+class JobManager:
+    """
+    Runs jobs for many sessions on one bounded worker pool. Each session has
+    at most one active job; submitting while one is active returns it. Jobs
+    are only visible to the session that submitted them.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, max_pending: int = MAX_PENDING_JOBS, ttl: int = JOB_TTL):
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="acda-job")
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[str, str] = {}  # session ID -> active job ID
+        self._lock = threading.Lock()
+
+    def submit(self, session_id: str, source: EventSource) -> Job:
+        """
+        Queues `source` (a callable returning an event iterator) for the session.
+
+        Raises:
+            JobQueueFullError: If too many jobs are already pending.
+        """
+        with self._lock:
+            self._purge()
+            active = self._jobs.get(self._active.get(session_id, ""))
+            if active is not None and not active.finished:
+                return active
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self.max_pending:
+                raise JobQueueFullError(f"{pending} jobs are already pending; try again shortly.")
+            job = Job(id=uuid.uuid4().hex, session_id=session_id)
+            self._jobs[job.id] = job
+            self._active[session_id] = job.id
+            job.future = self._executor.submit(self._run, job, source)
+        logging.info(f"Queued job {job.id[:8]} for session {session_id[:8]} ({pending + 1} pending).")
+        return job
+
+    def _run(self, job: Job, source: EventSource):
+        with self._lock:
+            if job.cancel_requested:
+                job.state, job.finished_at = CANCELLED, time.time()
+                return
+            job.state, job.started_at = RUNNING, time.time()
+        events = None
+        try:
+            events = source()
+            for event in events:
+                with self._lock:
+                    job.events.append(event)
+                    if event.get("type") == "result":
+                        job.result = event
+                    if job.cancel_requested:
+                        break
+            state = CANCELLED if job.cancel_requested else DONE
+        except Exception as e:
+            logging.error(f"Job {job.id[:8]} failed: {e}")
+            job.error = str(e)
+            state = FAILED
+        finally:
+            if hasattr(events, "close"):
+                events.close()
+        with self._lock:
+            job.state, job.finished_at = state, time.time()
+        logging.info(f"Job {job.id[:8]} {state} in {job.finished_at - job.started_at:.2f}s.")
+
+    def get(self, session_id: str, job_id: str) -> Optional[Job]:
+        """Returns the job if it belongs to the session."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None and job.session_id == session_id else None
+
+    def poll(self, session_id: str, job_id: str, cursor: int = 0) -> Tuple[Optional[Job], List[Dict[str, Any]], int]:
+        """
+        Returns the job, the events after `cursor` and the new cursor, so a
+        polling UI only renders what is new.
+        """
+        job = self.get(session_id, job_id)
+        if job is None:
+            return None, [], cursor
+        with self._lock:
+            events = job.events[cursor:]
+        return job, events, cursor + len(events)
+
+    def cancel(self, session_id: str, job_id: str) -> bool:
+        """Cancels a queued job, or stops a running one after its current event."""
+        job = self.get(session_id, job_id)
+        if job is None or job.finished:
+            return False
+        with self._lock:
+            job.cancel_requested = True
+        if job.future is not None and job.future.cancel():
+            with self._lock:
+                job.state, job.finished_at = CANCELLED, time.time()
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {state: 0 for state in (QUEUED, RUNNING) + FINISHED_STATES}
+            for job in self._jobs.values():
+                counts[job.state] += 1
+        return counts
+
+    def _purge(self):
+        """Drops finished jobs older than the TTL. Callers hold the lock."""
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            if self._active.get(job.session_id) == job_id:
+                del self._active[job.session_id]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_job_manager: Optional[JobManager] = None
+_job_manager_lock = threading.Lock()
+
+def get_job_manager() -> JobManager:
+    """Returns the process-wide job manager shared by every session."""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+        return _job_manager
@@ -1,5 +1,299 @@
+import abc
 import re
-from typing import Dict, Optional, Callable
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Callable
+
+# --- Precompiled Patterns ---
+# Every pattern is matched against a single line and anchored at its start, so
+# parsing is one linear pass over stderr no matter how many frames it holds.
+_PY_FRAME_RE = re.compile(r'^\s*File "(?P<file_path>.+?)", line (?P<line_number>\d+)(?:, in (?P<function>.+))?')
+_PY_CARET_RE = re.compile(r'^(?P<indent>\s*)[\^~]+\s*$')
+_JS_LOCATION_RE = re.compile(r'^(?P<file_path>.+):(?P<line_number>\d+)$')
+_JS_FRAME_RE = re.compile(r'^\s+at (?:(?P<function>.+?) \()?(?P<file_path>[^()\s]+?):(?P<line_number>\d+):(?P<column>\d+)\)?$')
+# Matches 'NameError: ...' as well as qualified names like 'json.decoder.JSONDecodeError: ...'.
+_ERROR_RE = re.compile(r'^\s*(?:[A-Za-z_]\w*\.)*(?P<error_type>[A-Za-z_]\w*Error): (?P<error_message>.+)$')
+
+_PY_TRACEBACK_HEADER = "Traceback (most recent call last):"
+_PY_CHAIN_MARKERS = {
+    "The above exception was the direct cause of the following exception:": "cause",
+    "During handling of the above exception, another exception occurred:": "context",
+}
+# Path fragments that identify interpreter, library or runtime frames.
+_NON_USER_PATH_MARKERS = ("/lib/python", "site-packages", "dist-packages", "node_modules", "node:internal")
+
+
+# --- Structured Results ---
+@dataclass(slots=True)
+class Frame:
+    """
+    One stack frame. `column` is 1-based: for Node.js frames it is the real
+    source column; for Python it comes from the caret line and is relative to
+    the stripped `source_line` shown in the traceback.
+    """
+    file_path: str
+    line_number: int
+    function: Optional[str] = None
+    column: Optional[int] = None
+    source_line: Optional[str] = None
+    is_user_code: bool = True
+
+
+@dataclass(slots=True)
+class ParsedError:
+    """
+    A parsed exception. `frames` are ordered most recent call last for every
+    language. `chained_from` links the exception that was being handled
+    ('context') or that directly caused this one ('cause').
+    """
+    error_type: str
+    error_message: str
+    frames: List[Frame] = field(default_factory=list)
+    file_path: Optional[str] = None
+    line_number: Optional[int] = None
+    column: Optional[int] = None
+    stack_trace: str = ""
+    chained_from: Optional["ParsedError"] = None
+    chain_reason: Optional[str] = None
+
+    @property
+    def user_frames(self) -> List[Frame]:
+        return [frame for frame in self.frames if frame.is_user_code]
+
+    def chain(self) -> List["ParsedError"]:
+        """Returns this exception and everything it was chained from, outermost first."""
+        errors, current = [], self
+        while current is not None:
+            errors.append(current)
+            current = current.chained_from
+        return errors[::-1]
+
+    def to_dict(self) -> Dict[str, str]:
+        """Returns the flat dict shape produced by `parse_error_message`."""
+        return {
+            "file_path": self.file_path,
+            "line_number": str(self.line_number),
+            "error_type": self.error_type,
+            "error_message": self.error_message,
+            "stack_trace": self.stack_trace,
+        }
+
+
+def _is_user_path(file_path: str) -> bool:
+    if file_path.startswith("<") and file_path != "<string>":
+        return False
+    return not any(marker in file_path for marker in _NON_USER_PATH_MARKERS)
+
+
+class _TracebackScanner(abc.ABC):
+    """
+    Line-oriented scanner over stderr. Text can be fed in arbitrary chunks as it
+    arrives (streaming mode); `close()` returns the parsed error details.
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._partial: List[str] = []
+        self._match: Optional[Dict[str, str]] = None
+
+    def feed(self, data: str):
+        """Consumes the next chunk of stderr, scanning every completed line."""
+        if not data:
+            return
+        self._chunks.append(data)
+        if "\n" not in data:
+            self._partial.append(data)
+            return
+        lines = data.split("\n")
+        if self._partial:
+            lines[0] = "".join(self._partial) + lines[0]
+            self._partial = []
+        if lines[-1]:
+            self._partial.append(lines[-1])
+        for line in lines[:-1]:
+            self._scan_line(line.rstrip("\r"))
+
+    def feed_lines(self, lines: Iterable[str]):
+        """Consumes an iterable of lines, with or without trailing newlines."""
+        for line in lines:
+            self.feed(line if line.endswith("\n") else line + "\n")
+
+    def _flush(self):
+        if self._partial:
+            self._scan_line("".join(self._partial).rstrip("\r"))
+            self._partial = []
+
+    def close(self) -> Optional[Dict[str, str]]:
+        """Flushes any unterminated last line and returns the parsed error, if any."""
+        self._flush()
+        if not self._match:
+            return None
+        error_details = dict(self._match)
+        error_details['stack_trace'] = "".join(self._chunks).strip()
+        return error_details
+
+    def close_structured(self) -> Optional[ParsedError]:
+        """Like `close()`, but returns the full `ParsedError` with frames and chain."""
+        self._flush()
+        if not self._match:
+            return None
+        error = self._build()
+        error.file_path = self._match['file_path']
+        error.line_number = int(self._match['line_number'])
+        error.stack_trace = "".join(self._chunks).strip()
+        return error
+
+    @abc.abstractmethod
+    def _build(self) -> ParsedError:
+        """Creates the parsed error from the matched lines."""
+
+    @abc.abstractmethod
+    def _scan_line(self, line: str):
+        """Scans one complete stderr line."""
+
+    @staticmethod
+    def _match_error(line: str):
+        # The substring test is a cheap filter so the regex only sees candidate lines.
+        if "Error: " not in line:
+            return None
+        return _ERROR_RE.match(line)
+
+
+class PythonTracebackScanner(_TracebackScanner):
+    """
+    Reports the last `File "...", line N` frame that is followed by an error
+    line, together with the first `...Error: message` line after it. This covers
+    runtime tracebacks as well as SyntaxError, whose frame has no function name.
+
+    Alongside, it records every traceback block (frames, source lines, caret
+    columns) and how consecutive blocks are chained.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._pending_frame: Optional[Dict[str, str]] = None
+        self._blocks: List[ParsedError] = []
+        self._frames: List[Frame] = []
+        self._chain_reason: Optional[str] = None
+        self._expect_source = False
+
+    def _scan_line(self, line: str):
+        if 'File "' in line:
+            frame = _PY_FRAME_RE.match(line)
+            if frame:
+                self._pending_frame = {key: frame[key] for key in ('file_path', 'line_number')}
+                self._frames.append(Frame(
+                    file_path=frame['file_path'],
+                    line_number=int(frame['line_number']),
+                    function=frame['function'],
+                    is_user_code=_is_user_path(frame['file_path'])
+                ))
+                self._expect_source = True
+                return
+        stripped = line.strip()
+        if stripped in _PY_CHAIN_MARKERS:
+            self._chain_reason = _PY_CHAIN_MARKERS[stripped]
+            return
+        if stripped == _PY_TRACEBACK_HEADER:
+            self._frames = []
+            return
+        if self._frames and "^" in line:
+            caret = _PY_CARET_RE.match(line)
+            source_line = self._frames[-1].source_line
+            if caret and source_line is not None and self._frames[-1].column is None:
+                # Source lines are printed stripped and indented by four spaces.
+                self._frames[-1].column = max(len(caret['indent']) - 4, 0) + 1
+                return
+
+        error = self._match_error(line)
+        if error:
+            self._blocks.append(ParsedError(
+                error_type=error['error_type'],
+                error_message=error['error_message'].strip(),
+                frames=self._frames,
+                chained_from=self._blocks[-1] if self._blocks and self._chain_reason else None,
+                chain_reason=self._chain_reason if self._blocks else None
+            ))
+            self._frames = []
+            self._chain_reason = None
+            self._expect_source = False
+            if self._pending_frame is not None:
+                self._match = {**self._pending_frame, **error.groupdict()}
+                self._match['error_message'] = self._match['error_message'].strip()
+                self._pending_frame = None
+            return
+
+        if self._expect_source and self._frames and line.startswith(" ") and stripped:
+            self._frames[-1].source_line = stripped
+        self._expect_source = False
+
+    def _build(self) -> ParsedError:
+        error = self._blocks[-1]
+        primary = error.frames[-1] if error.frames else None
+        if primary is not None:
+            error.column = primary.column
+        return error
+
+
+class JavaScriptTracebackScanner(_TracebackScanner):
+    """
+    Reports the first `path:line` location header printed by Node.js together
+    with the first `...Error: message` line after it, then collects the
+    `at fn (file:line:col)` frames that follow.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._location: Optional[Dict[str, str]] = None
+        self._header_lines: List[str] = []
+        self._frames: List[Frame] = []
+
+    def _scan_line(self, line: str):
+        if self._match:
+            if line.lstrip().startswith("at "):
+                frame = _JS_FRAME_RE.match(line)
+                if frame:
+                    self._frames.append(Frame(
+                        file_path=frame['file_path'],
+                        line_number=int(frame['line_number']),
+                        function=frame['function'],
+                        column=int(frame['column']),
+                        is_user_code=_is_user_path(frame['file_path'])
+                    ))
+            return
+        if self._location is None:
+            location = _JS_LOCATION_RE.match(line)
+            if location:
+                self._location = location.groupdict()
+            return
+        error = self._match_error(line)
+        if error:
+            self._match = {**self._location, **error.groupdict()}
+            self._match['error_message'] = self._match['error_message'].strip()
+        else:
+            self._header_lines.append(line)
+
+    def _build(self) -> ParsedError:
+        # Node prints the offending source line and a caret under the location header.
+        column = None
+        source_line = self._header_lines[0] if self._header_lines else None
+        if len(self._header_lines) > 1 and self._header_lines[1].strip().startswith("^"):
+            column = self._header_lines[1].index("^") + 1
+        frames = self._frames[::-1]
+        if not frames:
+            frames = [Frame(self._location['file_path'], int(self._location['line_number']),
+                            is_user_code=_is_user_path(self._location['file_path']))]
+        last = frames[-1]
+        if last.file_path == self._location['file_path'] and last.line_number == int(self._location['line_number']):
+            last.source_line = source_line.strip() if source_line else None
+            if last.column is None:
+                last.column = column
+        return ParsedError(
+            error_type=self._match['error_type'],
+            error_message=self._match['error_message'],
+            frames=frames,
+            column=column
+        )
+
 
 def _parse_python_error(stderr: str) -> Optional[Dict[str, str]]:
     """
@@ -10,35 +304,9 @@ def _parse_python_error(stderr: str) -> Optional[Dict[str, str]]:
     if not stderr:
         return None
 
-    stack_trace = stderr.strip()
-
-    # More robust pattern for runtime errors (NameError, TypeError, etc.)
-    # It captures the last file path and line number before the error.
-    traceback_pattern = re.compile(
-        r'.*File "(?P<file_path>.+?)", line (?P<line_number>\d+).*\n(?:.*\n)*?(?P<error_type>\w+Error): (?P<error_message>.+)',
-        re.DOTALL
-    )
-    match = traceback_pattern.search(stack_trace)
-
-    if match:
-        error_details = match.groupdict()
-        error_details['stack_trace'] = stack_trace
-        error_details['error_message'] = error_details['error_message'].strip()
-        return error_details
-    
-    # Fallback for SyntaxError, which has a different format
-    syntax_error_pattern = re.compile(
-        r'File "(?P<file_path>.+?)", line (?P<line_number>\d+)\n(?:.*\n)?^\s*(?P<error_type>SyntaxError): (?P<error_message>.+)',
-        re.MULTILINE | re.DOTALL
-    )
-    match = syntax_error_pattern.search(stack_trace)
-    if match:
-        error_details = match.groupdict()
-        error_details['stack_trace'] = stack_trace
-        error_details['error_message'] = error_details['error_message'].strip()
-        return error_details
-    
-    return None
+    scanner = PythonTracebackScanner()
+    scanner.feed(stderr.strip())
+    return scanner.close()
 
 def _parse_javascript_error(stderr: str) -> Optional[Dict[str, str]]:
     """
@@ -48,22 +316,9 @@ def _parse_javascript_error(stderr: str) -> Optional[Dict[str, str]]:
     if not stderr:
         return None
 
-    stack_trace = stderr.strip()
-
-    # Pattern for standard runtime errors (ReferenceError, TypeError, etc.)
-    error_pattern = re.compile(
-        r"^(?P<file_path>.+?):(?P<line_number>\d+)\n(?:.*\n)*?(?P<error_type>\w+Error): (?P<error_message>.+)",
-        re.MULTILINE
-    )
-    match = error_pattern.search(stack_trace)
-
-    if match:
-        error_details = match.groupdict()
-        error_details['stack_trace'] = stack_trace
-        error_details['error_message'] = error_details['error_message'].strip()
-        return error_details
-
-    return None
+    scanner = JavaScriptTracebackScanner()
+    scanner.feed(stderr.strip())
+    return scanner.close()
 
 
 # --- Language to Parser Mapping ---
@@ -72,6 +327,11 @@ PARSER_MAPPING: Dict[str, Callable[[str], Optional[Dict[str, str]]]] = {
     "javascript": _parse_javascript_error,
 }
 
+SCANNER_MAPPING: Dict[str, Callable[[], _TracebackScanner]] = {
+    "python": PythonTracebackScanner,
+    "javascript": JavaScriptTracebackScanner,
+}
+
 def parse_error_message(stderr: str, language: str = "python") -> Optional[Dict[str, str]]:
     """
     Routes the stderr to the appropriate language-specific parser.
@@ -86,6 +346,38 @@ def parse_error_message(stderr: str, language: str = "python") -> Optional[Dict[
 
     return parser(stderr)
 
+def parse_error(stderr: str, language: str = "python") -> Optional[ParsedError]:
+    """
+    Parses stderr into a `ParsedError` with the full frame list, user-code
+    markers, caret columns and chained exceptions. `to_dict()` on the result
+    gives the same dict as `parse_error_message`.
+    """
+    if not stderr:
+        return None
+
+    scanner = create_scanner(language)
+    if not scanner:
+        return None
+    scanner.feed(stderr.strip())
+    return scanner.close_structured()
+
+def create_scanner(language: str = "python") -> Optional[_TracebackScanner]:
+    """
+    Returns a streaming scanner for a language: call `feed()` with stderr chunks
+    as they arrive and `close()` for the same result as `parse_error_message`.
+    """
+    scanner_class = SCANNER_MAPPING.get(language)
+    return scanner_class() if scanner_class else None
+
+def parse_error_stream(chunks: Iterable[str], language: str = "python") -> Optional[Dict[str, str]]:
+    """Parses stderr delivered incrementally, e.g. straight from a running process."""
+    scanner = create_scanner(language)
+    if not scanner:
+        return None
+    for chunk in chunks:
+        scanner.feed(chunk)
+    return scanner.close()
+
 
 
 
@@ -1,33 +1,237 @@
-import shutil
+import difflib
 import logging
-# from typing import bool
+import os
+import re
+import shutil
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+
+# --- Constants ---
+FUZZ_LINES = 3  # How far (in lines) a hunk may have drifted from its stated position.
+CONTEXT_LINES = 3  # Unchanged lines kept around hunks that are applied to another text.
+
+_HUNK_HEADER_RE = re.compile(r'^@@ -(?P<old_start>\d+)(?:,(?P<old_count>\d+))? \+(?P<new_start>\d+)(?:,(?P<new_count>\d+))? @@')
+
+
+class PatchError(ValueError):
+    """Raised when a hunk's context cannot be found in the target text."""
+
+
+@dataclass(slots=True)
+class Hunk:
+    """
+    Replaces `old_lines` (which double as the context to verify) starting at
+    1-based line `start` with `new_lines`. An empty `old_lines` is an insertion
+    before line `start`.
+    """
+    start: int
+    old_lines: List[str] = field(default_factory=list)
+    new_lines: List[str] = field(default_factory=list)
+
+    def reversed(self, applied_at: int) -> "Hunk":
+        """The hunk that undoes this one once it has been applied at line `applied_at`."""
+        return Hunk(start=applied_at, old_lines=list(self.new_lines), new_lines=list(self.old_lines))
 
-def apply_patch(file_path: str, new_code: str) -> bool:
+
+PatchInput = Union[str, dict, List[Hunk]]
+
+
+# --- Building and Parsing Hunks ---
+def make_hunks(original: str, new: str, context: int = 0) -> List[Hunk]:
+    """
+    Computes the line-range hunks that turn `original` into `new`.
+
+    With `context` > 0 each hunk also carries up to that many unchanged lines
+    on either side (nearby changes are merged), so even a pure insertion can
+    be verified when it is applied to a different text.
+    """
+    original_lines = original.splitlines()
+    new_lines = new.splitlines()
+    matcher = difflib.SequenceMatcher(None, original_lines, new_lines, autojunk=False)
+    if context <= 0:
+        return [
+            Hunk(start=i1 + 1, old_lines=original_lines[i1:i2], new_lines=new_lines[j1:j2])
+            for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"
+        ]
+    hunks = []
+    for group in matcher.get_grouped_opcodes(context):
+        i1, j1 = group[0][1], group[0][3]
+        i2, j2 = group[-1][2], group[-1][4]
+        hunks.append(Hunk(start=i1 + 1, old_lines=original_lines[i1:i2], new_lines=new_lines[j1:j2]))
+    return hunks
+
+def make_diff(original: str, new: str, file_name: str = "script") -> str:
+    """Returns a unified diff from `original` to `new`."""
+    lines = list(difflib.unified_diff(
+        original.splitlines(), new.splitlines(),
+        fromfile=f"a/{file_name}", tofile=f"b/{file_name}", lineterm="",
+    ))
+    return "\n".join(lines) + "\n" if lines else ""
+
+def is_unified_diff(text: str) -> bool:
+    lines = text.lstrip("\n").splitlines()
+    return bool(lines) and (
+        lines[0].startswith("@@ ") or (lines[0].startswith("--- ") and len(lines) > 1 and lines[1].startswith("+++ "))
+    )
+
+def parse_unified_diff(diff_text: str) -> List[Hunk]:
+    """Parses a unified diff (single file) into hunks; context lines are kept for verification."""
+    hunks: List[Hunk] = []
+    current: Optional[Hunk] = None
+    for line in diff_text.splitlines():
+        header = _HUNK_HEADER_RE.match(line)
+        if header:
+            old_start = int(header.group("old_start"))
+            # An empty old range ('-3,0') means "insert after line 3".
+            if header.group("old_count") == "0":
+                old_start += 1
+            current = Hunk(start=old_start)
+            hunks.append(current)
+        elif current is None or line.startswith(("--- ", "+++ ")):
+            continue
+        elif line.startswith("\\"):
+            continue  # '\ No newline at end of file'
+        elif line.startswith("-"):
+            current.old_lines.append(line[1:])
+        elif line.startswith("+"):
+            current.new_lines.append(line[1:])
+        else:
+            text = line[1:] if line.startswith(" ") else line
+            current.old_lines.append(text)
+            current.new_lines.append(text)
+    return hunks
+
+def _to_hunks(original: str, patch: PatchInput) -> List[Hunk]:
+    """
+    Accepts hunks, a unified diff, the full new content, or a solution dict
+    (its 'diff' is preferred over its 'code').
     """
-    Applies a patch to a file, creating a backup of the original.
+    if isinstance(patch, dict):
+        patch = patch.get("diff") or patch.get("code")
+        if patch is None:
+            raise PatchError("Solution has neither a 'diff' nor a 'code' entry.")
+    if isinstance(patch, str):
+        return parse_unified_diff(patch) if is_unified_diff(patch) else make_hunks(original, patch)
+    return list(patch)
+
+
+# --- Applying Hunks ---
+def _locate(lines: List[str], hunk: Hunk, expected: int, fuzz: int) -> Optional[int]:
+    """Finds the 0-based index where the hunk's old lines match, nearest to `expected` first."""
+    size = len(hunk.old_lines)
+    candidates = [expected]
+    for distance in range(1, fuzz + 1):
+        candidates += [expected - distance, expected + distance]
+    for compare in (lambda a, b: a == b, lambda a, b: a.rstrip() == b.rstrip()):
+        for index in candidates:
+            if 0 <= index <= len(lines) - size and all(
+                compare(actual, wanted) for actual, wanted in zip(lines[index:index + size], hunk.old_lines)
+            ):
+                return index
+    return None
+
+def apply_hunks(text: str, hunks: List[Hunk], fuzz: int = FUZZ_LINES) -> Tuple[str, List[Hunk]]:
+    """
+    Applies hunks in order, verifying each one's context (allowing it to have
+    drifted by up to `fuzz` lines, and then ignoring trailing whitespace).
+
+    Returns:
+        tuple: The patched text and the reverse hunks that undo the patch.
+
+    Raises:
+        PatchError: If a hunk's context cannot be found.
+    """
+    lines = text.splitlines()
+    offset = 0
+    reverse: List[Hunk] = []
+    for hunk in sorted(hunks, key=lambda h: h.start):
+        index = _locate(lines, hunk, hunk.start - 1 + offset, fuzz)
+        if index is None:
+            raise PatchError(f"Hunk at line {hunk.start} does not match the file (context not found within {fuzz} lines).")
+        lines[index:index + len(hunk.old_lines)] = hunk.new_lines
+        reverse.append(hunk.reversed(index + 1))
+        offset = index + len(hunk.new_lines) - (hunk.start - 1 + len(hunk.old_lines))
+    patched = "\n".join(lines) + ("\n" if text.endswith("\n") and lines else "")
+    return patched, reverse
+
+def _atomic_write(file_path: str, content: str):
+    """Writes through a temp file in the same directory and renames it over the target."""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(prefix=".acda-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, temp_path)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+# In-memory undo history: file path -> reverse patches, most recent last.
+_undo_history: Dict[str, List[List[Hunk]]] = {}
+_undo_lock = threading.Lock()
+
+def apply_patch(file_path: str, patch: PatchInput, fuzz: int = FUZZ_LINES) -> bool:
+    """
+    Applies a patch to a file atomically and remembers how to undo it.
 
     Args:
         file_path (str): The path to the file to be patched.
-        new_code (str): The new code content to write to the file.
+        patch: A list of `Hunk`s, a unified diff, the full new code, or a
+            solution dict with 'diff' or 'code'.
+        fuzz (int): Lines a hunk may have drifted from its stated position.
 
     Returns:
         bool: True if the patch was applied successfully, False otherwise.
     """
-    backup_path = file_path + ".bak"
     try:
-        # Create a backup of the original file
-        shutil.copyfile(file_path, backup_path)
-        logging.info(f"Created backup of original file at: {backup_path}")
-
-        # Write the new code to the original file
-        with open(file_path, 'w') as f:
-            f.write(new_code)
-        
-        logging.info(f"Successfully applied patch to: {file_path}")
-        return True
-
-    except Exception as e:
+        with open(file_path, 'r') as f:
+            original = f.read()
+        hunks = _to_hunks(original, patch)
+        if not hunks:
+            logging.info(f"Patch for {file_path} changes nothing.")
+            return True
+        patched, reverse = apply_hunks(original, hunks, fuzz)
+        _atomic_write(file_path, patched)
+    except (OSError, PatchError) as e:
         logging.error(f"Failed to apply patch: {e}")
-        # Optional: Restore from backup if writing fails
-        shutil.copyfile(backup_path, file_path)
-        return False
\ No newline at end of file
+        return False
+
+    with _undo_lock:
+        _undo_history.setdefault(os.path.abspath(file_path), []).append(reverse)
+    logging.info(f"Successfully applied {len(hunks)} hunk(s) to: {file_path}")
+    return True
+
+def undo_patch(file_path: str) -> bool:
+    """
+    Reverts the most recent patch applied to `file_path` in this process.
+
+    Returns:
+        bool: True if a patch was undone, False if there was none or it failed.
+    """
+    key = os.path.abspath(file_path)
+    with _undo_lock:
+        history = _undo_history.get(key)
+        if not history:
+            logging.warning(f"No patch to undo for: {file_path}")
+            return False
+        reverse = history.pop()
+    try:
+        with open(file_path, 'r') as f:
+            current = f.read()
+        restored, _ = apply_hunks(current, reverse, fuzz=0)
+        _atomic_write(file_path, restored)
+    except (OSError, PatchError) as e:
+        logging.error(f"Failed to undo patch: {e}")
+        with _undo_lock:
+            history.append(reverse)
+        return False
+    logging.info(f"Reverted the last patch to: {file_path}")
+    return True
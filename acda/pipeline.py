@@ -0,0 +1,443 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterator, Optional
+from acda.diagnosis import diagnose as diagnose_errors
+from acda.executor import get_executor, precheck_source, run_source, run_source_in_docker
+from acda.fixers import propose_rule_fixes
+from acda.parser import parse_error_message
+from acda.patcher import make_diff
+from acda.retrieval import get_fix_index
+from acda.solution import discard_solution, generate_solution, generate_solution_async, stream_solution
+
+# --- Diagnosis ---
+# Collect every error that can be found statically, so one LLM round fixes them all.
+DIAGNOSE = os.getenv("ACDA_DIAGNOSE", "1") == "1"
+
+# --- Speculative Mode ---
+SPECULATIVE = os.getenv("ACDA_SPECULATIVE", "0") == "1"
+SPECULATIVE_CANDIDATES = int(os.getenv("ACDA_SPECULATIVE_K", "3"))
+# (name, prompt mode, temperature) per candidate; the first one is the regular, cached request.
+SPECULATIVE_VARIANTS = [
+    ("default", None, None),
+    ("window-hot", "window", 0.9),
+    ("full-file", "full", 0.4),
+    ("window-warm", "window", 0.6),
+    ("full-file-hot", "full", 1.0),
+]
+
+SYNTAX_ERROR_TYPES = ("SyntaxError", "IndentationError", "TabError")
+EXECUTION_MEMO_SIZE = 32  # Execution results kept per ExecutionMemo (one per web session).
+
+# Where each proposed fix came from; 'llm_calls_avoided' counts fixes served without the LLM.
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _count(**increments: int):
+    with _stats_lock:
+        _stats.update(increments)
+
+def get_pipeline_stats() -> Dict[str, int]:
+    """Returns counters for the rule, retrieval and LLM stages."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _passes(candidate: Dict[str, str], language: str, file_name: Optional[str]) -> bool:
+    """Runs a candidate fix in the sandbox; only a clean exit counts as a pass."""
+    result = run_source_in_docker(candidate["code"], language=language, file_name=file_name)
+    return result["return_code"] == 0
+
+def _resolves(candidate: Dict[str, str], error_details: Dict[str, str], language: str, file_name: Optional[str]) -> bool:
+    """Runs a candidate fix in the sandbox and checks that the original error is gone."""
+    result = run_source_in_docker(candidate["code"], language=language, file_name=file_name)
+    return _error_resolved(result, error_details, language)
+
+def _clears_diagnosed(candidate: Dict[str, str], error_details: Dict[str, str], language: str,
+                      file_name: Optional[str]) -> bool:
+    """
+    Runs a candidate fix and checks that the primary error and every related
+    error from the diagnosis stage are gone (neither reported by the run nor
+    found again by diagnosing the candidate).
+    """
+    result = run_source_in_docker(candidate["code"], language=language, file_name=file_name)
+    if not _error_resolved(result, error_details, language):
+        return False
+    if result["return_code"] == 0:
+        return True
+    new_error = parse_error_message(result["stderr"], language=language) or {}
+    remaining = [new_error] + diagnose_errors(candidate["code"], new_error, language, get_executor().runtime_version(language)).get("related_errors", [])
+    remaining = {(error.get("error_type"), error.get("error_message")) for error in remaining}
+    return not any((error["error_type"], error["error_message"]) in remaining for error in error_details["related_errors"])
+
+def _error_resolved(result: dict, error_details: Dict[str, str], language: str) -> bool:
+    """
+    True if the script now passes, or fails with a different error type or
+    further down (a file with several bugs is fixed one error at a time).
+    """
+    if result["return_code"] == 0:
+        return True
+    new_error = parse_error_message(result["stderr"], language=language)
+    if not new_error:
+        return False
+    if new_error["error_type"] != error_details.get("error_type"):
+        return True
+    try:
+        return int(new_error["line_number"]) > int(error_details.get("line_number", 0))
+    except (TypeError, ValueError):
+        return False
+
+
+def _precheck_failure(candidate: Dict[str, str], error_details: Dict[str, str], language: str,
+                      file_name: Optional[str]) -> Optional[dict]:
+    """
+    Statically compiles a candidate fix in microseconds. Returns the pre-check
+    result if the fix is itself broken: a syntax error where there was none,
+    or one at or before the original syntax error.
+    """
+    if candidate.get("code") is None:
+        return None
+    result = precheck_source(candidate["code"], language, file_name)
+    if result is None:
+        return None
+    if error_details.get("error_type") in SYNTAX_ERROR_TYPES and _error_resolved(result, error_details, language):
+        return None
+    return result
+
+def _with_diff(solution: Optional[Dict[str, str]], code_content: str, file_name: Optional[str]) -> Optional[Dict[str, str]]:
+    """Attaches the unified 'diff' against `code_content`, which is what gets shown and patched."""
+    if solution is not None and solution.get("code") is not None:
+        solution = {**solution, "diff": make_diff(code_content, solution["code"], file_name or "script")}
+    return solution
+
+
+def _propose_without_llm(code_content: str, error_details: Dict[str, str], language: str,
+                         file_name: Optional[str]) -> Optional[Dict[str, str]]:
+    """
+    Tries the cheap stages: deterministic rule fixers (typos, unbalanced
+    brackets/quotes), then candidates retrieved from past accepted fixes.
+    Every candidate is validated in the sandbox before it is returned; when
+    the diagnosis stage found related errors, a candidate must clear all of
+    them, otherwise the multi-error LLM prompt is the better next step.
+    """
+    started_at = time.perf_counter()
+    resolves = _clears_diagnosed if error_details.get("related_errors") else _resolves
+    for candidate in propose_rule_fixes(code_content, error_details, language):
+        if resolves(candidate, error_details, language, file_name):
+            _count(rule=1, llm_calls_avoided=1)
+            logging.info(f"Rule {candidate['rule']} fixed the error in {(time.perf_counter() - started_at) * 1000:.0f} ms.")
+            return candidate
+        _count(rule_rejected=1)
+
+    for candidate in get_fix_index().propose(code_content, error_details, language):
+        if _passes(candidate, language, file_name):
+            _count(retrieval=1, llm_calls_avoided=1)
+            logging.info("Using a validated fix from the retrieval index.")
+            return candidate
+        _count(retrieval_rejected=1)
+        logging.info("Retrieved fix failed validation; trying the next candidate.")
+    return None
+
+
+async def _speculative_candidate(variant: tuple, code_content: str, error_details: Dict[str, str],
+                                 language: str, file_name: Optional[str], outcome: dict) -> Optional[Dict[str, str]]:
+    """Generates one candidate variant and validates it, filling in `outcome` as it goes."""
+    name, prompt_mode, temperature = variant
+    started_at = time.perf_counter()
+    solution = await generate_solution_async(code_content, error_details, language, prompt_mode, temperature)
+    outcome["llm_time"] = round(time.perf_counter() - started_at, 3)
+    if not solution or not solution.get("code"):
+        outcome["outcome"] = "no_solution"
+        return None
+    solution = {**solution, "source": "llm", "variant": name}
+    if await asyncio.to_thread(_precheck_failure, solution, error_details, language, file_name) is not None:
+        outcome["outcome"] = "precheck_rejected"
+        return solution
+
+    started_at = time.perf_counter()
+    result = await run_source(solution["code"], language=language, file_name=file_name, precheck=False)
+    outcome["validation_time"] = round(time.perf_counter() - started_at, 3)
+    outcome["return_code"] = result["return_code"]
+    if result["return_code"] == 0:
+        outcome["outcome"] = "passed"
+    elif _error_resolved(result, error_details, language):
+        outcome["outcome"] = "progress"
+    else:
+        outcome["outcome"] = "failed"
+    return solution
+
+async def speculative_fix_async(code_content: str, error_details: Dict[str, str], language: str = "python",
+                                file_name: Optional[str] = None, candidates: int = SPECULATIVE_CANDIDATES) -> Optional[Dict[str, str]]:
+    """
+    Requests `candidates` diverse LLM fixes concurrently (prompt and temperature
+    variants), validates each in its own sandbox run as soon as it arrives, and
+    returns the first one that passes, cancelling the rest. Without a passing
+    candidate, the first that at least gets past the original error wins, else
+    the regular (first) variant. The solution's 'candidates' list records every
+    variant's outcome: passed, progress, failed, precheck_rejected, no_solution,
+    error or cancelled.
+    """
+    variants = [SPECULATIVE_VARIANTS[i % len(SPECULATIVE_VARIANTS)] for i in range(max(candidates, 1))]
+    outcomes = [{"variant": name, "prompt_mode": mode or "default", "temperature": temperature, "outcome": "cancelled"}
+                for name, mode, temperature in variants]
+    tasks = {
+        asyncio.create_task(_speculative_candidate(variant, code_content, error_details, language, file_name, outcome)): index
+        for index, (variant, outcome) in enumerate(zip(variants, outcomes))
+    }
+    started_at = time.perf_counter()
+    solutions: Dict[int, Dict[str, str]] = {}
+    winner = None
+    pending = set(tasks)
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = tasks[task]
+                try:
+                    solution = task.result()
+                except Exception as e:
+                    outcomes[index].update(outcome="error", error=str(e))
+                    continue
+                if solution is not None:
+                    solutions[index] = solution
+                    if outcomes[index]["outcome"] == "passed" and winner is None:
+                        winner = index
+    finally:
+        # Cancelling a validation removes its container; an LLM call already in
+        # flight finishes in its worker thread and its answer is dropped.
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    if winner is None:
+        usable = sorted(index for index in solutions if outcomes[index]["outcome"] != "precheck_rejected")
+        progressing = [index for index in usable if outcomes[index]["outcome"] == "progress"]
+        winner = progressing[0] if progressing else next(iter(usable), None)
+    for outcome in outcomes:
+        _count(**{f"speculative_{outcome['outcome']}": 1})
+    logging.info(
+        f"Speculative fix took {time.perf_counter() - started_at:.2f}s: "
+        + ", ".join(f"{outcome['variant']}={outcome['outcome']}" for outcome in outcomes)
+    )
+    if winner is None:
+        return None
+    return {**solutions[winner], "candidates": outcomes}
+
+def speculative_fix(code_content: str, error_details: Dict[str, str], language: str = "python",
+                    file_name: Optional[str] = None, candidates: int = SPECULATIVE_CANDIDATES) -> Optional[Dict[str, str]]:
+    """
+    Blocking wrapper around `speculative_fix_async`. Unlike `asyncio.run`, it
+    does not wait for the worker threads of losing LLM calls to finish.
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(speculative_fix_async(code_content, error_details, language, file_name, candidates))
+    finally:
+        loop.close()
+
+
+def _llm_fix(code_content: str, error_details: Dict[str, str], language: str,
+             file_name: Optional[str]) -> Optional[Dict[str, str]]:
+    """
+    Asks the LLM for a fix. An answer that does not even compile is dropped
+    (and evicted from the cache) and asked for once more with a sampling variant.
+    """
+    for name, prompt_mode, temperature in SPECULATIVE_VARIANTS[:2]:
+        solution = generate_solution(code_content, error_details, language, prompt_mode, temperature)
+        if solution is None or solution.get("code") is None:
+            return None
+        if _precheck_failure(solution, error_details, language, file_name) is None:
+            return {**solution, "source": "llm"}
+        _count(llm_precheck_rejected=1)
+        logging.info(f"LLM fix ({name}) has a syntax error; rejected without running it.")
+        if prompt_mode is None:
+            discard_solution(code_content, error_details, language)
+    return None
+
+def _diagnosed(code_content: str, error_details: Dict[str, str], language: str,
+               diagnose: Optional[bool]) -> Dict[str, str]:
+    """`error_details` plus the 'related_errors' found by the diagnosis stage, if enabled."""
+    if not (DIAGNOSE if diagnose is None else diagnose):
+        return error_details
+    try:
+        diagnosed = diagnose_errors(code_content, error_details, language, get_executor().runtime_version(language))
+    except Exception as e:
+        logging.warning(f"Diagnosis failed: {e}")
+        return error_details
+    if diagnosed.get("related_errors"):
+        _count(multi_error=1, related_errors=len(diagnosed["related_errors"]))
+    return diagnosed
+
+def propose_fix(code_content: str, error_details: Dict[str, str], language: str = "python",
+                file_name: Optional[str] = None, speculative: Optional[bool] = None,
+                diagnose: Optional[bool] = None) -> Optional[Dict[str, str]]:
+    """
+    Proposes a fix for a failing script, cheapest stage first: rule fixers,
+    then retrieved past fixes (both validated in the sandbox), and only when
+    none of them passes, the LLM. With `speculative` (default: ACDA_SPECULATIVE)
+    the LLM stage races several candidate fixes instead of asking for one.
+
+    With `diagnose` (default: ACDA_DIAGNOSE) the other syntax errors and
+    undefined names in the script are collected first; if there are any, a
+    cheap-stage fix must clear all of them, and the LLM is asked for one fix
+    covering all of them.
+
+    Returns:
+        dict: 'explanation', 'code', 'diff', 'source' and 'related_errors'
+            (the other errors the fix covers: all of them for a validated
+            cheap-stage fix, those included in the prompt for an LLM fix),
+            or None on failure.
+    """
+    error_details = _diagnosed(code_content, error_details, language, diagnose)
+    solution = _propose_without_llm(code_content, error_details, language, file_name)
+    if solution is not None:
+        # Cheap-stage fixes were validated against every related error.
+        solution = {**solution, "related_errors": error_details.get("related_errors", [])}
+    else:
+        _count(llm=1)
+        if SPECULATIVE if speculative is None else speculative:
+            solution = speculative_fix(code_content, error_details, language, file_name)
+        else:
+            solution = _llm_fix(code_content, error_details, language, file_name)
+        if solution is not None:
+            # Only the related errors that fit in the prompt were asked for.
+            solution = {**solution, "related_errors": solution.get("related_errors", [])}
+    return _with_diff(solution, code_content, file_name)
+
+
+def propose_fix_stream(code_content: str, error_details: Dict[str, str], language: str = "python",
+                       file_name: Optional[str] = None, diagnose: Optional[bool] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of `propose_fix`, yielding the events of
+    `stream_solution`: 'explanation' and 'code' pieces as they are generated,
+    then {'type': 'done', 'solution': ...} with the same dict `propose_fix`
+    returns. Fixes found without the LLM arrive as a single burst.
+    """
+    error_details = _diagnosed(code_content, error_details, language, diagnose)
+    related_errors = error_details.get("related_errors", [])
+    solution = _propose_without_llm(code_content, error_details, language, file_name)
+    if solution is not None:
+        yield {"type": "explanation", "text": solution["explanation"]}
+        yield {"type": "code", "text": solution["code"]}
+        yield {"type": "done", "solution": _with_diff({**solution, "related_errors": related_errors}, code_content, file_name)}
+        return
+
+    _count(llm=1)
+    for event in stream_solution(code_content, error_details, language=language):
+        if event["type"] == "done" and event["solution"] is not None:
+            solution = {**event["solution"], "source": "llm",
+                        "related_errors": event["solution"].get("related_errors", [])}
+            # The text has already been shown, so a broken fix is flagged rather than replaced.
+            result = _precheck_failure(solution, error_details, language, file_name)
+            if result is not None:
+                _count(llm_precheck_rejected=1)
+                discard_solution(code_content, error_details, language)
+                solution["precheck_error"] = result["stderr"]
+            event = {"type": "done", "solution": _with_diff(solution, code_content, file_name)}
+        yield event
+
+
+def execution_key(source: str, language: str) -> str:
+    """Content hash identifying one execution: the same code in the same language runs the same way."""
+    return hashlib.sha256(f"{language}\x00{source}".encode()).hexdigest()
+
+class ExecutionMemo:
+    """
+    Execution results keyed by content hash and language, so code that was
+    already run (e.g. by the last attempt of a debug session) is not run again
+    just to show its result. It belongs to one session, so unlike the shared
+    execution cache it also keeps timeouts and executor errors; pass `refresh`
+    to run again. Bounded LRU; thread-safe.
+    """
+
+    def __init__(self, max_entries: int = EXECUTION_MEMO_SIZE):
+        self.max_entries = max_entries
+        self._results: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source: str, language: str) -> Optional[dict]:
+        key = execution_key(source, language)
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+            return result
+
+    def put(self, source: str, language: str, result: dict):
+        key = execution_key(source, language)
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def run(self, source: str, language: str = "python", file_name: Optional[str] = None, refresh: bool = False) -> dict:
+        """Returns the memoized result, executing the code only if it was not run before (or `refresh`)."""
+        result = None if refresh else self.get(source, language)
+        with self._lock:
+            if result is not None:
+                self.hits += 1
+                return result
+            self.misses += 1
+        result = run_source_in_docker(source, language=language, file_name=file_name)
+        self.put(source, language, result)
+        return result
+
+
+def debug_step_stream(code_content: str, language: str = "python", file_name: Optional[str] = None,
+                      memo: Optional[ExecutionMemo] = None, refresh: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    One debugging attempt as a stream of events, for callers that run it in
+    the background: executes the code, parses the failure and streams the
+    proposed fix. Yields {'type': 'log', 'level', 'text'} entries, the
+    'explanation' / 'code' events of `propose_fix_stream`, and finally
+    {'type': 'result', 'status': 'passed' | 'proposed' | 'unparsed' |
+    'no_solution', 'solution', 'error_details', 'run'}.
+
+    With a `memo`, the execution result is taken from / stored in it; `refresh`
+    forces a new run.
+    """
+    if memo is not None:
+        result = memo.run(code_content, language, file_name, refresh=refresh)
+    else:
+        result = run_source_in_docker(code_content, language=language, file_name=file_name)
+    if result["return_code"] == 0:
+        yield {"type": "log", "level": "success", "text": "Code executed successfully."}
+        yield {"type": "result", "status": "passed", "solution": None, "error_details": None, "run": result}
+        return
+
+    yield {"type": "log", "level": "error", "text": "Execution failed"}
+    error_details = parse_error_message(result["stderr"], language=language)
+    if not error_details:
+        yield {"type": "log", "level": "info", "text": "Error parsing failed."}
+        yield {"type": "result", "status": "unparsed", "solution": None, "error_details": None, "run": result}
+        return
+
+    yield {"type": "log", "level": "info", "text": f"Error → {error_details['error_type']}: {error_details['error_message']}"}
+    yield {"type": "log", "level": "info", "text": "Requesting fix..."}
+    solution = None
+    for event in propose_fix_stream(code_content, error_details, language=language, file_name=file_name):
+        if event["type"] == "done":
+            solution = event["solution"]
+        else:
+            yield event
+    status = "proposed" if solution and solution.get("code") is not None else "no_solution"
+    yield {"type": "result", "status": status, "solution": solution, "error_details": error_details, "run": result}
+
+
+def record_accepted_fix(original_code: str, fixed_code: str, error_details: Dict[str, str],
+                        language: str = "python") -> bool:
+    """Adds an accepted fix to the retrieval index so similar failures can reuse it."""
+    try:
+        return get_fix_index().record(original_code, fixed_code, error_details, language)
+    except Exception as e:
+        logging.warning(f"Could not record accepted fix: {e}")
+        return False
@@ -0,0 +1,256 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import traceback
+import warnings
+from typing import Optional, Tuple, Union
+
+# --- Constants ---
+PRECHECK = os.getenv("ACDA_PRECHECK", "1") == "1"
+# Directory the scripts run in inside the sandbox, so pre-check tracebacks name the same path.
+SCRIPT_DIR = "/app"
+# Seconds to wait for the Node checker's reply before it is restarted.
+PRECHECK_TIMEOUT = float(os.getenv("ACDA_PRECHECK_TIMEOUT", "2"))
+
+# Compiles each request with the same wrapper Node uses for CommonJS modules
+# (so top-level `return` and a hashbang are valid) without running anything.
+_NODE_CHECKER = r"""
+const vm = require('vm');
+const readline = require('readline');
+const params = ['exports', 'require', 'module', '__filename', '__dirname'];
+process.stdout.write(JSON.stringify({ version: process.versions.node }) + '\n');
+readline.createInterface({ input: process.stdin }).on('line', (line) => {
+  const request = JSON.parse(line);
+  let error = null;
+  try {
+    vm.compileFunction(request.source, params, { filename: request.filename });
+  } catch (e) {
+    error = e instanceof SyntaxError ? String(e.stack) : null;
+  }
+  process.stdout.write(JSON.stringify({ error }) + '\n');
+});
+"""
+# Syntax the CommonJS check cannot judge: ES modules are left to the real run.
+_MODULE_SYNTAX_ERRORS = ("Cannot use import statement outside a module", "Unexpected token 'export'",
+                         "await is only valid in async functions and the top level bodies of modules")
+
+
+def _result(stderr: str, started_at: float) -> dict:
+    """A failed-run result dict in the executor's shape, marked as produced without executing."""
+    return {
+        "stdout": "",
+        "stderr": stderr,
+        "return_code": 1,
+        "reason": None,
+        "timings": {"queue_wait": 0.0, "exec_time": 0.0, "precheck": time.perf_counter() - started_at}
+    }
+
+
+# --- Python ---
+def check_python(source: Union[str, bytes], file_name: str = "main.py") -> Optional[dict]:
+    """
+    Compiles Python source in-process.
+
+    Returns:
+        dict: A result with the traceback the interpreter would print for the
+            syntax error, or None if the source compiles (or cannot be judged).
+    """
+    started_at = time.perf_counter()
+    file_path = f"{SCRIPT_DIR}/{os.path.basename(file_name)}"
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            compile(source, file_path, "exec", dont_inherit=True)
+    except SyntaxError as e:
+        return _result("".join(traceback.format_exception_only(type(e), e)), started_at)
+    except (ValueError, RecursionError, MemoryError):
+        return None
+    return None
+
+
+# --- JavaScript ---
+class NodeChecker:
+    """
+    A long-lived Node process that syntax-checks scripts sent over stdin, so a
+    check costs a round trip instead of a process or container start. Requests
+    are serialized; the process is restarted if it dies or does not reply
+    within `timeout` seconds.
+    """
+
+    def __init__(self, command: Optional[str] = None, timeout: float = PRECHECK_TIMEOUT):
+        self.command = command or shutil.which("node")
+        self.timeout = timeout
+        self.version: Optional[str] = None
+        self._process = None
+        self._replies: Optional[queue.Queue] = None
+        self._lock = threading.Lock()
+
+    def _ensure_process(self) -> Optional[subprocess.Popen]:
+        if self._process is not None and self._process.poll() is None:
+            return self._process
+        if not self.command:
+            return None
+        process = subprocess.Popen(
+            [self.command, "-e", _NODE_CHECKER],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8"
+        )
+        # Replies are read on a thread so a wedged process cannot block callers.
+        replies = queue.Queue()
+        threading.Thread(target=_read_replies, args=(process.stdout, replies), daemon=True).start()
+        self._process, self._replies = process, replies
+        hello = self._reply()
+        self.version = json.loads(hello)["version"] if hello else None
+        return self._process if hello else None
+
+    def runtime_version(self) -> Optional[str]:
+        """The Node version the checker runs on, starting it if needed."""
+        with self._lock:
+            self._ensure_process()
+            return self.version
+
+    def _reply(self) -> Optional[str]:
+        """The next reply line, or None (after killing the process) if it timed out or died."""
+        try:
+            reply = self._replies.get(timeout=self.timeout)
+        except queue.Empty:
+            logging.warning(f"Node syntax checker did not answer within {self.timeout}s; restarting it.")
+            reply = None
+        if not reply:
+            self._kill()
+        return reply
+
+    def _kill(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.kill()
+            self._process.wait()
+        self._process = None
+
+    def check(self, source: Union[str, bytes], file_name: str = "main.js") -> Optional[dict]:
+        """
+        Returns:
+            dict: A result with Node's syntax error output, or None if the
+                source compiles, uses ES module syntax, or Node is unavailable.
+        """
+        started_at = time.perf_counter()
+        if isinstance(source, bytes):
+            source = source.decode("utf-8", errors="replace")
+        request = json.dumps({"source": source, "filename": f"{SCRIPT_DIR}/{os.path.basename(file_name)}"})
+        with self._lock:
+            try:
+                process = self._ensure_process()
+                if process is None:
+                    return None
+                process.stdin.write(request + "\n")
+                process.stdin.flush()
+            except OSError as e:
+                logging.warning(f"Node syntax checker failed: {e}")
+                self._kill()
+                return None
+            reply = self._reply()
+        if not reply:
+            return None
+        error = json.loads(reply)["error"]
+        if not error or any(marker in error for marker in _MODULE_SYNTAX_ERRORS):
+            return None
+        # Node's internal frames point at the checker, not the script.
+        lines = [line for line in error.splitlines() if not line.lstrip().startswith("at ")]
+        return _result("\n".join(lines) + "\n", started_at)
+
+    def close(self):
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                self._process.stdin.close()
+                self._process.wait(timeout=5)
+            self._process = None
+
+
+def _read_replies(stream, replies: queue.Queue):
+    for line in stream:
+        replies.put(line)
+    replies.put("")  # EOF: the process exited.
+
+
+_node_checker: Optional[NodeChecker] = None
+_node_checker_lock = threading.Lock()
+
+def get_node_checker() -> NodeChecker:
+    """Returns the process-wide warm Node syntax checker."""
+    global _node_checker
+    with _node_checker_lock:
+        if _node_checker is None:
+            _node_checker = NodeChecker()
+            atexit.register(_node_checker.close)
+        return _node_checker
+
+
+# --- Runtime Versions ---
+def host_version(language: str) -> Optional[str]:
+    """The version of the interpreter the pre-check compiles with on this host."""
+    if language == "python":
+        return f"{sys.version_info.major}.{sys.version_info.minor}"
+    if language == "javascript":
+        return get_node_checker().runtime_version()
+    return None
+
+def _version_tuple(version: str) -> Tuple[int, ...]:
+    return tuple(int(part) for part in re.findall(r'\d+', version))
+
+def host_can_check(language: str, target_version: Optional[str]) -> bool:
+    """
+    True if the host interpreter is at least `target_version` (e.g. '3.10', or
+    '18' for Node), compared as far as the target is specified. A newer grammar
+    accepts what an older one does, so a newer host still catches real syntax
+    errors; only an older host could reject code that is valid in the sandbox.
+    """
+    if not target_version:
+        return True
+    host = host_version(language)
+    if host is None:
+        return False
+    target = _version_tuple(target_version)
+    return _version_tuple(host)[:len(target)] >= target
+
+
+# --- Dispatch ---
+_CHECKERS = {
+    "python": check_python,
+    "javascript": lambda source, file_name="main.js": get_node_checker().check(source, file_name),
+}
+
+_mismatch_logged = set()
+
+def precheck(source: Union[str, bytes], language: str = "python", file_name: Optional[str] = None,
+             target_version: Optional[str] = None) -> Optional[dict]:
+    """
+    Statically checks a script before it is executed. With `target_version`
+    (the sandbox's interpreter version) the check is skipped when the host
+    interpreter is older.
+
+    Returns:
+        dict: The result the sandbox would return for a script that fails to
+            compile, or None when the script has to be executed.
+    """
+    checker = _CHECKERS.get(language)
+    if checker is None:
+        return None
+    if not host_can_check(language, target_version):
+        if (language, target_version) not in _mismatch_logged:
+            _mismatch_logged.add((language, target_version))
+            logging.info(f"Skipping the {language} pre-check: the host runs {host_version(language)}, older than the sandbox's {target_version}.")
+        return None
+    result = checker(source, file_name) if file_name else checker(source)
+    if result is not None:
+        logging.info(f"Pre-check caught a {language} syntax error in {result['timings']['precheck'] * 1000:.2f} ms; skipping execution.")
+    return result
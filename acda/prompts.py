@@ -0,0 +1,500 @@
+import ast
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# --- Constants ---
+PROMPT_MODE = os.getenv("ACDA_PROMPT_MODE", "window")  # 'window' (localized edit) or 'full' (whole file)
+MAX_EXCERPT_LINES = 80   # Larger enclosing blocks are narrowed to a window around the error.
+EXCERPT_RADIUS = 15      # Lines kept on each side of the error when narrowing.
+CHARS_PER_TOKEN = 4      # Rough estimate used for instrumentation only.
+
+# Response protocol: each marker must appear alone on its own line, so a
+# '---' or a marker-like string inside the code never splits the response.
+EXPLANATION_MARKER = "[[EXPLANATION]]"
+CODE_MARKER = "[[CODE]]"
+END_MARKER = "[[END]]"
+MISSING_EXPLANATION = "The LLM did not provide an explanation in the expected format."
+
+# --- Prompt Configuration ---
+PROMPT_CONFIG = {
+    "python": {
+        "expert_role": "Python programmer",
+        "code_lang": "python"
+    },
+    "javascript": {
+        "expert_role": "JavaScript programmer",
+        "code_lang": "javascript"
+    }
+}
+
+_IMPORT_RES = {
+    "python": re.compile(r'^(?:import|from)\s+\S'),
+    "javascript": re.compile(r'^(?:import\s|(?:const|let|var)\s+.+=\s*require\()'),
+}
+
+# Few-shot examples in the localized-edit format, one per language.
+FEW_SHOTS = {
+    "python": """**Example: Python NameError**
+Error: NameError: name 'name' is not defined (line 3)
+Excerpt (lines 2-4):
+```python
+def greet():
+    message = "Hello, " + name
+    print(message)
+```
+Response:
+[[EXPLANATION]]
+The variable `name` is used before it is assigned. The fix defines it before building the message.
+[[CODE]]
+def greet():
+    name = "Alice"
+    message = "Hello, " + name
+    print(message)
+[[END]]""",
+    "javascript": """**Example: JavaScript TypeError**
+Error: TypeError: total.toFixed is not a function (line 3)
+Excerpt (lines 1-4):
+```javascript
+function format(total) {
+    const label = "Total: ";
+    return label + total.toFixed(2);
+}
+```
+Response:
+[[EXPLANATION]]
+`total` arrives as a string, which has no `toFixed`. The fix converts it to a number first.
+[[CODE]]
+function format(total) {
+    const label = "Total: ";
+    return label + Number(total).toFixed(2);
+}
+[[END]]""",
+}
+
+
+@dataclass(slots=True)
+class Prompt:
+    """
+    A built prompt. When `excerpt_start` is set the LLM was shown (and returns)
+    only lines `excerpt_start`..`excerpt_end` (1-based, inclusive) of the file.
+    `related_errors` are the other errors the prompt actually asks to fix.
+    """
+    text: str
+    excerpt_start: Optional[int] = None
+    excerpt_end: Optional[int] = None
+    related_errors: List[Dict[str, str]] = field(default_factory=list)
+
+    @property
+    def estimated_tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+    def apply(self, code_content: str, reply_code: str) -> str:
+        """Returns the full corrected file for the code the LLM sent back."""
+        if self.excerpt_start is None:
+            return reply_code
+        code_lines = code_content.splitlines()
+        reply_lines = reply_code.splitlines()
+        excerpt = code_lines[self.excerpt_start - 1:self.excerpt_end]
+        # Some replies contain the whole file anyway; use it as-is then.
+        if len(code_lines) > len(excerpt) and len(reply_lines) >= len(code_lines) - len(excerpt) and \
+                reply_lines[:1] == code_lines[:1] and self.excerpt_start > 1:
+            return reply_code
+        reply_lines = _match_indent(reply_lines, excerpt)
+        fixed = code_lines[:self.excerpt_start - 1] + reply_lines + code_lines[self.excerpt_end:]
+        return "\n".join(fixed) + ("\n" if code_content.endswith("\n") else "")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _min_indent(lines: List[str]) -> int:
+    indents = [len(line) - len(line.lstrip()) for line in lines if line.strip()]
+    return min(indents) if indents else 0
+
+def _match_indent(reply_lines: List[str], excerpt: List[str]) -> List[str]:
+    """Re-indents a reply whose model dropped (or added) the excerpt's base indentation."""
+    delta = _min_indent(excerpt) - _min_indent(reply_lines)
+    if delta > 0:
+        return [" " * delta + line if line.strip() else line for line in reply_lines]
+    if delta < 0:
+        return [line[-delta:] if line[:-delta].isspace() else line for line in reply_lines]
+    return reply_lines
+
+
+# --- Context Extraction ---
+def _python_block(code_content: str, line_number: int) -> Optional[Tuple[int, int]]:
+    """Innermost function (or small enough class) around the line, via the AST."""
+    try:
+        tree = ast.parse(code_content)
+    except SyntaxError:
+        return None
+    best = None
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+        end = node.end_lineno or node.lineno
+        if not start <= line_number <= end:
+            continue
+        if isinstance(node, ast.ClassDef) and end - start + 1 > MAX_EXCERPT_LINES:
+            continue
+        if best is None or start >= best[0]:
+            best = (start, end)
+    return best
+
+def _indented_block(code_lines: List[str], line_number: int) -> Tuple[int, int]:
+    """
+    Top-level block around the line, by indentation: from the nearest
+    unindented line at or above it (the block's header) to the last line before
+    the next unindented statement (a closing bracket still belongs to the block).
+    """
+    def is_top_level(line: str) -> bool:
+        return bool(line.strip()) and not line[0].isspace()
+
+    start = next((index for index in range(line_number, 0, -1) if is_top_level(code_lines[index - 1])), 1)
+    # Include decorators directly above a Python definition.
+    while start > 1 and code_lines[start - 2].startswith("@"):
+        start -= 1
+
+    end = line_number
+    for index in range(line_number + 1, len(code_lines) + 1):
+        line = code_lines[index - 1]
+        if is_top_level(line) and not line.startswith(("}", ")", "]")):
+            break
+        end = index
+    while end > line_number and not code_lines[end - 1].strip():
+        end -= 1
+    return start, end
+
+def find_excerpt(code_content: str, line_number: int, language: str = "python") -> Tuple[int, int]:
+    """
+    Returns the 1-based, inclusive line range to show the LLM: the enclosing
+    function or class (or top-level statement), narrowed to a window around
+    the error line when that block is too large.
+    """
+    code_lines = code_content.splitlines()
+    line_number = min(max(line_number, 1), len(code_lines))
+    block = _python_block(code_content, line_number) if language == "python" else None
+    start, end = block or _indented_block(code_lines, line_number)
+    if end - start + 1 > MAX_EXCERPT_LINES:
+        start = max(line_number - EXCERPT_RADIUS, start)
+        end = min(line_number + EXCERPT_RADIUS, end)
+    return start, end
+
+def find_imports(code_content: str, language: str = "python") -> List[str]:
+    pattern = _IMPORT_RES.get(language)
+    if pattern is None:
+        return []
+    return [line for line in code_content.splitlines() if pattern.match(line)]
+
+
+def _line_of(error: Dict[str, str]) -> int:
+    try:
+        return int(error.get('line_number', 0))
+    except (TypeError, ValueError):
+        return 0
+
+def format_related_errors(related_errors: List[Dict[str, str]]) -> str:
+    """Lists the other errors found in the script, for a prompt that fixes them all at once."""
+    if not related_errors:
+        return ""
+    lines = ["- Other errors found in the same script (fix all of them in this one edit):"]
+    for error in related_errors:
+        origin = " (static analysis)" if error.get('kind') == "static" else ""
+        lines.append(f"  - Line {error['line_number']}: {error['error_type']}: {error['error_message']}{origin}")
+    return "\n".join(lines)
+
+def _window_for_errors(code_content: str, line_number: int, related_errors: List[Dict[str, str]],
+                       language: str) -> Tuple[int, int, List[Dict[str, str]]]:
+    """
+    One excerpt covering the primary error and as many related errors as fit
+    in MAX_EXCERPT_LINES, nearest first; the rest are left for a later round.
+    """
+    start, end = find_excerpt(code_content, line_number, language)
+    included = []
+    for error in sorted(related_errors, key=lambda e: abs(_line_of(e) - line_number)):
+        error_line = _line_of(error)
+        if not 0 < error_line <= len(code_content.splitlines()):
+            continue
+        error_start, error_end = find_excerpt(code_content, error_line, language)
+        new_start, new_end = min(start, error_start), max(end, error_end)
+        if new_end - new_start + 1 > MAX_EXCERPT_LINES:
+            continue
+        start, end = new_start, new_end
+        included.append(error)
+    return start, end, sorted(included, key=_line_of)
+
+
+# --- Prompt Builders ---
+def build_full_file_prompt(code_content: str, error_details: Dict[str, str], language: str = "python",
+                           error_context: str = "") -> Prompt:
+    """The original prompt: the whole file plus both few-shots, asking for the whole file back."""
+    config = PROMPT_CONFIG.get(language, PROMPT_CONFIG["python"]) # Default to Python config
+    related_errors = format_related_errors(error_details.get('related_errors', []))
+    task = "all of the errors listed below" if related_errors else "a single error"
+    text = f"""
+    You are an expert {config['expert_role']} and an automated debugging assistant.
+    Your task is to fix {task} in the provided script and explain the fix.
+
+    **Example 1: Python NameError**
+    Buggy Code:
+    ```python
+    def greet():
+        message = "Hello, " + name
+        print(message)
+    greet()
+    ```
+    Explanation:
+    The error is a `NameError` because the variable 'name' was used before it was assigned a value. The fix is to define the `name` variable with a string literal before it is used in the message.
+    ---
+    Corrected Code:
+    ```python
+    def greet():
+        name = "Alice"
+        message = "Hello, " + name
+        print(message)
+    greet()
+    ```
+
+    **Example 2: JavaScript TypeError**
+    Buggy Code:
+    ```javascript
+    function add(a, b) {{
+        return a + b;
+    }}
+    add("1", 2);
+    ```
+    Explanation:
+    The error is a `TypeError` because you cannot implicitly convert types in this operation. The fix is to ensure both arguments are numbers, for instance by parsing the string argument with `parseInt`.
+    ---
+    Corrected Code:
+    ```javascript
+    function add(a, b) {{
+        return a + b;
+    }}
+    add(parseInt("1"), 2);
+    ```
+
+    **Context:**
+    The script failed with the following error:
+    - Error Type: {error_details['error_type']}
+    - Line Number: {error_details['line_number']}
+    - Error Message: {error_details['error_message']}
+    {error_context}
+    {related_errors}
+
+    **Buggy Code:**
+    ```{config['code_lang']}
+    {code_content}
+    ```
+
+    **Instructions:**
+    1. Analyze the error and the provided code.
+    2. Provide a brief, one-paragraph explanation of the fix.
+    3. Use '---' as a separator between the explanation and the code.
+    4. Provide the fully corrected {config['code_lang']} code.
+    5. IMPORTANT: Your response must ONLY contain the explanation, the separator, and the raw code. Do not include apologies or any markdown formatting for the code block.
+
+    **Explanation:**
+    ---
+    **Corrected Code:**
+    """
+    return Prompt(text=text, related_errors=list(error_details.get('related_errors', [])))
+
+def build_window_prompt(code_content: str, error_details: Dict[str, str], language: str = "python",
+                        error_context: str = "") -> Prompt:
+    """
+    A localized-edit prompt: only the block enclosing the error plus the file's
+    imports, one few-shot for the language, and a request to return just the
+    corrected excerpt.
+    """
+    config = PROMPT_CONFIG.get(language, PROMPT_CONFIG["python"])
+    try:
+        line_number = int(error_details.get('line_number', 0))
+    except (TypeError, ValueError):
+        line_number = 0
+    code_lines = code_content.splitlines()
+    if not 0 < line_number <= len(code_lines):
+        return build_full_file_prompt(code_content, error_details, language, error_context)
+
+    start, end, related = _window_for_errors(code_content, line_number, error_details.get('related_errors', []), language)
+    related_errors = format_related_errors(related)
+    excerpt = "\n".join(code_lines[start - 1:end])
+    imports = [line for line in find_imports(code_content, language) if line not in code_lines[start - 1:end]]
+    imports_section = ""
+    if imports:
+        imports_section = f"Imports in the file (for reference, do not repeat them):\n```{config['code_lang']}\n" + "\n".join(imports) + "\n```\n\n"
+
+    text = f"""You are an expert {config['expert_role']} and an automated debugging assistant.
+Fix the {"errors" if related else "error"} by editing only the excerpt of the script shown below, and explain the fix.
+
+{FEW_SHOTS.get(language, FEW_SHOTS['python'])}
+
+**Context:**
+The script ({len(code_lines)} lines) failed with the following error:
+- Error Type: {error_details['error_type']}
+- Line Number: {error_details['line_number']}
+- Error Message: {error_details['error_message']}
+{error_context}
+{related_errors}
+
+{imports_section}**Excerpt (lines {start}-{end}):**
+```{config['code_lang']}
+{excerpt}
+```
+
+**Instructions:**
+Reply in exactly this format, with each marker alone on its own line:
+{EXPLANATION_MARKER}
+A brief, one-paragraph explanation of the fix.
+{CODE_MARKER}
+The corrected excerpt (lines {start}-{end}) as raw code, keeping its indentation. Do not return the rest of the file and do not use markdown fences.
+{END_MARKER}
+Do not include apologies or any other text.
+"""
+    return Prompt(text=text, excerpt_start=start, excerpt_end=end, related_errors=related)
+
+PROMPT_BUILDERS = {
+    "window": build_window_prompt,
+    "full": build_full_file_prompt,
+}
+
+def build_prompt(code_content: str, error_details: Dict[str, str], language: str = "python",
+                 error_context: str = "", mode: Optional[str] = None) -> Prompt:
+    """Builds the prompt for `mode` (default: ACDA_PROMPT_MODE) and logs its estimated size."""
+    builder = PROMPT_BUILDERS.get(mode or PROMPT_MODE, build_window_prompt)
+    prompt = builder(code_content, error_details, language, error_context)
+    scope = f"lines {prompt.excerpt_start}-{prompt.excerpt_end}" if prompt.excerpt_start else "full file"
+    logging.info(f"Prompt ({scope}): ~{prompt.estimated_tokens} input tokens.")
+    return prompt
+
+
+# --- Response Parsing ---
+_LEGACY_LABELS = ("**Explanation:**", "Explanation:", "**Corrected Code:**", "Corrected Code:")
+_SPECIAL_PREFIXES = (EXPLANATION_MARKER, CODE_MARKER, END_MARKER, "---", "```") + _LEGACY_LABELS
+
+
+class ResponseParser:
+    """
+    Incrementally splits an LLM response into explanation and code.
+
+    Feed chunks as they stream in; each `feed` returns the new
+    ('explanation' | 'code', text) pieces that are safe to show. Sections are
+    delimited by the marker lines of the response protocol; responses without
+    markers fall back to the legacy format, split at the first line that is
+    exactly '---'. Markdown fences around the code are dropped.
+    """
+
+    def __init__(self):
+        self.section = "explanation"
+        self._markers_seen = False
+        self._pending = ""
+        self._mid_line = False
+        self._held_fence: Optional[str] = None
+        self._code_started = False
+        self._explanation: List[str] = []
+        self._code: List[str] = []
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        events: List[Tuple[str, str]] = []
+        self._pending += chunk
+        while "\n" in self._pending:
+            line, self._pending = self._pending.split("\n", 1)
+            if self._mid_line:
+                events += self._emit(line + "\n")
+                self._mid_line = False
+            else:
+                events += self._line(line)
+        # Flush a partial line early unless it may still turn into a marker, fence or label.
+        if self._pending and (self._mid_line or not self._maybe_special(self._pending)):
+            events += self._emit_partial(self._pending)
+            self._pending = ""
+        return events
+
+    def close(self) -> List[Tuple[str, str]]:
+        """Flushes the last line; a fence still held back was the closing one."""
+        events: List[Tuple[str, str]] = []
+        if self._pending:
+            events += self._emit(self._pending) if self._mid_line else self._line(self._pending)
+            self._pending = ""
+        self._held_fence = None
+        return events
+
+    def result(self) -> Tuple[str, str]:
+        """Returns (explanation, code) for everything fed so far."""
+        explanation = "".join(self._explanation).strip()
+        code = "".join(self._code).strip("\n").rstrip()
+        if self.section == "explanation" and not self._code:
+            # No separator at all: like the legacy parser, treat the reply as code.
+            return MISSING_EXPLANATION, explanation
+        return explanation or MISSING_EXPLANATION, code
+
+    @staticmethod
+    def _maybe_special(partial: str) -> bool:
+        stripped = partial.strip()
+        return not stripped or any(
+            special.startswith(stripped) or stripped.startswith(special) for special in _SPECIAL_PREFIXES
+        )
+
+    def _line(self, line: str) -> List[Tuple[str, str]]:
+        stripped = line.strip()
+        if stripped in (EXPLANATION_MARKER, CODE_MARKER, END_MARKER):
+            self._markers_seen = True
+            self.section = {EXPLANATION_MARKER: "explanation", CODE_MARKER: "code", END_MARKER: "end"}[stripped]
+            return []
+        if self.section == "end":
+            return []
+        if self.section == "explanation":
+            if stripped == "---" and not self._markers_seen:
+                self.section = "code"
+                return []
+            for label in _LEGACY_LABELS:
+                if stripped.startswith(label):
+                    line = stripped[len(label):].strip()
+                    if not line:
+                        return []
+            return self._emit(line + "\n")
+
+        # Code section.
+        if not self._code_started and (not stripped or stripped in _LEGACY_LABELS):
+            return []
+        if stripped.startswith("```"):
+            if not self._code_started:
+                return []
+            # A fence inside the code is only content if more code follows it.
+            events = self._release_fence()
+            self._held_fence = line
+            return events
+        return self._release_fence() + self._emit(line + "\n")
+
+    def _release_fence(self) -> List[Tuple[str, str]]:
+        if self._held_fence is None:
+            return []
+        fence, self._held_fence = self._held_fence, None
+        return self._emit(fence + "\n")
+
+    def _emit_partial(self, text: str) -> List[Tuple[str, str]]:
+        self._mid_line = True
+        return self._release_fence() + self._emit(text) if self.section == "code" else self._emit(text)
+
+    def _emit(self, text: str) -> List[Tuple[str, str]]:
+        if self.section == "end" or not text:
+            return []
+        if self.section == "code":
+            self._code_started = True
+            self._code.append(text)
+        else:
+            self._explanation.append(text)
+        return [(self.section, text)]
+
+
+def parse_response(response_text: str) -> Tuple[str, str]:
+    """Splits a complete LLM response into (explanation, code)."""
+    parser = ResponseParser()
+    parser.feed(response_text)
+    parser.close()
+    return parser.result()
@@ -0,0 +1,292 @@
+import difflib
+import hashlib
+import keyword
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from acda.cache import SQLiteCache, CACHE_DB_FILE
+
+# --- Constants ---
+INDEX_DIR = ".acda_cache"
+MAX_FIX_LINES = 12        # Larger accepted fixes are not worth indexing.
+MAX_CANDIDATES = 3        # Candidates proposed per lookup.
+MIN_SIMILARITY = 0.5      # Jaccard similarity of shingle sets required to propose.
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 32
+LSH_BANDS = 8             # 8 bands x 4 rows: pairs above ~0.6 similarity collide.
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (1 + (i * 0x9E3779B97F4A7C15) % (_MERSENNE_PRIME - 1), (i * 0xBF58476D1CE4E5B9) % _MERSENNE_PRIME)
+    for i in range(1, NUM_PERMUTATIONS + 1)
+]
+
+_STRING = r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|`(?:[^`\\]|\\.)*`'
+_TOKEN_RES = {
+    "python": re.compile(rf'(?P<string>{_STRING})|(?P<comment>#[^\n]*)|(?P<number>\d[\w.]*)|(?P<name>[A-Za-z_]\w*)|(?P<op>\S)'),
+    "javascript": re.compile(rf'(?P<string>{_STRING})|(?P<comment>//[^\n]*)|(?P<number>\d[\w.]*)|(?P<name>[A-Za-z_$][\w$]*)|(?P<op>\S)'),
+}
+_KEYWORDS = {
+    "python": set(keyword.kwlist),
+    "javascript": {
+        "break", "case", "catch", "class", "const", "continue", "default", "delete", "do", "else",
+        "export", "extends", "false", "finally", "for", "function", "if", "import", "in", "instanceof",
+        "let", "new", "null", "return", "switch", "this", "throw", "true", "try", "typeof", "undefined",
+        "var", "void", "while", "yield", "async", "await",
+    },
+}
+
+Token = Tuple[str, str, int, int]  # (kind, text, start, end)
+
+
+# --- Tokens and Shingles ---
+def _tokenize(text: str, language: str) -> List[Token]:
+    pattern = _TOKEN_RES.get(language, _TOKEN_RES["python"])
+    return [
+        (match.lastgroup, match.group(), match.start(), match.end())
+        for match in pattern.finditer(text)
+        if match.lastgroup != "comment"
+    ]
+
+def _abstract(token: Token, language: str) -> str:
+    """Replaces identifiers and literals with placeholders so renamed code still matches."""
+    kind, text = token[0], token[1]
+    if kind == "name":
+        return text if text in _KEYWORDS.get(language, ()) else "N"
+    if kind == "string":
+        return "S"
+    if kind == "number":
+        return "0"
+    return text
+
+def _shingles(error_type: str, error_message: str, window: str, language: str) -> Set[int]:
+    tokens = [error_type]
+    tokens += [_abstract(token, language) for token in _tokenize(error_message, language)]
+    tokens += [_abstract(token, language) for token in _tokenize(window, language)]
+    grams = zip(*(tokens[i:] for i in range(SHINGLE_SIZE)))
+    return {zlib.crc32(" ".join(gram).encode()) for gram in grams}
+
+def _minhash(shingles: Set[int]) -> List[int]:
+    return [min((a * shingle + b) % _MERSENNE_PRIME for shingle in shingles) for a, b in _PERMUTATIONS]
+
+def _bands(signature: List[int]) -> List[Tuple[int, ...]]:
+    rows = NUM_PERMUTATIONS // LSH_BANDS
+    return [(band, *signature[band * rows:(band + 1) * rows]) for band in range(LSH_BANDS)]
+
+
+# --- Applying a Stored Fix ---
+def _map_tokens(before: List[Token], window: List[Token], language: str) -> Optional[Dict[Tuple[str, str], str]]:
+    """
+    Maps the stored window onto a new one of the same shape: keywords and
+    operators must be identical, identifiers and literals may be renamed
+    consistently. Returns the renaming, or None if the shapes differ.
+    """
+    if len(before) != len(window):
+        return None
+    mapping: Dict[Tuple[str, str], str] = {}
+    reverse: Dict[Tuple[str, str], str] = {}
+    for old, new in zip(before, window):
+        if _abstract(old, language) != _abstract(new, language):
+            return None
+        if old[0] not in ("name", "string", "number"):
+            continue
+        if mapping.setdefault((old[0], old[1]), new[1]) != new[1]:
+            return None
+        if reverse.setdefault((new[0], new[1]), old[1]) != old[1]:
+            return None
+    return {key: value for key, value in mapping.items() if key[1] != value}
+
+def _rename(text: str, mapping: Dict[Tuple[str, str], str], language: str) -> str:
+    parts, last = [], 0
+    for kind, token, start, end in _tokenize(text, language):
+        replacement = mapping.get((kind, token))
+        if replacement is not None:
+            parts.append(text[last:start])
+            parts.append(replacement)
+            last = end
+    parts.append(text[last:])
+    return "".join(parts)
+
+def _indent_of(lines: List[str]) -> str:
+    for line in lines:
+        if line.strip():
+            return line[:len(line) - len(line.lstrip())]
+    return ""
+
+def _reindent(lines: List[str], old_indent: str, new_indent: str) -> List[str]:
+    return [new_indent + line[len(old_indent):] if line.startswith(old_indent) and line.strip() else line for line in lines]
+
+
+class FixIndex:
+    """
+    Local retrieval index over past accepted fixes, keyed by
+    (error type, error message, code window) -> replacement window.
+
+    Records are stored in the shared SQLite cache file and indexed in memory
+    with MinHash LSH over abstracted token shingles, so near-duplicate failures
+    (renamed variables, different literals) are found without any network call.
+    A proposed candidate still has to pass in the sandbox before it is used.
+    """
+
+    def __init__(self, store: Optional[SQLiteCache] = None):
+        self.store = store or SQLiteCache(os.path.join(INDEX_DIR, CACHE_DB_FILE), table="fixes", ttl=0)
+        self._records: Dict[str, dict] = {}
+        self._shingles: Dict[str, Set[int]] = {}
+        self._buckets: Dict[Tuple[int, ...], Set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.proposals = 0
+        for key, record in self.store.items():
+            self._index(key, record)
+
+    def _index(self, key: str, record: dict):
+        shingles = _shingles(record["error_type"], record["error_message"], record.get("error_line") or record["before"], record["language"])
+        if not shingles:
+            return
+        with self._lock:
+            self._records[key] = record
+            self._shingles[key] = shingles
+            for band in _bands(_minhash(shingles)):
+                self._buckets[band].add(key)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def record(self, original_code: str, fixed_code: str, error_details: Dict[str, str], language: str = "python") -> bool:
+        """
+        Indexes an accepted fix as the changed line range plus its replacement.
+
+        Returns:
+            bool: True if the fix was small enough to be indexed.
+        """
+        original_lines = original_code.splitlines()
+        fixed_lines = fixed_code.splitlines()
+        opcodes = [op for op in difflib.SequenceMatcher(None, original_lines, fixed_lines).get_opcodes() if op[0] != "equal"]
+        if not opcodes:
+            return False
+        i1, i2 = opcodes[0][1], opcodes[-1][2]
+        j1, j2 = opcodes[0][3], opcodes[-1][4]
+        if i1 == i2:
+            # Pure insertion: anchor it on the line that follows (or precedes) it.
+            if i2 < len(original_lines):
+                i2, j2 = i2 + 1, j2 + 1
+            elif i1 > 0:
+                i1, j1 = i1 - 1, j1 - 1
+            else:
+                return False
+        if i2 - i1 > MAX_FIX_LINES or j2 - j1 > MAX_FIX_LINES:
+            return False
+
+        try:
+            error_line = int(error_details.get("line_number", 0))
+        except (TypeError, ValueError):
+            error_line = 0
+        record = {
+            "language": language,
+            "error_type": error_details.get("error_type", ""),
+            "error_message": error_details.get("error_message", ""),
+            "before": "\n".join(original_lines[i1:i2]),
+            "after": "\n".join(fixed_lines[j1:j2]),
+            # The line the error was reported on is what a later failure is matched by.
+            "error_line": original_lines[error_line - 1] if 0 < error_line <= len(original_lines) else "",
+        }
+        key = hashlib.sha256(
+            "\x1f".join((language, record["error_type"], record["before"], record["after"])).encode()
+        ).hexdigest()
+        self.store.set(key, record)
+        self._index(key, record)
+        return True
+
+    def _similar(self, error_details: Dict[str, str], window: str, language: str) -> List[Tuple[float, dict]]:
+        shingles = _shingles(error_details.get("error_type", ""), error_details.get("error_message", ""), window, language)
+        if not shingles:
+            return []
+        with self._lock:
+            keys = set()
+            for band in _bands(_minhash(shingles)):
+                keys |= self._buckets.get(band, set())
+            scored = []
+            for key in keys:
+                record = self._records[key]
+                if record["language"] != language or record["error_type"] != error_details.get("error_type"):
+                    continue
+                other = self._shingles[key]
+                similarity = len(shingles & other) / len(shingles | other)
+                if similarity >= MIN_SIMILARITY:
+                    scored.append((similarity, record))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return scored
+
+    def propose(self, code_content: str, error_details: Dict[str, str], language: str = "python") -> List[Dict[str, str]]:
+        """
+        Proposes up to MAX_CANDIDATES fixed versions of `code_content` from
+        similar past fixes. Candidates are unvalidated.
+
+        Returns:
+            list: Solution dicts with 'explanation', 'code' and 'source'.
+        """
+        started_at = time.perf_counter()
+        self.lookups += 1
+        code_lines = code_content.splitlines()
+        try:
+            error_line = int(error_details.get("line_number", 0))
+        except (TypeError, ValueError):
+            error_line = 0
+        if not code_lines or error_line <= 0:
+            return []
+
+        query_window = code_lines[error_line - 1] if error_line <= len(code_lines) else ""
+
+        candidates, seen = [], set()
+        for similarity, record in self._similar(error_details, query_window, language):
+            before_lines = record["before"].splitlines()
+            before_tokens = _tokenize(record["before"], language)
+            length = len(before_lines)
+            first = max(error_line - length - 2, 1)
+            last = min(error_line + 2, len(code_lines) - length + 1)
+            for start in range(first, last + 1):
+                window_lines = code_lines[start - 1:start - 1 + length]
+                mapping = _map_tokens(before_tokens, _tokenize("\n".join(window_lines), language), language)
+                if mapping is None:
+                    continue
+                after_lines = _rename(record["after"], mapping, language).splitlines()
+                after_lines = _reindent(after_lines, _indent_of(before_lines), _indent_of(window_lines))
+                fixed = code_lines[:start - 1] + after_lines + code_lines[start - 1 + length:]
+                fixed_code = "\n".join(fixed) + ("\n" if code_content.endswith("\n") else "")
+                if fixed_code in seen or fixed_code == code_content:
+                    continue
+                seen.add(fixed_code)
+                candidates.append({
+                    "explanation": (
+                        f"Applied a previously accepted fix for a similar {record['error_type']} "
+                        f"(similarity {similarity:.2f}): replaced lines {start}-{start + length - 1}."
+                    ),
+                    "code": fixed_code,
+                    "source": "retrieval",
+                })
+                break
+            if len(candidates) >= MAX_CANDIDATES:
+                break
+
+        if candidates:
+            self.proposals += 1
+        logging.info(f"Fix index lookup took {(time.perf_counter() - started_at) * 1000:.2f} ms, {len(candidates)} candidate(s).")
+        return candidates
+
+
+_fix_index: Optional[FixIndex] = None
+_fix_index_lock = threading.Lock()
+
+def get_fix_index() -> FixIndex:
+    """Returns the process-wide fix index, loading stored records on first use."""
+    global _fix_index
+    with _fix_index_lock:
+        if _fix_index is None:
+            _fix_index = FixIndex()
+        return _fix_index
@@ -2,24 +2,36 @@ import os
 import google.generativeai as genai
 from dotenv import load_dotenv
 import logging
+import asyncio
+import concurrent.futures
+import glob
 import hashlib
 import json
-from typing import Dict, Optional
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+from acda.cache import SQLiteCache, CACHE_DB_FILE
+from acda.fingerprint import fingerprint, normalize_text
+from acda.parser import parse_error
+from acda.patcher import CONTEXT_LINES, Hunk, PatchError, apply_hunks, make_hunks
+from acda.prompts import ResponseParser, build_prompt, parse_response
 
 # --- Constants ---
 CACHE_DIR = ".acda_cache"
-
-# --- Prompt Configuration ---
-PROMPT_CONFIG = {
-    "python": {
-        "expert_role": "Python programmer",
-        "code_lang": "python"
-    },
-    "javascript": {
-        "expert_role": "JavaScript programmer",
-        "code_lang": "javascript"
-    }
-}
+MAX_PROMPT_FRAMES = 5  # User-code frames included in the prompt, most recent last.
+FRAME_WINDOW = 2       # Source lines shown on each side of a frame's line.
+
+# --- LLM Client Configuration ---
+LLM_MODEL = os.getenv("ACDA_LLM_MODEL", "gemini-2.5-flash")
+LLM_TIMEOUT = float(os.getenv("ACDA_LLM_TIMEOUT", "60"))          # Per-call deadline (seconds), retries included.
+LLM_MAX_RETRIES = int(os.getenv("ACDA_LLM_MAX_RETRIES", "4"))
+LLM_RATE_LIMIT = float(os.getenv("ACDA_LLM_RATE_LIMIT", "1"))     # Sustained requests per second.
+LLM_BURST = int(os.getenv("ACDA_LLM_BURST", "5"))                 # Requests allowed back to back.
+LLM_BACKOFF_BASE = 0.5
+LLM_BACKOFF_MAX = 16.0
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
 
 # --- Setup ---
 load_dotenv()
@@ -40,29 +52,40 @@ def _get_cache_key(code_content: str, error_details: Dict[str, str], language: s
     error_string = json.dumps(error_details, sort_keys=True)
     return hashlib.sha256((code_content + error_string + language).encode()).hexdigest()
 
+_solution_cache: Optional[SQLiteCache] = None
+_solution_cache_lock = threading.Lock()
+
+def get_solution_cache() -> SQLiteCache:
+    """
+    Returns the process-wide solution cache stored in CACHE_DIR. The first time
+    the database is created, any legacy `<key>.json` files there are imported.
+    """
+    global _solution_cache
+    with _solution_cache_lock:
+        if _solution_cache is None:
+            _solution_cache = SQLiteCache(os.path.join(CACHE_DIR, CACHE_DB_FILE), table="solutions")
+            if len(_solution_cache) == 0 and glob.glob(os.path.join(CACHE_DIR, "*.json")):
+                _solution_cache.import_directory(CACHE_DIR)
+        return _solution_cache
+
 def _read_from_cache(key: str) -> Optional[Dict[str, str]]:
     """Reads a solution from the cache if it exists."""
-    cache_file = os.path.join(CACHE_DIR, f"{key}.json")
-    if os.path.exists(cache_file):
-        try:
-            with open(cache_file, 'r') as f:
-                logging.info(f"Cache hit! Reading solution from {cache_file}")
-                return json.load(f)
-        except (IOError, json.JSONDecodeError) as e:
-            logging.warning(f"Could not read or parse cache file {cache_file}: {e}")
-    return None
+    try:
+        solution = get_solution_cache().get(key)
+    except sqlite3.Error as e:
+        logging.warning(f"Could not read solution cache: {e}")
+        return None
+    if solution is not None:
+        logging.info(f"Cache hit! Reading solution for key {key[:12]}")
+    return solution
 
 def _write_to_cache(key: str, solution: Dict[str, str]):
     """Writes a solution to the cache."""
-    if not os.path.exists(CACHE_DIR):
-        os.makedirs(CACHE_DIR)
-    cache_file = os.path.join(CACHE_DIR, f"{key}.json")
     try:
-        with open(cache_file, 'w') as f:
-            json.dump(solution, f)
-            logging.info(f"Cache miss. Writing solution to {cache_file}")
-    except IOError as e:
-        logging.error(f"Could not write to cache file {cache_file}: {e}")
+        get_solution_cache().set(key, solution)
+        logging.info(f"Cache miss. Writing solution for key {key[:12]}")
+    except sqlite3.Error as e:
+        logging.error(f"Could not write to solution cache: {e}")
 
 # --- File I/O ---
 def read_source_code(file_path: str) -> Optional[str]:
@@ -77,110 +100,410 @@ def read_source_code(file_path: str) -> Optional[str]:
         logging.error(f"Error reading source code file: {e}")
         return None
 
+# --- Error Context ---
+def _source_window(code_lines: list, line_number: int, radius: int = FRAME_WINDOW) -> str:
+    """Returns the numbered source lines around `line_number`, marking the line itself."""
+    start = max(line_number - radius, 1)
+    end = min(line_number + radius, len(code_lines))
+    return "\n".join(
+        f"    {'>' if n == line_number else ' '} {n:4d} | {code_lines[n - 1]}" for n in range(start, end + 1)
+    )
+
+def _format_error_context(code_content: str, error_details: Dict[str, str], language: str) -> str:
+    """
+    Summarizes the relevant user-code frames (with source windows) and any
+    chained exceptions, instead of sending the raw stack trace to the LLM.
+    """
+    parsed = parse_error(error_details.get('stack_trace', ''), language)
+    if not parsed:
+        return ""
+
+    code_lines = code_content.splitlines()
+    sections = []
+    frames = parsed.user_frames[-MAX_PROMPT_FRAMES:]
+    if frames:
+        lines = ["- Relevant frames (most recent call last):"]
+        for frame in frames:
+            where = f" in {frame.function}" if frame.function else ""
+            lines.append(f"  {os.path.basename(frame.file_path)}, line {frame.line_number}{where}")
+            if frame.file_path == parsed.file_path and 0 < frame.line_number <= len(code_lines):
+                lines.append(_source_window(code_lines, frame.line_number))
+            elif frame.source_line:
+                lines.append(f"      {frame.source_line}")
+        sections.append("\n".join(lines))
+
+    chain = parsed.chain()
+    if len(chain) > 1:
+        links = [f"{chain[0].error_type}: {chain[0].error_message}"]
+        for error in chain[1:]:
+            label = "directly caused" if error.chain_reason == "cause" else "while handling it raised"
+            links.append(f"{label} {error.error_type}: {error.error_message}")
+        sections.append("- Exception chain: " + " -> ".join(links))
+
+    return "\n".join(sections)
+
+# --- LLM Client ---
+class LLMError(RuntimeError):
+    """Raised when the LLM did not return a response."""
+
+class LLMTimeoutError(LLMError):
+    """Raised when a call (including its retries) exceeds its deadline."""
+
+
+class TokenBucket:
+    """
+    Client-side rate limiter: `rate` tokens per second refill a bucket of
+    `capacity`, so short bursts pass immediately and sustained load is paced.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Takes a token if one is available; otherwise returns the seconds to wait for one."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until a token is available; returns False if `timeout` elapses first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._reserve()
+            if wait == 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> bool:
+        """Like `acquire`, but waits without blocking the event loop."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._reserve()
+            if wait == 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """429 and 5xx answers (google.api_core errors carry the HTTP code) and transport errors."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and code in RETRYABLE_STATUS_CODES
+
+
+async def _iterate_in_thread(make_iterator: Callable[[], Iterator]) -> AsyncIterator:
+    """Drives a blocking iterator in a worker thread and yields its items on the event loop."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    def produce():
+        try:
+            for item in make_iterator():
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (done, e))
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, (done, None))
+
+    producer = loop.run_in_executor(None, produce)
+    while True:
+        item, error = await queue.get()
+        if item is done:
+            await producer
+            if error is not None:
+                raise error
+            return
+        yield item
+
+
+class LLMClient:
+    """
+    Thin layer over the generative model shared by all callers.
+
+    - The model handle is created once and reused.
+    - A token bucket paces requests; 429/5xx errors are retried with jittered
+      exponential backoff, and every call has an overall deadline.
+    - Identical concurrent requests (same prompt and generation settings) are
+      coalesced: one call is made and every caller gets its result.
+
+    `model_factory` returns any object with `generate_content(prompt,
+    generation_config=None, request_options=None, stream=False)` whose result
+    has `.text` (or, when streaming, is an iterable of chunks with `.text`), so
+    the client can be exercised against a local fake model.
+    """
+
+    def __init__(self, model_factory: Optional[Callable[[], Any]] = None, rate: float = LLM_RATE_LIMIT,
+                 burst: int = LLM_BURST, max_retries: int = LLM_MAX_RETRIES, timeout: float = LLM_TIMEOUT):
+        self._model_factory = model_factory or (lambda: genai.GenerativeModel(LLM_MODEL))
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.limiter = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._in_flight: Dict[str, concurrent.futures.Future] = {}
+        self._in_flight_lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.coalesced = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+
+    @property
+    def model(self):
+        with self._model_lock:
+            if self._model is None:
+                self._model = self._model_factory()
+            return self._model
+
+    def _record_usage(self, response, elapsed: float):
+        """Logs and accumulates the token counts the API reports for a response."""
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", 0) or 0
+        output_tokens = getattr(usage, "candidates_token_count", 0) or 0
+        self.prompt_tokens += prompt_tokens
+        self.output_tokens += output_tokens
+        logging.info(f"LLM call took {elapsed:.2f}s: {prompt_tokens} prompt tokens, {output_tokens} output tokens.")
+
+    def _acquire(self, deadline: float, timeout: float):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or not self.limiter.acquire(remaining):
+            raise LLMTimeoutError(f"LLM call exceeded its {timeout:.0f}s deadline.")
+
+    def _backoff(self, error: Exception, attempt: int, deadline: float, timeout: float):
+        """Sleeps before retry `attempt + 1`, or re-raises if the error is final or time is up."""
+        if attempt >= self.max_retries or not _is_retryable(error):
+            raise error
+        # Full jitter keeps a burst of failed callers from retrying in lockstep.
+        backoff = random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** (attempt + 1)))
+        if time.monotonic() + backoff >= deadline:
+            raise LLMTimeoutError(f"LLM call exceeded its {timeout:.0f}s deadline after {attempt} retries.") from error
+        self.retries += 1
+        logging.warning(f"LLM request failed ({error}); retry {attempt + 1}/{self.max_retries} in {backoff:.1f}s.")
+        time.sleep(backoff)
+
+    def _call(self, prompt: str, generation_config: Optional[dict], timeout: float) -> str:
+        """Makes one request with rate limiting and retries, within `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            self._acquire(deadline, timeout)
+            try:
+                self.calls += 1
+                call_started_at = time.monotonic()
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    request_options={"timeout": max(deadline - time.monotonic(), 0.1)},
+                )
+                self._record_usage(response, time.monotonic() - call_started_at)
+                return response.text
+            except Exception as e:
+                self._backoff(e, attempt, deadline, timeout)
+                attempt += 1
+
+    def generate(self, prompt: str, generation_config: Optional[dict] = None, timeout: Optional[float] = None) -> str:
+        """
+        Returns the model's text for `prompt`. Raises LLMTimeoutError when the
+        deadline passes, or the last error once retries are exhausted.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        key = hashlib.sha256((prompt + json.dumps(generation_config, sort_keys=True)).encode()).hexdigest()
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = concurrent.futures.Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            try:
+                return future.result(timeout=timeout)
+            except concurrent.futures.TimeoutError:
+                raise LLMTimeoutError(f"LLM call exceeded its {timeout:.0f}s deadline.") from None
+
+        try:
+            text = self._call(prompt, generation_config, timeout)
+            future.set_result(text)
+            return text
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+
+    async def generate_async(self, prompt: str, generation_config: Optional[dict] = None,
+                             timeout: Optional[float] = None) -> str:
+        """Async variant of `generate`; the blocking call runs in a worker thread."""
+        return await asyncio.to_thread(self.generate, prompt, generation_config, timeout)
+
+    def generate_stream(self, prompt: str, generation_config: Optional[dict] = None,
+                        timeout: Optional[float] = None) -> Iterator[str]:
+        """
+        Yields the model's text as it is generated. Failures before the first
+        chunk are retried like `generate`; streams are never coalesced.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            self._acquire(deadline, timeout)
+            received = False
+            try:
+                self.calls += 1
+                call_started_at = time.monotonic()
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    request_options={"timeout": max(deadline - time.monotonic(), 0.1)},
+                    stream=True,
+                )
+                for chunk in response:
+                    if time.monotonic() > deadline:
+                        raise LLMTimeoutError(f"LLM stream exceeded its {timeout:.0f}s deadline.")
+                    text = chunk.text
+                    if text:
+                        received = True
+                        yield text
+                self._record_usage(response, time.monotonic() - call_started_at)
+                return
+            except LLMTimeoutError:
+                raise
+            except Exception as e:
+                if received:
+                    raise
+                self._backoff(e, attempt, deadline, timeout)
+                attempt += 1
+
+    async def generate_stream_async(self, prompt: str, generation_config: Optional[dict] = None,
+                                    timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Async iterator over `generate_stream`, which runs in a worker thread."""
+        async for chunk in _iterate_in_thread(lambda: self.generate_stream(prompt, generation_config, timeout)):
+            yield chunk
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "coalesced": self.coalesced,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+        }
+
+
+_llm_client: Optional[LLMClient] = None
+_llm_client_lock = threading.Lock()
+
+def get_llm_client() -> LLMClient:
+    """Returns the process-wide LLM client."""
+    global _llm_client
+    with _llm_client_lock:
+        if _llm_client is None:
+            _llm_client = LLMClient()
+        return _llm_client
+
+def set_llm_client(client: LLMClient):
+    """Replaces the process-wide LLM client, e.g. with one built on a fake model."""
+    global _llm_client
+    with _llm_client_lock:
+        _llm_client = client
+
 # --- LLM Solution Generation ---
-def generate_solution(code_content: str, error_details: Dict[str, str], language: str = "python") -> Optional[Dict[str, str]]:
+def _cached_solution(code_content: str, error_details: Dict[str, str], language: str) -> Optional[Dict[str, str]]:
     """
-    Generates a corrected code solution using the LLM, with caching and language support.
+    Returns the cached solution for this failure, if any. A stored full file is
+    only served for the exact same source (raw key). Equivalent failures
+    (formatting, comments, temp paths) share a fingerprint, under which only
+    the edit is stored, with context lines around every hunk; it is re-applied
+    to this source only where that context matches, so neither another
+    submission's code nor its formatting ever leaks into the answer.
     """
-    cache_key = _get_cache_key(code_content, error_details, language)
-    cached_solution = _read_from_cache(cache_key)
+    cached_solution = _read_from_cache(_get_cache_key(code_content, error_details, language))
     if cached_solution:
         return cached_solution
+    cached_edit = _read_from_cache(fingerprint(code_content, error_details, language))
+    if not cached_edit or "hunks" not in cached_edit:
+        return None  # Entries from before edits were stored hold another file's code.
+    try:
+        hunks = [Hunk(start=h["start"], old_lines=h["old_lines"], new_lines=h["new_lines"]) for h in cached_edit["hunks"]]
+        if any(not hunk.old_lines for hunk in hunks) and code_content.strip():
+            # Edits stored without context cannot be placed reliably in another source.
+            return None
+        fixed_code, _ = apply_hunks(code_content, hunks)
+    except (KeyError, TypeError, PatchError) as e:
+        logging.info(f"Cached edit does not apply to this source: {e}")
+        return None
+    if fixed_code == code_content:
+        return None
+    # The stored edit names the errors it covered; map them onto this submission's lines.
+    covered = {(error_type, message) for error_type, message in cached_edit.get("related_errors", [])}
+    related_errors = [error for error in error_details.get("related_errors", [])
+                      if (error["error_type"], normalize_text(error["error_message"])) in covered]
+    return {"explanation": cached_edit.get("explanation", ""), "code": fixed_code, "related_errors": related_errors}
+
+def _store_solution(code_content: str, error_details: Dict[str, str], language: str, solution: Dict[str, str]):
+    """Caches the full solution under the raw key and only the edit under the fingerprint."""
+    _write_to_cache(_get_cache_key(code_content, error_details, language), solution)
+    hunks = make_hunks(code_content, solution["code"], context=CONTEXT_LINES)
+    if hunks:
+        _write_to_cache(fingerprint(code_content, error_details, language), {
+            "explanation": solution.get("explanation", ""),
+            "hunks": [{"start": h.start, "old_lines": h.old_lines, "new_lines": h.new_lines} for h in hunks],
+            "related_errors": [(error["error_type"], normalize_text(error["error_message"]))
+                               for error in solution.get("related_errors", [])],
+        })
+
+def discard_solution(code_content: str, error_details: Dict[str, str], language: str = "python"):
+    """Drops a cached solution that turned out to be unusable, so it is not served again."""
+    try:
+        for key in (fingerprint(code_content, error_details, language), _get_cache_key(code_content, error_details, language)):
+            get_solution_cache().delete(key)
+    except sqlite3.Error as e:
+        logging.warning(f"Could not discard cached solution: {e}")
 
+def _build_solution_prompt(code_content: str, error_details: Dict[str, str], language: str, prompt_mode: Optional[str] = None):
     logging.info(f"Cache miss. Generating {language} solution with the LLM...")
-    
-    config = PROMPT_CONFIG.get(language, PROMPT_CONFIG["python"]) # Default to Python config
-    model = genai.GenerativeModel('gemini-2.5-flash')
-
-    prompt = f"""
-    You are an expert {config['expert_role']} and an automated debugging assistant.
-    Your task is to fix a single error in the provided script and explain the fix.
-
-    **Example 1: Python NameError**
-    Buggy Code:
-    ```python
-    def greet():
-        message = "Hello, " + name
-        print(message)
-    greet()
-    ```
-    Explanation:
-    The error is a `NameError` because the variable 'name' was used before it was assigned a value. The fix is to define the `name` variable with a string literal before it is used in the message.
-    ---
-    Corrected Code:
-    ```python
-    def greet():
-        name = "Alice"
-        message = "Hello, " + name
-        print(message)
-    greet()
-    ```
-
-    **Example 2: JavaScript TypeError**
-    Buggy Code:
-    ```javascript
-    function add(a, b) {{
-        return a + b;
-    }}
-    add("1", 2);
-    ```
-    Explanation:
-    The error is a `TypeError` because you cannot implicitly convert types in this operation. The fix is to ensure both arguments are numbers, for instance by parsing the string argument with `parseInt`.
-    ---
-    Corrected Code:
-    ```javascript
-    function add(a, b) {{
-        return a + b;
-    }}
-    add(parseInt("1"), 2);
-    ```
-
-    **Context:**
-    The script failed with the following error:
-    - Error Type: {error_details['error_type']}
-    - Line Number: {error_details['line_number']}
-    - Error Message: {error_details['error_message']}
-
-    **Buggy Code:**
-    ```{config['code_lang']}
-    {code_content}
-    ```
-
-    **Instructions:**
-    1. Analyze the error and the provided code.
-    2. Provide a brief, one-paragraph explanation of the fix.
-    3. Use '---' as a separator between the explanation and the code.
-    4. Provide the fully corrected {config['code_lang']} code.
-    5. IMPORTANT: Your response must ONLY contain the explanation, the separator, and the raw code. Do not include apologies or any markdown formatting for the code block.
-
-    **Explanation:**
-    ---
-    **Corrected Code:**
+    error_context = _format_error_context(code_content, error_details, language)
+    return build_prompt(code_content, error_details, language, error_context, mode=prompt_mode)
+
+def generate_solution(code_content: str, error_details: Dict[str, str], language: str = "python",
+                      prompt_mode: Optional[str] = None, temperature: Optional[float] = None) -> Optional[Dict[str, str]]:
     """
+    Generates a corrected code solution using the LLM, with caching and language support.
 
-    try:
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        if "---" in response_text:
-            explanation, corrected_code = response_text.split("---", 1)
-        else:
-            explanation = "The LLM did not provide an explanation in the expected format."
-            corrected_code = response_text
+    `prompt_mode` ('window' or 'full') and `temperature` select a prompt or
+    sampling variant; variants bypass the cache so they yield a fresh answer.
+    """
+    use_cache = prompt_mode is None and temperature is None
+    cached_solution = _cached_solution(code_content, error_details, language) if use_cache else None
+    if cached_solution:
+        return cached_solution
 
-        explanation = explanation.replace("Explanation:", "").strip()
-        corrected_code = corrected_code.replace("Corrected Code:", "").strip()
-        
-        # Clean up markdown code blocks, if any
-        lang_tag = f"```{config['code_lang']}"
-        if corrected_code.startswith(lang_tag):
-            corrected_code = corrected_code[len(lang_tag):].strip()
-        if corrected_code.endswith("```"):
-            corrected_code = corrected_code[:-len("```")].strip()
-            
-        solution = {"explanation": explanation, "code": corrected_code}
+    prompt = _build_solution_prompt(code_content, error_details, language, prompt_mode)
+    generation_config = None if temperature is None else {"temperature": temperature}
+    try:
+        response_text = get_llm_client().generate(prompt.text, generation_config)
+        explanation, corrected_code = parse_response(response_text)
+        solution = {"explanation": explanation, "code": prompt.apply(code_content, corrected_code),
+                    "related_errors": prompt.related_errors}
         
-        _write_to_cache(cache_key, solution)
+        if use_cache:
+            _store_solution(code_content, error_details, language, solution)
         
         return solution
     
@@ -188,21 +511,46 @@ def generate_solution(code_content: str, error_details: Dict[str, str], language
         logging.error(f"Failed to generate solution from LLM: {e}")
         return None
 
+def stream_solution(code_content: str, error_details: Dict[str, str], language: str = "python") -> Iterator[Dict[str, Any]]:
+    """
+    Streaming variant of `generate_solution`. Yields events as the response
+    arrives:
+    - {'type': 'explanation', 'text': ...} and {'type': 'code', 'text': ...}
+      pieces (the code is the excerpt the LLM was asked to edit),
+    - finally {'type': 'done', 'solution': <solution dict or None>}.
+    """
+    cached_solution = _cached_solution(code_content, error_details, language)
+    if cached_solution:
+        yield {"type": "explanation", "text": cached_solution.get("explanation", "")}
+        yield {"type": "code", "text": cached_solution.get("code", "")}
+        yield {"type": "done", "solution": cached_solution}
+        return
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    prompt = _build_solution_prompt(code_content, error_details, language)
+    parser = ResponseParser()
+    try:
+        for chunk in get_llm_client().generate_stream(prompt.text):
+            for section, text in parser.feed(chunk):
+                yield {"type": section, "text": text}
+        for section, text in parser.close():
+            yield {"type": section, "text": text}
+    except Exception as e:
+        logging.error(f"Failed to stream solution from LLM: {e}")
+        yield {"type": "done", "solution": None}
+        return
+
+    explanation, corrected_code = parser.result()
+    solution = {"explanation": explanation, "code": prompt.apply(code_content, corrected_code),
+                "related_errors": prompt.related_errors}
+    _store_solution(code_content, error_details, language, solution)
+    yield {"type": "done", "solution": solution}
+
+async def generate_solution_async(code_content: str, error_details: Dict[str, str], language: str = "python",
+                                  prompt_mode: Optional[str] = None, temperature: Optional[float] = None) -> Optional[Dict[str, str]]:
+    """Async variant of `generate_solution` that does not block the event loop."""
+    return await asyncio.to_thread(generate_solution, code_content, error_details, language, prompt_mode, temperature)
+
+async def stream_solution_async(code_content: str, error_details: Dict[str, str], language: str = "python") -> AsyncIterator[Dict[str, Any]]:
+    """Async iterator over `stream_solution` events."""
+    async for event in _iterate_in_thread(lambda: stream_solution(code_content, error_details, language)):
+        yield event
@@ -1,12 +1,12 @@
 
+import time
+import uuid
 import streamlit as st
-import os
-import difflib
 from streamlit_ace import st_ace
-from acda.executor import run_code_in_docker
-from acda.parser import parse_error_message
-from acda.solution import generate_solution, read_source_code
-from acda.patcher import apply_patch
+from acda.executor import get_image_manager
+from acda.jobs import get_job_manager, JobQueueFullError
+from acda.pipeline import ExecutionMemo, debug_step_stream, record_accepted_fix
+from acda.patcher import make_diff, parse_unified_diff, apply_hunks, PatchError
 from datetime import datetime
 
 # --- Page Config ---
@@ -98,6 +98,19 @@ st.title("Autonomous Code Debugging Agent")
 st.caption("AI-powered debugging for Python & JavaScript — sleek, modern, and professional.")
 
 MAX_ATTEMPTS = 5
+JOB_POLL_INTERVAL = 0.3  # Seconds between reruns while this session's job is running.
+
+# --- Sandbox Images ---
+@st.cache_resource
+def prepare_images():
+    """Pre-warms the sandbox images once per server process."""
+    try:
+        return get_image_manager().prepare()
+    except Exception as e:
+        st.warning(f"Could not prepare Docker images: {e}")
+        return {}
+
+prepare_images()
 
 # --- Languages & Samples ---
 LANGUAGES = {
@@ -130,9 +143,24 @@ def initialize_state():
         "log_messages": [],
         "original_code": "",
         "proposed_solution": None,
+        # (original code, fixed code, error details, language) of an accepted fix awaiting its re-run.
+        "pending_fix": None,
         "language": "python",
         "editor_content": LANGUAGES["python"]["sample_code"],
-        "prev_language": "python"
+        "prev_language": "python",
+        # Each browser session is its own workspace: code and jobs are keyed by this ID.
+        "session_id": uuid.uuid4().hex,
+        "job_id": None,
+        "job_cursor": 0,
+        "live_explanation": "",
+        "live_code": "",
+        # Execution results by content hash, shared by the attempts and the result view.
+        "execution_memo": ExecutionMemo(),
+        # (code, language, result) of this session's latest run, shown as the final
+        # result whatever its outcome; only "Run Again" executes the code again.
+        "last_run": None,
+        "job_source": None,
+        "force_run": False
     }
     for k, v in defaults.items():
         if k not in st.session_state:
@@ -178,11 +206,14 @@ with col1:
             st.session_state.log_messages = [f"[{datetime.now().strftime('%H:%M:%S')}] Debug session started for {st.session_state.language}"]
             st.session_state.original_code = code_to_process
             st.session_state.proposed_solution = None
-            with open(f"temp_buggy_code.{LANGUAGES[st.session_state.language]['file_extension']}", "w", encoding="utf-8") as f:
-                f.write(code_to_process)
+            st.session_state.pending_fix = None
+            # An explicit run executes the code even if this session already ran it.
+            st.session_state.force_run = True
             st.rerun()
     with b2:
         if st.button("Reset", use_container_width=True):
+            if st.session_state.job_id:
+                get_job_manager().cancel(st.session_state.session_id, st.session_state.job_id)
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
             st.rerun()
@@ -192,34 +223,97 @@ with col2:
     st.markdown('<div class="log-box">' + "<br>".join(st.session_state.log_messages) + "</div>", unsafe_allow_html=True)
 
 # --- Processing ---
+# The session's code lives only in memory and is shipped straight into the sandbox.
 file_extension = LANGUAGES[st.session_state.language]["file_extension"]
-TEMP_FILE_PATH = f"temp_buggy_code.{file_extension}"
+SCRIPT_NAME = f"buggy_code.{file_extension}"
+
+def timestamp() -> str:
+    return datetime.now().strftime('%H:%M:%S')
+
+def log_event(event):
+    """Appends a job's log event to the session log."""
+    if event["level"] == "success":
+        st.session_state.log_messages.append(f"<span class='log-success'>[{timestamp()}] ✅ {event['text']}</span>")
+    elif event["level"] == "error":
+        st.session_state.log_messages.append(f"<span class='log-error'>[{timestamp()}] ❌ {event['text']}</span>")
+    else:
+        st.session_state.log_messages.append(event["text"])
+
+def submit_attempt():
+    """Queues this attempt on the shared worker pool; the script thread never blocks on it."""
+    code, language = st.session_state.original_code, st.session_state.language
+    memo, refresh = st.session_state.execution_memo, st.session_state.force_run
+    st.session_state.force_run = False
+    try:
+        job = get_job_manager().submit(
+            st.session_state.session_id, lambda: debug_step_stream(code, language, SCRIPT_NAME, memo=memo, refresh=refresh)
+        )
+    except JobQueueFullError as e:
+        st.session_state.log_messages.append(f"<span class='log-error'>[{timestamp()}] Server busy: {e}</span>")
+        st.session_state.start_processing = False
+        return
+    st.session_state.log_messages.append(f"[{timestamp()}] Attempt {st.session_state.attempt} (job {job.id[:8]})")
+    st.session_state.job_id = job.id
+    st.session_state.job_source = (code, language)
+    st.session_state.job_cursor = 0
+    st.session_state.live_explanation = ""
+    st.session_state.live_code = ""
+
+def finish_job(job):
+    """Moves a finished job's result into the session."""
+    st.session_state.job_id = None
+    result = job.result or {}
+    status = result.get("status")
+    if result.get("run") is not None and st.session_state.job_source:
+        st.session_state.last_run = (*st.session_state.job_source, result["run"])
+    # An accepted fix only joins the retrieval index once the re-run passes.
+    pending_fix, st.session_state.pending_fix = st.session_state.pending_fix, None
+    if status == "passed" and pending_fix:
+        record_accepted_fix(*pending_fix)
+    if job.state == "failed":
+        st.session_state.log_messages.append(f"<span class='log-error'>[{timestamp()}] Job failed: {job.error}</span>")
+        st.session_state.start_processing = False
+    elif status == "proposed":
+        solution_dict = result["solution"]
+        st.session_state.proposed_solution = solution_dict
+        st.session_state.error_details = result["error_details"]
+        source = {"rule": "rule fixer", "retrieval": "fix index"}.get(solution_dict.get('source'), "LLM")
+        st.session_state.log_messages.append(f"Proposed solution ready (from {source}).")
+    elif status == "no_solution":
+        st.session_state.log_messages.append("Solution generation failed.")
+        st.session_state.start_processing = False
+    else:  # passed, unparsed or cancelled
+        st.session_state.start_processing = False
 
 if st.session_state.start_processing and st.session_state.attempt <= MAX_ATTEMPTS:
-    if not st.session_state.get('proposed_solution'):
-        with st.spinner("Analyzing code..."):
-            st.session_state.log_messages.append(f"[{datetime.now().strftime('%H:%M:%S')}] Attempt {st.session_state.attempt}")
-            result = run_code_in_docker(TEMP_FILE_PATH, language=st.session_state.language)
-
-            if result['return_code'] == 0:
-                st.session_state.log_messages.append(f"<span class='log-success'>[{datetime.now().strftime('%H:%M:%S')}] ✅ Code executed successfully.</span>")
-                st.session_state.start_processing = False
-            else:
-                st.session_state.log_messages.append(f"<span class='log-error'>[{datetime.now().strftime('%H:%M:%S')}] ❌ Execution failed</span>")
-                error_details = parse_error_message(result['stderr'], language=st.session_state.language)
-                if not error_details:
-                    st.session_state.log_messages.append("Error parsing failed.")
-                    st.session_state.start_processing = False
-                else:
-                    st.session_state.log_messages.append(f"Error → {error_details['error_type']}: {error_details['error_message']}")
-                    st.session_state.log_messages.append("Requesting fix from LLM...")
-                    solution_dict = generate_solution(read_source_code(TEMP_FILE_PATH), error_details, language=st.session_state.language)
-                    if not solution_dict or 'code' not in solution_dict:
-                        st.session_state.log_messages.append("Solution generation failed.")
-                        st.session_state.start_processing = False
-                    else:
-                        st.session_state.proposed_solution = solution_dict
-                        st.session_state.log_messages.append("Proposed solution ready.")
+    if not st.session_state.get('proposed_solution') and not st.session_state.job_id:
+        submit_attempt()
+
+    if st.session_state.job_id:
+        job, events, st.session_state.job_cursor = get_job_manager().poll(
+            st.session_state.session_id, st.session_state.job_id, st.session_state.job_cursor
+        )
+        for event in events:
+            if event["type"] == "log":
+                log_event(event)
+            elif event["type"] == "explanation":
+                st.session_state.live_explanation += event["text"]
+            elif event["type"] == "code":
+                st.session_state.live_code += event["text"]
+
+        if job is None:
+            st.session_state.job_id = None
+            st.session_state.start_processing = False
+        elif job.finished:
+            finish_job(job)
+        else:
+            # Show the fix while it is generated, then poll again.
+            st.subheader(f"Proposed Fix ({job.state}...)")
+            if st.session_state.live_explanation:
+                st.info(st.session_state.live_explanation)
+            if st.session_state.live_code:
+                st.code(st.session_state.live_code, language=st.session_state.language)
+            time.sleep(JOB_POLL_INTERVAL)
         st.rerun()
 
 # --- Solution Review ---
@@ -227,23 +321,27 @@ if st.session_state.get('proposed_solution'):
     st.subheader("Proposed Fix")
     explanation = st.session_state.proposed_solution.get('explanation', "No explanation provided.")
     st.info(explanation)
+    if st.session_state.proposed_solution.get('precheck_error'):
+        st.warning("This fix does not compile:\n\n" + st.session_state.proposed_solution['precheck_error'])
 
     with st.expander("Code Diff", expanded=True):
-        diff_text = "".join(
-            difflib.unified_diff(
-                st.session_state.original_code.splitlines(keepends=True),
-                st.session_state.proposed_solution['code'].splitlines(keepends=True),
-                fromfile="Original",
-                tofile="Proposed"
-            )
+        diff_text = st.session_state.proposed_solution.get('diff') or make_diff(
+            st.session_state.original_code, st.session_state.proposed_solution['code'], SCRIPT_NAME
         )
         st.code(diff_text, language="diff")
 
     a1, a2 = st.columns([1,1])
     with a1:
         if st.button("Accept & Apply", use_container_width=True):
-            apply_patch(TEMP_FILE_PATH, st.session_state.proposed_solution['code'])
-            st.session_state.original_code = st.session_state.proposed_solution['code']
+            code_before = st.session_state.original_code
+            try:
+                st.session_state.original_code, _ = apply_hunks(
+                    st.session_state.original_code, parse_unified_diff(st.session_state.proposed_solution['diff'])
+                )
+            except (KeyError, PatchError):
+                st.session_state.original_code = st.session_state.proposed_solution['code']
+            st.session_state.pending_fix = (code_before, st.session_state.original_code,
+                                            st.session_state.get('error_details', {}), st.session_state.language)
             st.session_state.proposed_solution = None
             st.session_state.attempt += 1
             st.session_state.log_messages.append(f"[{datetime.now().strftime('%H:%M:%S')}] Fix applied. Retesting...")
@@ -256,8 +354,16 @@ if st.session_state.get('proposed_solution'):
 
 # --- Final Result ---
 if not st.session_state.start_processing and st.session_state.attempt > 0 and not st.session_state.get('proposed_solution'):
-    final_code = read_source_code(TEMP_FILE_PATH)
-    result = run_code_in_docker(TEMP_FILE_PATH, language=st.session_state.language)
+    final_code = st.session_state.original_code
+    # The last attempt already ran this exact code; reruns of the page show its
+    # result, even a timeout, and only "Run Again" executes it again.
+    rerun_requested = st.button("Run Again")
+    last_run = st.session_state.last_run
+    if rerun_requested or not last_run or last_run[:2] != (final_code, st.session_state.language):
+        result = st.session_state.execution_memo.run(final_code, st.session_state.language, SCRIPT_NAME, refresh=rerun_requested)
+        st.session_state.last_run = (final_code, st.session_state.language, result)
+    else:
+        result = last_run[2]
 
     if result['return_code'] == 0:
         st.success("Code fixed successfully.")
@@ -266,11 +372,6 @@ if not st.session_state.start_processing and st.session_state.attempt > 0 and no
     else:
         st.error(f"Stopped after {st.session_state.attempt} attempts. Could not fix the code.")
 
-    if os.path.exists(TEMP_FILE_PATH):
-        os.remove(TEMP_FILE_PATH)
-    if os.path.exists(TEMP_FILE_PATH + ".bak"):
-        os.remove(TEMP_FILE_PATH + ".bak")
-
 
 
 
@@ -0,0 +1,132 @@
+"""
+Replays a corpus of failures through the solution cache and reports how many
+lookups it actually served, and how many served fixes still pass.
+
+The corpus is built from tests/buggy_scripts: every script is run locally to
+capture its real error, then replayed as users resubmit it in practice, with
+reformatting, edited comments and a different temp directory per run. Each
+lookup goes through `_cached_solution` on an empty cache in a temp directory
+(raw key first, then the fingerprint edit with its context verified); on a
+miss, the reference fix for that submission is stored as an LLM answer would
+be. The raw-key-only rate is what exact-match keys alone would serve.
+
+    python -m benchmarks.bench_cache_keys
+"""
+import glob
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# The corpus is found from this file, not the working directory.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from acda import solution
+from acda.parser import parse_error_message
+from acda.patcher import CONTEXT_LINES, PatchError, apply_hunks, make_hunks
+
+SCRIPTS = sorted(glob.glob(os.path.join(REPO_ROOT, "tests", "buggy_scripts", "*.py")))
+# Reference fixes, as the LLM would return them for the original scripts.
+FIXES = {
+    "name_error.py": (
+        "\ndef greet_user():\n  # This script fails because 'user_name' is not defined.\n"
+        "  user_name = \"Alice\"\n  message = \"Hello, \" + user_name\n  print(message)\n\ngreet_user()\n"
+    ),
+    "syntax_error.py": "\ndef hello_world():\n\n    print(\"Hello, World!\")\n\n\nhello_world()\n",
+    "type_error.py": (
+        "\ndef add_items(item1, item2):\n  \n  print(\"Adding items...\")\n"
+        "  result = item1 + str(item2) #type error\n  return result          #name error\n\n"
+        "add_items(\"apples\", 5)  #syntax error\n"
+    ),
+}
+JS_SAMPLES = [(
+    "// This script fails because 'console.log' is misspelled.\n"
+    "function greetUser() {\n    const message = \"Hello, World!\";\n    consol.log(message);\n}\n\ngreetUser();\n",
+    "// This script fails because 'console.log' is misspelled.\n"
+    "function greetUser() {\n    const message = \"Hello, World!\";\n    console.log(message);\n}\n\ngreetUser();\n",
+)]
+REPLAYS_PER_SCRIPT = 20
+
+
+def _variant(code: str, language: str, rng: random.Random) -> str:
+    comment = "#" if language == "python" else "//"
+    lines = code.splitlines()
+    choice = rng.randrange(4)
+    if choice == 0:
+        lines.insert(0, f"{comment} submitted again ({rng.randrange(1000)})")
+    elif choice == 1:
+        lines = [line + " " * rng.randrange(3) for line in lines]
+    elif choice == 2:
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def _run(code: str, language: str) -> dict:
+    """Runs the code locally and returns its parsed error, or None if it passes."""
+    workdir = tempfile.mkdtemp(prefix="acda-replay-")
+    try:
+        path = os.path.join(workdir, "script.py" if language == "python" else "script.js")
+        with open(path, "w") as f:
+            f.write(code)
+        interpreter = sys.executable if language == "python" else shutil.which("node")
+        stderr = subprocess.run([interpreter, path], capture_output=True, text=True).stderr
+        return parse_error_message(stderr, language)
+    finally:
+        shutil.rmtree(workdir)
+
+
+def _fix_for(variant: str, original: str, fixed: str):
+    """The reference fix carried over to a resubmitted variant, or None if it does not apply."""
+    try:
+        return apply_hunks(variant, make_hunks(original, fixed, context=CONTEXT_LINES))[0]
+    except PatchError:
+        return None
+
+
+def main():
+    if not SCRIPTS:
+        sys.exit(f"No buggy scripts found under {os.path.join(REPO_ROOT, 'tests', 'buggy_scripts')}.")
+    rng = random.Random(7)
+    samples = [(open(path).read(), FIXES[os.path.basename(path)], "python")
+               for path in SCRIPTS if os.path.basename(path) in FIXES]
+    if shutil.which("node"):
+        samples += [(code, fixed, "javascript") for code, fixed in JS_SAMPLES]
+
+    # An empty, throwaway cache, so earlier runs cannot inflate the hit rate.
+    solution.CACHE_DIR = tempfile.mkdtemp(prefix="acda-cache-bench-")
+    raw_seen = set()
+    raw_hits = served = passing = total = 0
+    try:
+        for code, fixed, language in samples:
+            for replay in range(REPLAYS_PER_SCRIPT):
+                variant = code if replay == 0 else _variant(code, language, rng)
+                error_details = _run(variant, language)
+                if not error_details:
+                    continue
+                total += 1
+                raw_key = solution._get_cache_key(variant, error_details, language)
+                raw_hits += raw_key in raw_seen
+                raw_seen.add(raw_key)
+
+                cached = solution._cached_solution(variant, error_details, language)
+                if cached is not None:
+                    served += 1
+                    passing += _run(cached["code"], language) is None
+                    continue
+                fixed_variant = _fix_for(variant, code, fixed)
+                if fixed_variant is not None:
+                    solution._store_solution(variant, error_details, language,
+                                             {"explanation": "Reference fix.", "code": fixed_variant})
+    finally:
+        shutil.rmtree(solution.CACHE_DIR, ignore_errors=True)
+
+    print(f"replayed failures:        {total}")
+    print(f"raw key only hit rate:    {raw_hits / total:6.1%}")
+    print(f"served by the cache:      {served / total:6.1%}")
+    print(f"served fixes that pass:   {passing / served if served else 0:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
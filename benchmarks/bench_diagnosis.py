@@ -0,0 +1,142 @@
+"""
+Compares the one-error-at-a-time loop with the multi-error diagnosis stage on
+a corpus of small Python scripts that each carry two to four bugs (missing
+brackets and colons, misspelled names, a type error only visible at run time).
+
+Every script is debugged with the batch loop (`acda.batch.debug_script`) on
+the local backend, against a fake LLM that fixes exactly the lines the prompt
+reports as failing, so no API key is needed. Each mode runs in its own
+process and working directory, so caches and the fix index start empty.
+
+    python -m benchmarks.bench_diagnosis
+"""
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS = 12
+LLM_LATENCY = 0.3   # Seconds the fake model takes per answer.
+SEED = 7
+
+_BASE = """def compute_{i}(values):
+    total = 0
+    for value in values:
+        total = total + value
+    return total
+
+def label_{i}(name):
+    return "item-" + name
+
+print(compute_{i}([1, 2, 3]))
+print(label_{i}("a"))
+"""
+# (fixed line, buggy line) pairs; every script gets a random subset of them.
+_BUGS = [
+    ("    for value in values:", "    for value in values"),
+    ("    return total", "    return totl"),
+    ("        total = total + value", "        total = total + str(value)"),
+    ("print(compute_{i}([1, 2, 3]))", "print(compute_{i}([1, 2, 3])"),
+    ('    return "item-" + name', '    return "item-" + nam'),
+]
+
+_EXCERPT_RE = re.compile(r'\*\*Excerpt \(lines (?P<start>\d+)-\d+\):\*\*\n```python\n(?P<code>.*?)\n```', re.S)
+_FULL_RE = re.compile(r'\*\*Buggy Code:\*\*\n    ```python\n    (?P<code>.*?)\n    ```', re.S)
+_PRIMARY_LINE_RE = re.compile(r'- Line Number: (\d+)')
+_RELATED_LINE_RE = re.compile(r'^\s*- Line (\d+): ', re.M)
+
+
+def _corpus():
+    rng = random.Random(SEED)
+    scripts, fixes = [], {}
+    for i in range(SCRIPTS):
+        code = _BASE.format(i=i)
+        for fixed, buggy in rng.sample(_BUGS, rng.randint(2, 4)):
+            fixed, buggy = fixed.format(i=i), buggy.format(i=i)
+            code = code.replace(fixed + "\n", buggy + "\n", 1)
+            fixes[buggy] = fixed
+        scripts.append(code)
+    return scripts, fixes
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """Fixes the known-buggy lines among those the prompt names as failing."""
+
+    def __init__(self, fixes: dict):
+        self.fixes = fixes
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None, request_options=None, stream=False):
+        self.calls += 1
+        time.sleep(LLM_LATENCY)
+        match = _EXCERPT_RE.search(prompt) or _FULL_RE.search(prompt)
+        first_line = int(match.groupdict().get("start") or 1)
+        lines = match.group("code").split("\n")
+        error_lines = {int(n) for n in _PRIMARY_LINE_RE.findall(prompt) + _RELATED_LINE_RE.findall(prompt)}
+        for error_line in error_lines:
+            index = error_line - first_line
+            if 0 <= index < len(lines) and lines[index] in self.fixes:
+                lines[index] = self.fixes[lines[index]]
+        return FakeResponse("[[EXPLANATION]]\nFixed the reported lines.\n[[CODE]]\n" + "\n".join(lines) + "\n[[END]]")
+
+
+def run_mode(diagnose: bool) -> dict:
+    """Debugs the corpus in the current directory; called in a fresh process per mode."""
+    from acda import pipeline
+    from acda.batch import debug_script
+    from acda.executor import set_executor_backend
+    from acda.solution import LLMClient, set_llm_client
+
+    scripts, fixes = _corpus()
+    model = FakeModel(fixes)
+    set_llm_client(LLMClient(model_factory=lambda: model, rate=100, burst=100))
+    set_executor_backend("local")
+    pipeline.DIAGNOSE = diagnose
+
+    records = []
+    for index, code in enumerate(scripts):
+        path = f"script_{index}.py"
+        with open(path, "w") as f:
+            f.write(code)
+        records.append(debug_script(path, "python", max_attempts=8))
+    fixed = [record for record in records if record["outcome"] == "fixed"]
+    return {
+        "fixed": len(fixed),
+        "iterations": statistics.mean(len(record["attempts"]) for record in fixed) if fixed else 0,
+        "latency": statistics.mean(record["elapsed"] for record in fixed) if fixed else 0,
+        "llm_calls": model.calls,
+    }
+
+
+def main():
+    print(f"{SCRIPTS} scripts with 2-4 bugs each, fake LLM latency {LLM_LATENCY}s")
+    print(f"{'mode':<12} {'fixed':>6} {'avg iterations':>15} {'avg latency (s)':>16} {'LLM calls':>10}")
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": repo}
+    for name, diagnose in (("one-by-one", False), ("diagnosis", True)):
+        with tempfile.TemporaryDirectory(prefix="acda-bench-") as workdir:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_diagnosis", "--mode", name, *(["--diagnose"] if diagnose else [])],
+                cwd=workdir, env=env, capture_output=True, text=True, check=True
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{name:<12} {result['fixed']:>6} {result['iterations']:>15.2f} {result['latency']:>16.2f} {result['llm_calls']:>10}")
+
+
+if __name__ == "__main__":
+    if "--mode" in sys.argv:
+        import logging
+        logging.disable(logging.CRITICAL)
+        print(json.dumps(run_mode("--diagnose" in sys.argv)))
+    else:
+        main()
@@ -0,0 +1,70 @@
+"""
+Drives the LLM client against a local fake model (no network, no API key) and
+reports calls, retries and coalesced requests for a burst of concurrent callers.
+
+The fake model answers after a fixed latency and fails a share of requests
+with 429/503, like a quota-limited endpoint. Half of the callers send a prompt
+that another caller is already waiting on, so those should be coalesced.
+
+    python -m benchmarks.bench_llm_client
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from acda.solution import LLMClient
+
+CALLERS = 40
+DISTINCT_PROMPTS = 20
+LATENCY = 0.2
+FAILURE_RATE = 0.2
+
+
+class FakeStatusError(Exception):
+    def __init__(self, code: int):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self, seed: int = 3):
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, generation_config=None, request_options=None):
+        with self._lock:
+            self.requests += 1
+            fail = self._rng.random() < FAILURE_RATE
+            code = self._rng.choice((429, 503))
+        time.sleep(LATENCY)
+        if fail:
+            raise FakeStatusError(code)
+        return FakeResponse(f"fixed: {prompt}")
+
+
+def main():
+    model = FakeModel()
+    client = LLMClient(model_factory=lambda: model, rate=50, burst=10, timeout=30)
+    prompts = [f"prompt {i % DISTINCT_PROMPTS}" for i in range(CALLERS)]
+
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CALLERS) as pool:
+        results = list(pool.map(client.generate, prompts))
+    elapsed = time.perf_counter() - started_at
+
+    assert all(result == f"fixed: {prompt}" for prompt, result in zip(prompts, results))
+    print(f"{CALLERS} callers, {DISTINCT_PROMPTS} distinct prompts, {elapsed:.2f}s wall clock")
+    print(f"model requests: {model.requests}")
+    for name, value in client.stats().items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
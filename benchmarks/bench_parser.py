@@ -0,0 +1,60 @@
+"""
+Micro-benchmark for the traceback parser.
+
+Builds synthetic stderr of increasing size (deep RecursionError-style
+tracebacks plus noisy output) and reports parse time per megabyte for the
+one-shot and streaming parsers. Linear parsing shows a flat ms/MB column.
+
+    python -m benchmarks.bench_parser
+"""
+import time
+
+from acda.parser import parse_error_message, parse_error_stream
+
+FRAME = '  File "/app/script.py", line {n}, in recurse\n    return recurse(depth + 1)\n'
+NOISE = "some program output that is not part of the traceback " * 4 + "\n"
+
+
+def build_python_stderr(size_bytes: int) -> str:
+    parts, total, n = ["Traceback (most recent call last):\n"], 0, 0
+    while total < size_bytes:
+        chunk = FRAME.format(n=n) if n % 3 else NOISE
+        parts.append(chunk)
+        total += len(chunk)
+        n += 1
+    parts.append("RecursionError: maximum recursion depth exceeded\n")
+    return "".join(parts)
+
+
+def build_javascript_stderr(size_bytes: int) -> str:
+    header = "/app/script.js:12\n    consol.log(message);\n    ^\n\nReferenceError: consol is not defined\n"
+    frame = "    at recurse (/app/script.js:12:5)\n"
+    return header + frame * (size_bytes // len(frame))
+
+
+def _time(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+        assert result is not None
+    return best
+
+
+def main():
+    print(f"{'language':<12}{'size':>8}{'one-shot':>12}{'ms/MB':>10}{'streaming':>12}{'ms/MB':>10}")
+    for language, build in (("python", build_python_stderr), ("javascript", build_javascript_stderr)):
+        for megabytes in (1, 2, 5, 10):
+            stderr = build(megabytes * 1024 * 1024)
+            chunks = [stderr[i:i + 4096] for i in range(0, len(stderr), 4096)]
+            one_shot = _time(lambda: parse_error_message(stderr, language))
+            streaming = _time(lambda: parse_error_stream(chunks, language))
+            print(
+                f"{language:<12}{megabytes:>6}MB{one_shot * 1000:>10.1f}ms{one_shot * 1000 / megabytes:>10.1f}"
+                f"{streaming * 1000:>10.1f}ms{streaming * 1000 / megabytes:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
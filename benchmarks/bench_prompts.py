@@ -0,0 +1,90 @@
+"""
+Compares the full-file prompt with the context-windowed prompt on a synthetic
+3,000-line module that has a one-line NameError.
+
+Token counts are estimated from the prompt and the code each prompt asks the
+model to send back. Latency is simulated with a local fake model whose time
+grows with input and output tokens (rates below, roughly those of a hosted
+flash model), so no API key is needed. The fake model fixes the bug the way
+each prompt requests (whole file vs. excerpt), which also checks that the
+excerpt is spliced back into the right place.
+
+    python -m benchmarks.bench_prompts
+"""
+import re
+import time
+
+from acda.prompts import build_full_file_prompt, build_window_prompt, estimate_tokens, parse_response
+from acda.solution import LLMClient
+
+MODULE_LINES = 3000
+SECONDS_PER_INPUT_TOKEN = 0.00002
+SECONDS_PER_OUTPUT_TOKEN = 0.004
+BASE_LATENCY = 0.3
+TIME_SCALE = 0.05  # The fake model sleeps for this fraction of the simulated latency.
+
+_EXCERPT_RE = re.compile(r'\*\*Excerpt \(lines \d+-\d+\):\*\*\n```python\n(?P<code>.*?)\n```', re.S)
+_FULL_RE = re.compile(r'\*\*Buggy Code:\*\*\n    ```python\n    (?P<code>.*?)\n    ```', re.S)
+
+
+def _module() -> str:
+    lines = ["import os", "import json", ""]
+    index = 0
+    while len(lines) < MODULE_LINES:
+        lines += [
+            f"def handler_{index}(payload):",
+            f"    \"\"\"Handles message type {index}.\"\"\"",
+            "    data = json.loads(payload)",
+            f"    value = data.get('value', {index})",
+            "    return os.path.join('out', str(value))",
+            "",
+        ]
+        index += 1
+    return "\n".join(lines[:MODULE_LINES]) + "\n"
+
+
+class FakeResponse:
+    def __init__(self, text: str, prompt_tokens: int, output_tokens: int):
+        self.text = text
+        self.usage_metadata = type("Usage", (), {"prompt_token_count": prompt_tokens, "candidates_token_count": output_tokens})
+
+
+class FakeModel:
+    """Sends back the shown code with the typo fixed; latency follows token counts."""
+
+    def generate_content(self, prompt, generation_config=None, request_options=None):
+        match = _EXCERPT_RE.search(prompt) or _FULL_RE.search(prompt)
+        fixed = match.group("code").replace("valu)", "value)")
+        text = f"[[EXPLANATION]]\nThe variable is misspelled.\n[[CODE]]\n{fixed}\n[[END]]"
+        prompt_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(text)
+        simulated = BASE_LATENCY + prompt_tokens * SECONDS_PER_INPUT_TOKEN + output_tokens * SECONDS_PER_OUTPUT_TOKEN
+        self.simulated_latency = simulated
+        time.sleep(simulated * TIME_SCALE)
+        return FakeResponse(text, prompt_tokens, output_tokens)
+
+
+def main():
+    code = _module()
+    code_lines = code.splitlines()
+    error_line = MODULE_LINES // 2
+    while "return os.path.join" not in code_lines[error_line - 1]:
+        error_line += 1
+    code_lines[error_line - 1] = code_lines[error_line - 1].replace("value)", "valu)")
+    buggy = "\n".join(code_lines) + "\n"
+    error_details = {"error_type": "NameError", "error_message": "name 'valu' is not defined",
+                     "line_number": str(error_line), "file_path": "module.py"}
+
+    model = FakeModel()
+    print(f"{MODULE_LINES}-line module, NameError on line {error_line}")
+    print(f"{'prompt':<8} {'input tok':>10} {'output tok':>11} {'latency (s)':>12}  fixed")
+    for name, builder in (("full", build_full_file_prompt), ("window", build_window_prompt)):
+        prompt = builder(buggy, error_details, "python")
+        client = LLMClient(model_factory=lambda: model)
+        _, reply = parse_response(client.generate(prompt.text))
+        fixed = prompt.apply(buggy, reply)
+        usage = client.stats()
+        print(f"{name:<8} {usage['prompt_tokens']:>10} {usage['output_tokens']:>11} {model.simulated_latency:>12.2f}  {fixed.rstrip() == code.rstrip()}")
+
+
+if __name__ == "__main__":
+    main()
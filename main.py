@@ -1,19 +1,24 @@
+import argparse
 import os
-from acda.executor import run_code_in_docker
+from acda.executor import run_code_in_docker, get_image_manager, set_executor_backend, EXECUTOR_BACKENDS, EXECUTOR_BACKEND
 from acda.parser import parse_error_message
-from acda.solution import read_source_code, generate_solution
+from acda.solution import read_source_code, get_solution_cache
+from acda.pipeline import propose_fix, record_accepted_fix, get_pipeline_stats
 from acda.patcher import apply_patch 
+from acda.batch import collect_scripts, run_batch, BATCH_WORKERS, BATCH_POOL, POOL_KINDS
 
 # --- Agent Configuration ---
 MAX_ATTEMPTS = 5 
 
-def main():
+DEFAULT_SCRIPT = os.path.join("tests", "buggy_scripts", "syntax_error.py")
+
+def main(script_path: str = DEFAULT_SCRIPT, speculative: bool = None):
     """
     The main entry point for the Autonomous Code Debugging Agent.
     """
     print("-----Starting Autonomous Code Debugging Agent-----")
     
-    script_path = os.path.join("tests", "buggy_scripts", "syntax_error.py")
+    last_fix = None  # (original code, fixed code, error details) awaiting validation
     
     for attempt in range(1, MAX_ATTEMPTS + 1):
         print(f"\n----- Attempt #{attempt} -----")
@@ -24,6 +29,8 @@ def main():
         
         
         if result['return_code'] == 0:
+            if last_fix:
+                record_accepted_fix(*last_fix)
             print("\nAnalysis: Script executed successfully. No errors found.")
             print("----- ACDA Finished -----")
             break
@@ -44,28 +51,121 @@ def main():
             print("Error: Could not read the source file. Stopping.")
             break
             
-        print("Generating a solution with the LLM...")
-        solution = generate_solution(source_code, error_details)
+        print("Generating a solution...")
+        solution = propose_fix(source_code, error_details, file_name=os.path.basename(script_path), speculative=speculative)
         if not solution:
-            print("Error: LLM failed to generate a solution. Stopping.")
+            print("Error: Failed to generate a solution. Stopping.")
             break
             
         print("\n--- Proposed Solution ---")
-        print(solution)
+        print(solution['explanation'])
+        for error in solution.get('related_errors', []):
+            print(f"  also fixes line {error['line_number']}: {error['error_type']}: {error['error_message']}")
+        for candidate in solution.get('candidates', []):
+            print(f"  candidate {candidate['variant']}: {candidate['outcome']}")
+        print(solution.get('diff') or solution['code'])
         print("-------------------------")
 
         # 4. APPLY the patch
         print("Applying the patch...")
-        if not apply_patch(script_path, solution):
+        if not apply_patch(script_path, solution.get('diff') or solution['code']):
             print("Error: Failed to apply the patch. Stopping.")
             break
+        last_fix = (source_code, solution['code'], error_details)
         
         print("Patch applied. Re-running for validation...")
     
     else: # This 'else' belongs to the 'for' loop
         print(f"\n----- Agent stopped after {MAX_ATTEMPTS} failed attempts. -----")
 
+    stats = get_pipeline_stats()
+    print(f"LLM calls avoided: {stats.get('llm_calls_avoided', 0)} (rules: {stats.get('rule', 0)}, retrieval: {stats.get('retrieval', 0)}), LLM calls: {stats.get('llm', 0)}")
+
+
+def prepare(pull: bool = False) -> bool:
+    """
+    Pre-warms every configured Docker image so executions never hit the registry.
+    """
+    print("-----Preparing Docker images-----")
+    results = get_image_manager().prepare(pull=pull)
+    for image_name, ready in results.items():
+        print(f"{image_name}: {'ready' if ready else 'FAILED'}")
+    return all(results.values())
+
+
+def batch_command(targets: list, manifests: list, output: str, workers: int, pool: str,
+                  max_attempts: int, write: bool, speculative: bool = None, backend: str = None) -> bool:
+    """
+    Debugs every script found under `targets` and `manifests` and writes one
+    JSON line per script to `output`.
+    """
+    scripts = collect_scripts(targets, manifests)
+    if not scripts:
+        print("No scripts found.")
+        return False
+    print(f"-----Debugging {len(scripts)} script(s) with {min(workers, len(scripts))} {pool} worker(s)-----")
+    outcomes = run_batch(scripts, output, workers=workers, pool=pool, max_attempts=max_attempts,
+                         write=write, speculative=speculative, backend=backend)
+    for outcome, count in sorted(outcomes.items()):
+        print(f"{outcome}: {count}")
+    print(f"Results written to {output}")
+    return True
+
+
+def cache_command(import_dir: str = None):
+    """
+    Optionally imports a legacy `.acda_cache` JSON directory, then prints the
+    solution cache counters.
+    """
+    cache = get_solution_cache()
+    if import_dir:
+        print(f"Imported {cache.import_directory(import_dir)} entries from {import_dir}")
+    for name, value in cache.stats().items():
+        print(f"{name}: {value}")
+
 
 if __name__ == "__main__":
-    main()
+    # Shared by the top-level parser and `batch`; suppressed defaults keep an
+    # option given before the subcommand from being reset by the subparser,
+    # so the defaults are filled in after parsing.
+    common_options = argparse.ArgumentParser(add_help=False)
+    common_options.add_argument(
+        "--backend", choices=EXECUTOR_BACKENDS, default=argparse.SUPPRESS,
+        help="Execution backend: 'docker' sandbox, or 'local' subprocess for trusted code."
+    )
+    common_options.add_argument(
+        "--speculative", action="store_true", default=argparse.SUPPRESS,
+        help="Race several LLM fix candidates and keep the first that passes validation."
+    )
+    arg_parser = argparse.ArgumentParser(description="Autonomous Code Debugging Agent", parents=[common_options])
+    arg_parser.add_argument("--script", default=DEFAULT_SCRIPT, help="Python script to debug interactively.")
+    subcommands = arg_parser.add_subparsers(dest="command")
+    batch_parser = subcommands.add_parser("batch", parents=[common_options],
+                                          help="Debug a directory, glob or manifest of scripts in parallel.")
+    batch_parser.add_argument("targets", nargs="*", help="Script files, directories (searched recursively) or glob patterns.")
+    batch_parser.add_argument("--manifest", action="append", default=[],
+                              help="File listing scripts: JSON list, JSON lines, or one 'path [language]' per line.")
+    batch_parser.add_argument("--output", default="acda_results.jsonl", help="JSONL file to append per-script results to.")
+    batch_parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Number of scripts debugged at once.")
+    batch_parser.add_argument("--pool", choices=POOL_KINDS, default=BATCH_POOL, help="Worker pool kind.")
+    batch_parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS, help="Fix attempts per script.")
+    batch_parser.add_argument("--write", action="store_true", help="Patch fixed scripts on disk (default: report only).")
+    prepare_parser = subcommands.add_parser("prepare", help="Pull or verify the sandbox images.")
+    prepare_parser.add_argument("--pull", action="store_true", help="Pull images even if present locally.")
+    cache_parser = subcommands.add_parser("cache", help="Show solution cache stats or import a legacy cache directory.")
+    cache_parser.add_argument("--import-dir", help="Legacy directory of <key>.json cache files to import.")
+    args = arg_parser.parse_args()
+    args.backend = getattr(args, "backend", EXECUTOR_BACKEND)
+    args.speculative = getattr(args, "speculative", None)
+    set_executor_backend(args.backend)
+
+    if args.command == "prepare":
+        raise SystemExit(0 if prepare(pull=args.pull) else 1)
+    if args.command == "batch":
+        raise SystemExit(0 if batch_command(args.targets, args.manifest, args.output, args.workers, args.pool,
+                                            args.max_attempts, args.write, args.speculative, args.backend) else 1)
+    if args.command == "cache":
+        cache_command(args.import_dir)
+        raise SystemExit(0)
+    main(args.script, speculative=args.speculative)
 
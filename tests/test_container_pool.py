@@ -0,0 +1,80 @@
+from acda.executor import ContainerPool, _PooledContainer
+
+
+class FakeContainer:
+    """A warm container whose filesystem records what the fake interpreter writes."""
+
+    id = "container-1"
+    short_id = "container-1"
+
+    def __init__(self):
+        self.changes = set()
+        self.attrs = {"State": {"OOMKilled": False}}
+        self.removed = False
+
+    def diff(self):
+        return [{"Path": path, "Kind": 0} for path in sorted(self.changes)]
+
+    def put_archive(self, path, data):
+        self.changes.add(path)
+        return True
+
+    def top(self):
+        return {"Processes": [["1", "sleep infinity"]]}
+
+    def reload(self):
+        pass
+
+    def kill(self):
+        pass
+
+    def remove(self, force=False):
+        self.removed = True
+
+
+class FakeAPI:
+    """Runs a script that imports a module: CPython caches its bytecode unless told not to."""
+
+    def __init__(self, container):
+        self.container = container
+        self.execs = {}
+
+    def exec_create(self, container_id, cmd, workdir=None, environment=None):
+        exec_id = f"exec-{len(self.execs)}"
+        self.execs[exec_id] = (cmd, environment or {})
+        return {"Id": exec_id}
+
+    def exec_start(self, exec_id, stream=False, demux=False):
+        cmd, environment = self.execs[exec_id]
+        if cmd[0] == "python" and environment.get("PYTHONDONTWRITEBYTECODE") != "1":
+            self.container.changes.add("/usr/local/lib/python3.10/json/__pycache__")
+        return iter([(b"ok\n", None)]) if stream else b""
+
+    def exec_inspect(self, exec_id):
+        return {"ExitCode": 0}
+
+
+class FakeClient:
+    def __init__(self, container):
+        self.api = FakeAPI(container)
+
+
+def test_pooled_run_that_imports_a_module_reuses_the_container():
+    container = FakeContainer()
+    client = FakeClient(container)
+    pool = ContainerPool(client_provider=lambda: client, size=1, max_runs=10)
+    started = []
+
+    def start_container(language):
+        started.append(language)
+        return _PooledContainer(container, language)
+
+    pool._start_container = start_container
+
+    for _ in range(3):
+        result = pool.run(b"import json\nprint('ok')\n", "main.py", "python")
+        assert result["return_code"] == 0
+        assert result["stdout"] == "ok\n"
+
+    assert started == ["python"]
+    assert not container.removed